@@ -0,0 +1,204 @@
+import time
+
+from extensio_bitset import CKYBitset
+from pressupost import ParseInterromput
+from utils import detecta_simbol_inicial
+
+
+def _unio(masks):
+    resultat = 0
+    for mask in masks:
+        resultat |= mask
+    return resultat
+
+
+class BancGramatiques:
+    """
+    Reconeixedor que comprova una paraula contra moltes gramàtiques en CNF alhora.
+
+    Les gramàtiques formen un espai de símbols disjunt: cada parell (gramàtica, no-terminal) és un símbol
+    diferent. La taula és única i cada cel·la guarda, per a cada nom de no-terminal, la màscara de bits de les
+    gramàtiques on aquell no-terminal deriva la subcadena. Així, una regla B → C A que apareix a moltes
+    gramàtiques (per exemple, les generades amb els mateixos noms) s'aplica a totes amb una sola operació
+    de bits, i el resultat de cada paraula és directament el conjunt de gramàtiques que l'accepten.
+
+    Si les gramàtiques comparteixen poques regles, les màscares no estalvien feina i la taula única és més lenta
+    que un motor per gramàtica. Per això es mesura la compartició (mitjana de gramàtiques per regla binària) i,
+    si no arriba a comparticio_minima, el banc fa servir un CKYBitset per gramàtica.
+    """
+
+    def __init__(self, gramatiques, simbols_inicials=None, comparticio_minima=4.0):
+        '''
+        Inicialitza el banc de gramàtiques.
+
+        :param gramatiques: Diccionari {nom: regles} o llista de regles (els noms són llavors els índexs).
+            Cada gramàtica és una llista de tuples (no_terminal, [simbols_dreta]) en CNF.
+        :param simbols_inicials: Diccionari {nom: símbol inicial} (o llista); per defecte es detecten.
+        :param comparticio_minima: Mitjana mínima de gramàtiques per regla binària per fer servir la taula única;
+            per sota es fa servir un motor per gramàtica. Amb 0 sempre es fa servir la taula única.
+        '''
+        if not isinstance(gramatiques, dict):
+            gramatiques = dict(enumerate(gramatiques))
+        if simbols_inicials is not None and not isinstance(simbols_inicials, dict):
+            simbols_inicials = dict(enumerate(simbols_inicials))
+        self.noms = list(gramatiques)
+        self.simbols_inicials = {}
+        self.buida_mask = 0
+
+        # Índex de noms de no-terminals, compartit per totes les gramàtiques
+        self.index = {}
+        # terminal -> {A: màscara de gramàtiques amb A → terminal}
+        self.terminals = {}
+        # B -> {C: {A: màscara de gramàtiques amb A → B C}}
+        binaries = {}
+        # A -> màscara de gramàtiques amb símbol inicial A
+        self.inicials = {}
+        for g, nom in enumerate(self.noms):
+            bit = 1 << g
+            regles = gramatiques[nom]
+            inici = (simbols_inicials or {}).get(nom) or detecta_simbol_inicial(regles)
+            self.simbols_inicials[nom] = inici
+            A = self.index.setdefault(inici, len(self.index))
+            self.inicials[A] = self.inicials.get(A, 0) | bit
+            for lhs, rhs in regles:
+                A = self.index.setdefault(lhs, len(self.index))
+                if tuple(rhs) == ('',):
+                    if lhs == inici:
+                        self.buida_mask |= bit
+                elif len(rhs) == 1 and rhs[0].islower():
+                    per_a = self.terminals.setdefault(rhs[0], {})
+                    per_a[A] = per_a.get(A, 0) | bit
+                elif len(rhs) == 2:
+                    B = self.index.setdefault(rhs[0], len(self.index))
+                    C = self.index.setdefault(rhs[1], len(self.index))
+                    per_a = binaries.setdefault(B, {}).setdefault(C, {})
+                    per_a[A] = per_a.get(A, 0) | bit
+        # Per a cada (B, C) es guarda també la unió de les màscares, per descartar la parella d'un sol cop
+        self.binaries = {
+            B: {C: (_unio(per_a.values()), tuple(per_a.items())) for C, per_a in per_c.items()}
+            for B, per_c in binaries.items()
+        }
+
+        # Compartició: aparicions de regles binàries entre totes les gramàtiques / regles binàries diferents
+        diferents = aparicions = 0
+        for per_c in binaries.values():
+            for per_a in per_c.values():
+                diferents += len(per_a)
+                aparicions += sum(bin(mask).count('1') for mask in per_a.values())
+        self.comparticio = aparicions / diferents if diferents else 0.0
+        self.motors = None
+        if self.comparticio < comparticio_minima:
+            self.motors = {nom: CKYBitset(gramatiques[nom], start_symbol=self.simbols_inicials[nom])
+                           for nom in self.noms}
+
+    def _noms(self, mask):
+        return {self.noms[g] for g in range(mask.bit_length()) if mask >> g & 1}
+
+    def reconeix(self, paraula, pressupost=None):
+        '''
+        Retorna les gramàtiques que generen la paraula.
+
+        :param paraula: Llista de símbols (caràcters) que formen la paraula a comprovar.
+        :param pressupost: Objecte Pressupost opcional. Es comprova entre longituds de subcadena i, si s'esgota,
+            es llança ParseInterromput amb el progrés parcial. Cada operació és una partició (i, k, j).
+            Amb un motor per gramàtica, el pressupost s'aplica a cada gramàtica per separat.
+        :return: Conjunt amb els noms de les gramàtiques que accepten la paraula.
+        '''
+        if self.motors is not None:
+            return {nom for nom, motor in self.motors.items() if motor.parse(paraula, pressupost)}
+
+        n = len(paraula)
+        if n == 0:
+            return self._noms(self.buida_mask)
+
+        binaries = self.binaries
+        table = [[None] * n for _ in range(n)]
+        if pressupost is not None:
+            termini = pressupost.inicia()
+            inici_pressupost = time.perf_counter()
+            operacions = 0
+            motiu = pressupost.motiu_esgotat(termini, 0)
+            if motiu:
+                raise self._interromput(motiu, table, 0, operacions, inici_pressupost)
+
+        # Omplir la diagonal (subcadenes de longitud 1)
+        for i in range(n):
+            cel = self.terminals.get(paraula[i])
+            if not cel:
+                return set()
+            table[i][i] = cel
+
+        # Omplir la resta de la taula (subcadenes de longitud 2 a n)
+        for longitud in range(2, n + 1):
+            if pressupost is not None:
+                cost = (n - longitud + 1) * (longitud - 1)
+                motiu = pressupost.motiu_esgotat(termini, operacions + cost)
+                if motiu:
+                    raise self._interromput(motiu, table, longitud - 1, operacions, inici_pressupost)
+                operacions += cost
+            for i in range(n - longitud + 1):
+                j = i + longitud - 1
+                fila = table[i]
+                cel = {}
+                for k in range(i, j):
+                    esquerra = fila[k]
+                    dreta = table[k + 1][j]
+                    if not esquerra or not dreta:
+                        continue
+                    for B, mask_b in esquerra.items():
+                        per_c = binaries.get(B)
+                        if per_c is None:
+                            continue
+                        # Es recorre el costat més petit: les C de la cel·la dreta o les C que tenen regla amb B
+                        if len(dreta) <= len(per_c):
+                            for C, mask_c in dreta.items():
+                                regles = per_c.get(C)
+                                if regles is not None and mask_b & mask_c & regles[0]:
+                                    comuna = mask_b & mask_c
+                                    for A, mask_regla in regles[1]:
+                                        v = comuna & mask_regla
+                                        if v:
+                                            cel[A] = cel.get(A, 0) | v
+                        else:
+                            for C, regles in per_c.items():
+                                mask_c = dreta.get(C)
+                                if mask_c and mask_b & mask_c & regles[0]:
+                                    comuna = mask_b & mask_c
+                                    for A, mask_regla in regles[1]:
+                                        v = comuna & mask_regla
+                                        if v:
+                                            cel[A] = cel.get(A, 0) | v
+                fila[j] = cel
+
+        arrel = table[0][n - 1]
+        acceptadores = 0
+        for A, mask in arrel.items():
+            acceptadores |= mask & self.inicials.get(A, 0)
+        return self._noms(acceptadores)
+
+    def reconeix_lot(self, paraules, pressupost=None):
+        '''
+        Retorna, per a cada paraula del lot, el conjunt de gramàtiques que la generen.
+        Les paraules repetides dins del lot només es processen un cop.
+
+        :param paraules: Iterable de paraules (llistes de símbols o cadenes).
+        :param pressupost: Objecte Pressupost opcional, aplicat a cada paraula.
+        :return: Llista de conjunts, en el mateix ordre que les paraules.
+        '''
+        resultats = {}
+        sortida = []
+        for paraula in paraules:
+            clau = tuple(paraula)
+            if clau not in resultats:
+                resultats[clau] = self.reconeix(paraula, pressupost)
+            sortida.append(set(resultats[clau]))
+        return sortida
+
+    def _interromput(self, motiu, table, longitud, operacions, inici):
+        '''
+        Crea l'excepció ParseInterromput amb el progrés de la taula fins a la longitud indicada.
+        '''
+        n = len(table)
+        omplertes = sum(1 for l in range(1, longitud + 1) for i in range(n - l + 1) if table[i][i + l - 1])
+        return ParseInterromput(motiu, n, longitud, omplertes, n * (n + 1) // 2, operacions,
+                                time.perf_counter() - inici)
@@ -0,0 +1,398 @@
+"""
+Benchmarks d'escalabilitat dels motors CKY i del convertidor CFG → CNF.
+
+Exemples:
+    python benchmark.py                                  # executa tots els escenaris i mostra els resultats
+    python benchmark.py --desa-base base.json            # desa els resultats com a referència
+    python benchmark.py --compara base.json --tolerancia 0.3   # falla si algun punt és més lent del permès
+
+Cada escenari varia un únic paràmetre (mida de la gramàtica, longitud de la paraula, ambigüitat o
+longitud dels cossos de les regles), mesura el temps i el pic de memòria, i ajusta una corba
+temps ≈ a·x^b per estimar la complexitat empírica.
+L'escenari conversio_cnf informa també del rendiment de CFGtoCNF en regles per segon, i l'escenari regular
+compara CKY amb l'autòmat de CKYRegular en paraules llargues (en símbols per segon). L'escenari format_binari
+mesura el temps de tenir un CKY a punt (llegir la gramàtica, indexar-la i fer un parse curt) des del format text i
+des del format binari.
+"""
+import argparse
+import json
+import math
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from generador_gramatiques import GrammarMaker
+from generador_paraula import ParaulaAleatoria
+from extensio_base import CKY
+from extensio_1 import CFGtoCNF
+from extensio_2 import ProbabilisticCKY
+from extensio_earley import Earley
+from extensio_cky_plus import CKYPlus
+from extensio_regular import CKYRegular
+from gramatica_binaria import GramaticaBinaria, escriu_binaria
+from utils import escriure_gramatica, llegir_gramatica
+
+LLAVOR = 1234
+
+
+def mesura_temps(funcio, repeticions=3):
+    """
+    Retorna el temps mínim (en segons) de diverses execucions de la funció.
+    """
+    millor = float("inf")
+    for _ in range(repeticions):
+        inici = time.perf_counter()
+        funcio()
+        millor = min(millor, time.perf_counter() - inici)
+    return millor
+
+
+def mesura_memoria(funcio, prepara=None):
+    """
+    Retorna el pic de memòria (en bytes) d'una execució de la funció, mesurat amb tracemalloc.
+
+    :param prepara: Funció opcional que s'executa abans de començar a mesurar (per exemple, l'allibera_taula
+        del motor, perquè el pic inclogui la taula i no només l'estat estable amb la taula reutilitzada).
+    """
+    if prepara is not None:
+        prepara()
+    tracemalloc.start()
+    try:
+        funcio()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def ajusta_potencia(xs, temps):
+    """
+    Ajusta temps ≈ a·x^b per mínims quadrats en escala logarítmica.
+
+    :return: Tupla (a, b), o None si no hi ha prou punts.
+    """
+    punts = [(math.log(x), math.log(t)) for x, t in zip(xs, temps) if x > 0 and t > 0]
+    if len(punts) < 2:
+        return None
+    mx = sum(p[0] for p in punts) / len(punts)
+    my = sum(p[1] for p in punts) / len(punts)
+    sxx = sum((p[0] - mx) ** 2 for p in punts)
+    if sxx == 0:
+        return None
+    b = sum((p[0] - mx) * (p[1] - my) for p in punts) / sxx
+    return math.exp(my - b * mx), b
+
+
+def paraula_aleatoria(regles, longitud, rng):
+    """
+    Genera una paraula aleatòria amb els terminals de la gramàtica (no té per què pertànyer al llenguatge).
+    """
+    terminals = sorted({rhs[0] for lhs, rhs in regles if len(rhs) == 1 and rhs[0].islower()})
+    return [rng.choice(terminals) for _ in range(longitud)]
+
+
+def gramatica_ambigua(k):
+    """
+    Gramàtica en CNF amb k no-terminals que generen 'a' i totes les regles binàries entre ells.
+    El nombre d'arbres de derivació de a^n creix amb k.
+    """
+    nts = ['S'] + [f"X{i}" for i in range(1, k)]
+    regles = [(nt, ['a']) for nt in nts]
+    regles += [(cap, [b, c]) for cap in nts for b in nts for c in nts]
+    return regles
+
+
+def gramatica_cossos_llargs(longitud_cos, num_no_terminals, regles_per_cap, rng):
+    """
+    Gramàtica CFG (sense CNF) amb cossos de la longitud indicada, barrejant terminals i no-terminals.
+    """
+    nts = ['S'] + [f"X{i}" for i in range(1, num_no_terminals)]
+    regles = []
+    for cap in nts:
+        regles.append((cap, [rng.choice('abcdefgh')]))
+        for _ in range(regles_per_cap):
+            cos = [rng.choice(nts) if rng.random() < 0.5 else rng.choice('abcdefgh')
+                   for _ in range(longitud_cos)]
+            regles.append((cap, cos))
+    return regles
+
+
+def _amb_probabilitats(regles, rng):
+    per_cap = {}
+    for cap, cos in regles:
+        per_cap.setdefault(cap, []).append(cos)
+    resultat = []
+    for cap, cossos in per_cap.items():
+        pesos = [rng.random() for _ in cossos]
+        total = sum(pesos)
+        resultat += [((cap, cos), pes / total) for cos, pes in zip(cossos, pesos)]
+    return resultat
+
+
+def escenari_mida_gramatica(mides=(8, 16, 32, 64, 128), longitud=12):
+    rng = random.Random(LLAVOR)
+    for num_regles in mides:
+        regles = GrammarMaker(rng).crea_gramatica(en_cnf=True, num_regles=num_regles)
+        paraula = paraula_aleatoria(regles, longitud, rng)
+        cky = CKY(regles)
+        pcky = ProbabilisticCKY(_amb_probabilitats(regles, rng), start_symbol='S')
+        yield len(regles), "CKY.parse_quiet", lambda: cky.parse_quiet(paraula), cky.allibera_taula
+        yield len(regles), "ProbabilisticCKY.parse", lambda: pcky.parse(paraula), pcky.allibera_taula
+
+
+def escenari_no_terminals(nombres=(4, 8, 16, 32, 64), longitud=12):
+    rng = random.Random(LLAVOR)
+    for num_nt in nombres:
+        regles = gramatica_cossos_llargs(2, num_nt, 3, rng)
+        convertidor = CFGtoCNF(regles)
+        regles = convertidor.convert()
+        paraula = paraula_aleatoria(regles, longitud, rng)
+        cky = CKY(regles, start_symbol=convertidor.initial)
+        yield num_nt, "CKY.parse_quiet", lambda: cky.parse_quiet(paraula), cky.allibera_taula
+
+
+def escenari_longitud(longituds=(4, 8, 16, 32, 48), num_regles=24):
+    rng = random.Random(LLAVOR)
+    regles = GrammarMaker(rng).crea_gramatica(en_cnf=True, num_regles=num_regles)
+    cky = CKY(regles)
+    pcky = ProbabilisticCKY(_amb_probabilitats(regles, rng), start_symbol='S')
+    for longitud in longituds:
+        paraula = paraula_aleatoria(regles, longitud, rng)
+        yield longitud, "CKY.parse_quiet", lambda: cky.parse_quiet(paraula), cky.allibera_taula
+        yield longitud, "ProbabilisticCKY.parse", lambda: pcky.parse(paraula), pcky.allibera_taula
+
+
+def escenari_ambiguitat(ks=(1, 2, 3, 4, 6), longitud=16):
+    paraula = ['a'] * longitud
+    rng = random.Random(LLAVOR)
+    for k in ks:
+        regles = gramatica_ambigua(k)
+        cky = CKY(regles)
+        pcky = ProbabilisticCKY(_amb_probabilitats(regles, rng), start_symbol='S')
+        yield k, "CKY.parse_quiet", lambda: cky.parse_quiet(paraula), cky.allibera_taula
+        yield k, "ProbabilisticCKY.parse", lambda: pcky.parse(paraula), pcky.allibera_taula
+
+
+def escenari_longitud_cos(longituds=(2, 3, 4, 6, 8), num_no_terminals=8):
+    rng = random.Random(LLAVOR)
+    for longitud_cos in longituds:
+        regles = gramatica_cossos_llargs(longitud_cos, num_no_terminals, 3, rng)
+        yield longitud_cos, "CFGtoCNF.convert", lambda: CFGtoCNF(regles).convert()
+
+
+def escenari_cfg_directe(longituds=(8, 16, 32, 64), longitud_cos=5, num_no_terminals=8):
+    rng = random.Random(LLAVOR)
+    regles = gramatica_cossos_llargs(longitud_cos, num_no_terminals, 2, rng)
+    convertidor = CFGtoCNF(regles)
+    cky = CKY(convertidor.convert(), start_symbol=convertidor.initial)
+    earley = Earley(regles)
+    cky_plus = CKYPlus(regles)
+    generador = ParaulaAleatoria(regles, rng=rng)
+    for longitud in longituds:
+        # Paraules del llenguatge (de la primera longitud possible), perquè cap motor s'aturi abans d'hora
+        paraula = next((list(p) for p in map(generador.crea_paraula_longitud, range(longitud, 2 * longitud)) if p),
+                       [rng.choice('abcdefgh') for _ in range(longitud)])
+        longitud = len(paraula)
+        yield longitud, "CKY(CNF).parse_quiet", lambda: cky.parse_quiet(paraula), cky.allibera_taula
+        yield longitud, "Earley.parse", lambda: earley.parse(paraula)
+        yield longitud, "CKYPlus.parse", lambda: cky_plus.parse(paraula)
+
+
+def escenari_conversio_cnf(mides=(10_000, 30_000, 100_000)):
+    rng = random.Random(LLAVOR)
+    for num_regles in mides:
+        regles = GrammarMaker(rng).crea_gramatica_gran(num_regles // 10, 26, num_regles, en_cnf=False,
+                                                       seed=rng.random())
+        yield len(regles), "CFGtoCNF.convert", lambda: CFGtoCNF(regles).convert()
+
+
+def gramatica_regular(num_no_terminals, rng):
+    """
+    Gramàtica en CNF lineal per la dreta (A → B C amb C recursiu i B que només genera terminals).
+    Genera un llenguatge regular.
+    """
+    nts = ['S'] + [f"X{i}" for i in range(1, num_no_terminals)]
+    regles = [(f"T_{t.upper()}", [t]) for t in 'abcd']
+    for cap in nts:
+        regles.append((cap, [rng.choice('abcd')]))
+        for _ in range(3):
+            regles.append((cap, [f"T_{rng.choice('abcd').upper()}", rng.choice(nts)]))
+    return regles
+
+
+def paraula_regular(regles, longitud, rng):
+    """
+    Genera una paraula de longitud aproximada del llenguatge de gramatica_regular, seguint les regles
+    recursives i acabant amb una regla terminal.
+    """
+    per_cap = {}
+    for cap, cos in regles:
+        per_cap.setdefault(cap, []).append(cos)
+    paraula = []
+    cap = 'S'
+    while len(paraula) < longitud - 1:
+        t, cap = rng.choice([cos for cos in per_cap[cap] if len(cos) == 2])
+        paraula.append(per_cap[t][0][0])
+    paraula.append(next(cos[0] for cos in per_cap[cap] if len(cos) == 1))
+    return paraula
+
+
+def escenari_regular(longituds_cky=(32, 64, 128), longituds_afd=(32, 128, 1024, 8192), num_no_terminals=8):
+    rng = random.Random(LLAVOR)
+    regles = gramatica_regular(num_no_terminals, rng)
+    cky = CKY(regles)
+    regular = CKYRegular(regles)
+    # Amb S → ε, l'autòmat ha d'acceptar la paraula buida tant si les regles són llistes com tuples
+    # (com les de CKY.rules)
+    amb_buida = CKY(regles + [('S', [''])])
+    for motor in (CKYRegular(regles + [('S', [''])]), CKYRegular(amb_buida.rules)):
+        if not motor.regular or motor.parse_quiet([]) != amb_buida.parse_quiet([]):
+            raise RuntimeError("CKYRegular no coincideix amb CKY en la paraula buida.")
+    # Paraules del llenguatge, perquè l'autòmat no s'aturi abans d'arribar al final
+    paraules = {longitud: paraula_regular(regles, longitud, rng) for longitud in set(longituds_cky + longituds_afd)}
+    for longitud in longituds_cky:
+        yield longitud, "CKY.parse_quiet", lambda: cky.parse_quiet(paraules[longitud]), cky.allibera_taula
+    for longitud in longituds_afd:
+        yield longitud, "CKYRegular.parse_quiet", lambda: regular.parse_quiet(paraules[longitud])
+
+
+def _carrega_binaria(cami):
+    # El motor només llegeix els arrays mentre construeix els índexs: es pot tancar el fitxer tot seguit
+    with GramaticaBinaria(cami) as gramatica:
+        return CKY(gramatica)
+
+
+def escenari_format_binari(mides=(10_000, 30_000, 100_000), longitud=8):
+    rng = random.Random(LLAVOR)
+    directori = tempfile.mkdtemp(prefix='cky_benchmark_')
+    try:
+        for num_regles in mides:
+            regles = GrammarMaker(rng).crea_gramatica_gran(num_regles // 10, 26, num_regles, seed=rng.random())
+            text = os.path.join(directori, f"g{num_regles}.txt")
+            binari = os.path.join(directori, f"g{num_regles}.ckyg")
+            escriure_gramatica(regles, text)
+            escriu_binaria(regles, binari)
+            paraula = [rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(longitud)]
+            yield num_regles, "CKY(llegir_gramatica)", lambda: CKY(llegir_gramatica(text)).parse_quiet(paraula)
+            yield num_regles, "CKY(GramaticaBinaria)", lambda: _carrega_binaria(binari).parse_quiet(paraula)
+    finally:
+        shutil.rmtree(directori, ignore_errors=True)
+
+
+ESCENARIS = {
+    "mida_gramatica": escenari_mida_gramatica,
+    "no_terminals": escenari_no_terminals,
+    "longitud": escenari_longitud,
+    "ambiguitat": escenari_ambiguitat,
+    "longitud_cos": escenari_longitud_cos,
+    "cfg_directe": escenari_cfg_directe,
+    "conversio_cnf": escenari_conversio_cnf,
+    "regular": escenari_regular,
+    "format_binari": escenari_format_binari,
+}
+
+# Escenaris on x és un nombre de regles i té sentit informar del rendiment (regles per segon)
+ESCENARIS_RENDIMENT = {"conversio_cnf", "format_binari"}
+
+# Escenaris on x és la longitud de la paraula i té sentit informar del rendiment (símbols per segon)
+ESCENARIS_SIMBOLS = {"regular"}
+
+
+def executa(escenaris=None, repeticions=3, memoria=True):
+    """
+    Executa els escenaris indicats (per defecte, tots).
+
+    :return: Diccionari {"punts": [...], "ajustos": {...}} serialitzable a JSON.
+    """
+    punts = []
+    for nom in escenaris or ESCENARIS:
+        # Cada escenari genera (x, motor, funció) o (x, motor, funció, preparació de la mesura de memòria)
+        for x, motor, funcio, *prepara in ESCENARIS[nom]():
+            punt = {"escenari": nom, "motor": motor, "x": x, "temps": mesura_temps(funcio, repeticions)}
+            if nom in ESCENARIS_RENDIMENT:
+                punt["regles_per_segon"] = x / punt["temps"]
+            if nom in ESCENARIS_SIMBOLS:
+                punt["simbols_per_segon"] = x / punt["temps"]
+            if memoria:
+                punt["memoria_pic"] = mesura_memoria(funcio, *prepara)
+            punts.append(punt)
+
+    ajustos = {}
+    series = {}
+    for punt in punts:
+        series.setdefault(f"{punt['escenari']}/{punt['motor']}", []).append(punt)
+    for clau, serie in series.items():
+        ajust = ajusta_potencia([p["x"] for p in serie], [p["temps"] for p in serie])
+        if ajust is not None:
+            ajustos[clau] = {"a": ajust[0], "exponent": ajust[1]}
+    return {"punts": punts, "ajustos": ajustos}
+
+
+def compara(resultats, base, tolerancia):
+    """
+    Compara uns resultats amb una referència.
+
+    :param tolerancia: Increment relatiu de temps permès (0.25 = un 25% més lent).
+    :return: Llista de regressions (diccionaris amb el punt, el temps de referència i la ràtio).
+    """
+    referencia = {(p["escenari"], p["motor"], p["x"]): p["temps"] for p in base["punts"]}
+    regressions = []
+    for punt in resultats["punts"]:
+        temps_base = referencia.get((punt["escenari"], punt["motor"], punt["x"]))
+        if temps_base and punt["temps"] > temps_base * (1 + tolerancia):
+            regressions.append(dict(punt, temps_base=temps_base, ratio=punt["temps"] / temps_base))
+    return regressions
+
+
+def mostra(resultats, sortida=sys.stdout):
+    for punt in resultats["punts"]:
+        memoria = punt.get("memoria_pic")
+        text_memoria = f"  {memoria / 1024:10.1f} KiB" if memoria is not None else ""
+        rendiment = punt.get("regles_per_segon")
+        text_rendiment = f"  {rendiment:12.0f} regles/s" if rendiment is not None else ""
+        if punt.get("simbols_per_segon") is not None:
+            text_rendiment = f"  {punt['simbols_per_segon']:12.0f} símbols/s"
+        print(f"{punt['escenari']:<16}{punt['motor']:<24}x={punt['x']:<8}"
+              f"{punt['temps'] * 1000:10.3f} ms{text_memoria}{text_rendiment}", file=sortida)
+    print("\nComplexitat empírica (temps ≈ a·x^b):", file=sortida)
+    for clau, ajust in resultats["ajustos"].items():
+        print(f"  {clau:<40} b = {ajust['exponent']:.2f}", file=sortida)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks d'escalabilitat de CKY i CFGtoCNF.")
+    parser.add_argument("--escenari", action="append", choices=sorted(ESCENARIS),
+                        help="Escenari a executar (es pot repetir; per defecte, tots).")
+    parser.add_argument("--repeticions", type=int, default=3)
+    parser.add_argument("--sense-memoria", action="store_true", help="No mesura el pic de memòria.")
+    parser.add_argument("--sortida", help="Desa els resultats en aquest fitxer JSON.")
+    parser.add_argument("--desa-base", help="Desa els resultats com a referència en aquest fitxer JSON.")
+    parser.add_argument("--compara", help="Fitxer JSON de referència amb què comparar.")
+    parser.add_argument("--tolerancia", type=float, default=0.25,
+                        help="Increment relatiu de temps permès respecte la referència.")
+    args = parser.parse_args(argv)
+
+    resultats = executa(args.escenari, args.repeticions, not args.sense_memoria)
+    mostra(resultats)
+    for cami in (args.sortida, args.desa_base):
+        if cami:
+            with open(cami, "w", encoding="utf-8") as f:
+                json.dump(resultats, f, indent=2)
+
+    if args.compara:
+        with open(args.compara, encoding="utf-8") as f:
+            base = json.load(f)
+        regressions = compara(resultats, base, args.tolerancia)
+        for r in regressions:
+            print(f"REGRESSIÓ {r['escenari']}/{r['motor']} x={r['x']}: "
+                  f"{r['temps'] * 1000:.3f} ms vs {r['temps_base'] * 1000:.3f} ms (x{r['ratio']:.2f})",
+                  file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+import hashlib
+import json
+import sqlite3
+import sys
+from collections import OrderedDict
+
+
+def empremta_gramatica(regles, simbol_inicial, motor=''):
+    '''
+    Calcula una empremta estable (igual en tots els processos) d'una gramàtica.
+
+    Qualsevol canvi a les regles, a les probabilitats o al símbol inicial canvia l'empremta, de manera que
+    els resultats desats amb la gramàtica anterior deixen de coincidir.
+
+    Recorre totes les regles: els motors la calculen un cop per versió de la gramàtica i la reutilitzen.
+
+    :param regles: Regles en el format de llegir_gramatica, o una GramaticaBinaria (se'n resumeix el fitxer
+        sense descodificar les regles).
+    :param simbol_inicial: Símbol inicial de la gramàtica.
+    :param motor: Nom del motor (els resultats de motors diferents no són intercanviables).
+    :return: Cadena hexadecimal.
+    '''
+    contingut = regles.resum() if hasattr(regles, 'resum') else list(regles)
+    return hashlib.blake2b(repr((motor, simbol_inicial, contingut)).encode('utf-8'), digest_size=16).hexdigest()
+
+
+def _mida(clau, valor):
+    # Estimació dels bytes que ocupa una entrada (la clau és (empremta, tupla de símbols))
+    empremta, paraula = clau
+    return (sys.getsizeof(clau) + sys.getsizeof(empremta) + sys.getsizeof(paraula)
+            + sum(sys.getsizeof(s) for s in paraula) + sys.getsizeof(valor))
+
+
+class CacheResultats:
+    """
+    Memòria cau LRU de resultats de parse, indexada per (empremta de la gramàtica, paraula).
+
+    Es pot compartir entre diversos motors i gramàtiques. Té un límit d'entrades i un de bytes (estimats),
+    i opcionalment un segon nivell persistent en un fitxer SQLite que poden compartir diversos processos.
+    Els resultats que no són a memòria es busquen a disc abans de recalcular-los.
+    """
+
+    def __init__(self, max_entrades=4096, max_bytes=None, cami_disc=None):
+        '''
+        :param max_entrades: Nombre màxim d'entrades a memòria.
+        :param max_bytes: Mida màxima aproximada de les entrades a memòria, en bytes (None per no limitar-la).
+        :param cami_disc: Fitxer SQLite per al nivell persistent (None per no fer-lo servir).
+        '''
+        self.max_entrades = max_entrades
+        self.max_bytes = max_bytes
+        self.cami_disc = cami_disc
+        self._entrades = OrderedDict()
+        self._mides = {}
+        self.bytes = 0
+        self.encerts = 0
+        self.encerts_disc = 0
+        self.errades = 0
+        self.expulsions = 0
+        self._disc = None
+        if cami_disc is not None:
+            self._disc = sqlite3.connect(cami_disc, timeout=30, isolation_level=None)
+            self._disc.execute("PRAGMA journal_mode=WAL")
+            self._disc.execute(
+                "CREATE TABLE IF NOT EXISTS resultats "
+                "(empremta TEXT, paraula TEXT, resultat TEXT, PRIMARY KEY (empremta, paraula))"
+            )
+
+    def obte(self, empremta, paraula, calcula):
+        '''
+        Retorna el resultat desat per a la paraula o, si no n'hi ha, el calcula i el desa.
+
+        :param empremta: Empremta de la gramàtica (veure empremta_gramatica).
+        :param paraula: Llista de símbols.
+        :param calcula: Funció sense arguments que fa el parse.
+        :return: El resultat del parse.
+        '''
+        clau = (empremta, tuple(paraula))
+        if clau in self._entrades:
+            self._entrades.move_to_end(clau)
+            self.encerts += 1
+            return self._entrades[clau]
+
+        if self._disc is not None:
+            fila = self._disc.execute(
+                "SELECT resultat FROM resultats WHERE empremta = ? AND paraula = ?",
+                (empremta, json.dumps(clau[1], ensure_ascii=False))
+            ).fetchone()
+            if fila is not None:
+                self.encerts_disc += 1
+                resultat = json.loads(fila[0])
+                self._desa(clau, resultat)
+                return resultat
+
+        self.errades += 1
+        resultat = calcula()
+        self._desa(clau, resultat)
+        if self._disc is not None:
+            self._disc.execute(
+                "INSERT OR REPLACE INTO resultats VALUES (?, ?, ?)",
+                (empremta, json.dumps(clau[1], ensure_ascii=False), json.dumps(resultat))
+            )
+        return resultat
+
+    def _desa(self, clau, resultat):
+        mida = _mida(clau, resultat)
+        if self.max_bytes is not None and mida > self.max_bytes:
+            return
+        self._entrades[clau] = resultat
+        self._mides[clau] = mida
+        self.bytes += mida
+        while len(self._entrades) > self.max_entrades or (self.max_bytes is not None and self.bytes > self.max_bytes):
+            antiga, _ = self._entrades.popitem(last=False)
+            self.bytes -= self._mides.pop(antiga)
+            self.expulsions += 1
+
+    def buida(self):
+        '''
+        Elimina totes les entrades de memòria (el nivell de disc es manté).
+        '''
+        self._entrades.clear()
+        self._mides.clear()
+        self.bytes = 0
+
+    def tanca(self):
+        '''
+        Tanca la connexió amb el nivell de disc.
+        '''
+        if self._disc is not None:
+            self._disc.close()
+            self._disc = None
+
+    def __len__(self):
+        return len(self._entrades)
+
+    def a_dict(self):
+        '''
+        :return: Diccionari amb les estadístiques de la memòria cau.
+        '''
+        consultes = self.encerts + self.encerts_disc + self.errades
+        return {
+            "entrades": len(self._entrades),
+            "bytes": self.bytes,
+            "encerts": self.encerts,
+            "encerts_disc": self.encerts_disc,
+            "errades": self.errades,
+            "expulsions": self.expulsions,
+            "taxa_encerts": (self.encerts + self.encerts_disc) / consultes if consultes else 0.0,
+        }
+
+    def __repr__(self):
+        return f"CacheResultats({self.a_dict()})"
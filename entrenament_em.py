@@ -0,0 +1,337 @@
+"""
+Entrenament de les probabilitats d'una gramàtica probabilística en CNF amb l'algorisme EM (inside-outside)
+a partir d'un corpus de paraules sense anotar.
+
+El corpus es llegeix de manera incremental i es reparteix en lots entre diversos processos; cada procés
+calcula els comptatges esperats de cada regla per al seu lot i el procés principal els suma i reestima
+les probabilitats. Després de cada iteració es desa la gramàtica (format de llegir_gramatica) i un fitxer
+de punt de control que permet reprendre l'entrenament.
+
+Exemple:
+    python entrenament_em.py gramatica_probabilistica.txt corpus.txt --sortida apresa.txt --iteracions 20 --jobs 0
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import time
+from collections import deque
+
+from utils import llegir_gramatica, escriure_gramatica, detecta_simbol_inicial
+
+# Estat de cada procés treballador
+_model = None
+_separa = None
+
+
+class ModelInsideOutside:
+    """
+    Càlcul inside-outside sobre una gramàtica probabilística en CNF.
+
+    Les regles es numeren; les probabilitats es passen a cada crida com una llista indexada pel número
+    de regla, de manera que el mateix model serveix per a totes les iteracions.
+    """
+
+    def __init__(self, regles, simbol_inicial):
+        '''
+        :param regles: Llista [((capçalera, [cos]), probabilitat), ...] en CNF.
+        :param simbol_inicial: Símbol inicial de la gramàtica.
+        '''
+        self.inici = simbol_inicial
+        self.caps = [cap for (cap, _), _ in regles]
+        # terminal -> [(regla, A)];  B -> [(regla, A, C)] per a les regles A → B C
+        self.terminals = {}
+        self.per_esquerre = {}
+        self.buides = []
+        for r, ((cap, cos), _) in enumerate(regles):
+            if cos == ['']:
+                if cap == simbol_inicial:
+                    self.buides.append(r)
+            elif len(cos) == 1:
+                self.terminals.setdefault(cos[0], []).append((r, cap))
+            elif len(cos) == 2:
+                self.per_esquerre.setdefault(cos[0], []).append((r, cap, cos[1]))
+            else:
+                raise ValueError(f"La regla {cap} -> {' '.join(cos)} no està en CNF.")
+
+    def comptatges(self, paraula, probs, acumulats):
+        '''
+        Suma a acumulats els comptatges esperats de cada regla per a la paraula.
+
+        :param paraula: Llista de símbols.
+        :param probs: Probabilitat de cada regla.
+        :param acumulats: Llista (per regla) on s'afegeixen els comptatges.
+        :return: Probabilitat de la paraula (0.0 si la gramàtica no la genera).
+        '''
+        n = len(paraula)
+        if n == 0:
+            total = sum(probs[r] for r in self.buides)
+            if total > 0:
+                for r in self.buides:
+                    acumulats[r] += probs[r] / total
+            return total
+
+        # Inside: beta[i][j][A] = P(A ⇒* paraula[i:j])
+        beta = [[None] * (n + 1) for _ in range(n)]
+        for i, simbol in enumerate(paraula):
+            cel = {}
+            for r, A in self.terminals.get(simbol, ()):
+                cel[A] = cel.get(A, 0.0) + probs[r]
+            beta[i][i + 1] = cel
+        per_esquerre = self.per_esquerre
+        for longitud in range(2, n + 1):
+            for i in range(n - longitud + 1):
+                j = i + longitud
+                cel = {}
+                for k in range(i + 1, j):
+                    esquerra, dreta = beta[i][k], beta[k][j]
+                    if not esquerra or not dreta:
+                        continue
+                    for B, pb in esquerra.items():
+                        for r, A, C in per_esquerre.get(B, ()):
+                            pc = dreta.get(C)
+                            if pc:
+                                cel[A] = cel.get(A, 0.0) + probs[r] * pb * pc
+                beta[i][j] = cel
+
+        z = beta[0][n].get(self.inici, 0.0)
+        if z <= 0.0:
+            return 0.0
+
+        # Outside: alfa[i][j][A]; els comptatges de les regles binàries s'acumulen en el mateix recorregut
+        alfa = [[{} for _ in range(n + 1)] for _ in range(n)]
+        alfa[0][n][self.inici] = 1.0
+        for longitud in range(n, 1, -1):
+            for i in range(n - longitud + 1):
+                j = i + longitud
+                exterior = alfa[i][j]
+                if not exterior:
+                    continue
+                for k in range(i + 1, j):
+                    esquerra, dreta = beta[i][k], beta[k][j]
+                    if not esquerra or not dreta:
+                        continue
+                    alfa_esquerra, alfa_dreta = alfa[i][k], alfa[k][j]
+                    for B, pb in esquerra.items():
+                        for r, A, C in per_esquerre.get(B, ()):
+                            pc = dreta.get(C)
+                            pa = exterior.get(A)
+                            if pc and pa:
+                                a = pa * probs[r]
+                                alfa_esquerra[B] = alfa_esquerra.get(B, 0.0) + a * pc
+                                alfa_dreta[C] = alfa_dreta.get(C, 0.0) + a * pb
+                                acumulats[r] += a * pb * pc / z
+        for i, simbol in enumerate(paraula):
+            exterior = alfa[i][i + 1]
+            for r, A in self.terminals.get(simbol, ()):
+                pa = exterior.get(A)
+                if pa:
+                    acumulats[r] += pa * probs[r] / z
+        return z
+
+
+def _inicialitza_treballador(regles, simbol_inicial, simbols_espai):
+    global _model, _separa
+    _model = ModelInsideOutside(regles, simbol_inicial)
+    _separa = str.split if simbols_espai else list
+
+
+def processa_lot(linies, probs):
+    '''
+    Calcula els comptatges esperats d'un lot de paraules (pas E).
+
+    :return: Tupla (comptatges per regla, log-versemblança, paraules generades, paraules no generades).
+    '''
+    acumulats = [0.0] * len(probs)
+    log_versemblanca = 0.0
+    generades = no_generades = 0
+    for linia in linies:
+        z = _model.comptatges(_separa(linia), probs, acumulats)
+        if z > 0.0:
+            log_versemblanca += math.log(z)
+            generades += 1
+        else:
+            no_generades += 1
+    return acumulats, log_versemblanca, generades, no_generades
+
+
+def llegeix_lots(cami, mida_lot):
+    '''
+    Llegeix el corpus de manera incremental i en retorna les paraules agrupades en lots.
+    '''
+    with open(cami, encoding='utf-8') as f:
+        lot = []
+        for linia in f:
+            lot.append(linia.rstrip('\r\n'))
+            if len(lot) >= mida_lot:
+                yield lot
+                lot = []
+        if lot:
+            yield lot
+
+
+def reestima(regles, comptatges):
+    '''
+    Pas M: la probabilitat nova de cada regla és el seu comptatge dividit pel total del seu cap.
+    Els caps sense cap comptatge mantenen les probabilitats anteriors.
+
+    :return: Llista de probabilitats noves.
+    '''
+    totals = {}
+    for ((cap, _), _), c in zip(regles, comptatges):
+        totals[cap] = totals.get(cap, 0.0) + c
+    return [c / totals[cap] if totals[cap] > 0 else p for ((cap, _), p), c in zip(regles, comptatges)]
+
+
+def _desa_json(dades, cami):
+    # Escriptura atòmica, perquè un punt de control interromput no deixi el fitxer a mitges
+    temporal = f"{cami}.{os.getpid()}.tmp"
+    with open(temporal, 'w', encoding='utf-8') as f:
+        json.dump(dades, f, indent=2)
+    os.replace(temporal, cami)
+
+
+def entrena(regles, cami_corpus, iteracions=10, jobs=1, mida_lot=500, simbol_inicial=None, simbols_espai=False,
+            directori_control=None, tolerancia=1e-6, informa=None):
+    '''
+    Entrena les probabilitats de la gramàtica amb EM.
+
+    :param regles: Llista [((capçalera, [cos]), probabilitat), ...] en CNF (probabilitats inicials).
+    :param cami_corpus: Fitxer amb una paraula per línia.
+    :param iteracions: Nombre màxim d'iteracions.
+    :param jobs: Nombre de processos.
+    :param mida_lot: Paraules per lot enviat a cada procés.
+    :param simbol_inicial: Símbol inicial; si és None es detecta automàticament.
+    :param simbols_espai: Si True, les paraules són símbols separats per espais.
+    :param directori_control: Directori on desar la gramàtica i l'estat després de cada iteració.
+        Si ja conté un punt de control, l'entrenament es reprèn des d'allà, amb el símbol inicial desat; si
+        l'entrenament desat ja havia convergit, es retorna tal com és.
+    :param tolerancia: L'entrenament s'atura si la log-versemblança millora menys que aquest valor (relatiu).
+    :param informa: Funció que rep el diccionari d'informe de cada iteració.
+    :return: Tupla (regles entrenades, llista d'informes per iteració).
+    '''
+    informes = []
+    inici_iteracio = 0
+    convergit = False
+    if directori_control is not None:
+        os.makedirs(directori_control, exist_ok=True)
+        cami_estat = os.path.join(directori_control, 'estat.json')
+        if os.path.exists(cami_estat):
+            with open(cami_estat, encoding='utf-8') as f:
+                estat = json.load(f)
+            if simbol_inicial is not None and simbol_inicial != estat['simbol_inicial']:
+                raise ValueError(f"El punt de control de {directori_control} és amb el símbol inicial "
+                                 f"{estat['simbol_inicial']}, no {simbol_inicial}.")
+            simbol_inicial = estat['simbol_inicial']
+            regles = llegir_gramatica(os.path.join(directori_control, estat['gramatica']), probabilistica=True)
+            informes = estat['informes']
+            inici_iteracio = estat['iteracio']
+            convergit = estat.get('convergit', False)
+    if convergit:
+        return regles, informes
+    if simbol_inicial is None:
+        simbol_inicial = detecta_simbol_inicial(regles, probabilistica=True)
+
+    probs = [p for _, p in regles]
+    inicialitzacio = (regles, simbol_inicial, simbols_espai)
+    pool = None
+    if jobs == 1:
+        _inicialitza_treballador(*inicialitzacio)
+    else:
+        import multiprocessing
+        pool = multiprocessing.Pool(jobs, _inicialitza_treballador, inicialitzacio)
+
+    try:
+        for iteracio in range(inici_iteracio + 1, iteracions + 1):
+            inici = time.perf_counter()
+            comptatges = [0.0] * len(probs)
+            log_versemblanca = 0.0
+            generades = no_generades = 0
+
+            def suma(resultat):
+                nonlocal log_versemblanca, generades, no_generades
+                acumulats, lv, g, ng = resultat
+                for r, c in enumerate(acumulats):
+                    if c:
+                        comptatges[r] += c
+                log_versemblanca += lv
+                generades += g
+                no_generades += ng
+
+            if pool is None:
+                for lot in llegeix_lots(cami_corpus, mida_lot):
+                    suma(processa_lot(lot, probs))
+            else:
+                # Es limita el nombre de lots en vol perquè el corpus es llegeixi de manera incremental
+                en_vol = deque()
+                for lot in llegeix_lots(cami_corpus, mida_lot):
+                    en_vol.append(pool.apply_async(processa_lot, (lot, probs)))
+                    if len(en_vol) >= 4 * jobs:
+                        suma(en_vol.popleft().get())
+                while en_vol:
+                    suma(en_vol.popleft().get())
+
+            probs = reestima(regles, comptatges)
+            regles = [(regla, p) for (regla, _), p in zip(regles, probs)]
+            temps = time.perf_counter() - inici
+            paraules = generades + no_generades
+            informe = {
+                "iteracio": iteracio,
+                "log_versemblanca": log_versemblanca,
+                "paraules": paraules,
+                "no_generades": no_generades,
+                "temps": temps,
+                "paraules_per_segon": paraules / temps if temps > 0 else 0.0,
+            }
+            informes.append(informe)
+            if informa is not None:
+                informa(informe)
+
+            if len(informes) >= 2:
+                anterior = informes[-2]["log_versemblanca"]
+                convergit = abs(log_versemblanca - anterior) <= tolerancia * abs(anterior)
+
+            if directori_control is not None:
+                nom = f"gramatica_{iteracio:04d}.txt"
+                escriure_gramatica(regles, os.path.join(directori_control, nom), probabilistica=True)
+                _desa_json({"iteracio": iteracio, "gramatica": nom, "simbol_inicial": simbol_inicial,
+                            "convergit": convergit, "informes": informes},
+                           os.path.join(directori_control, 'estat.json'))
+            if convergit:
+                break
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    return regles, informes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Entrenament EM (inside-outside) de les probabilitats d'una PCFG.")
+    parser.add_argument("gramatica", help="Gramàtica probabilística en CNF amb les probabilitats inicials.")
+    parser.add_argument("corpus", help="Fitxer amb una paraula per línia.")
+    parser.add_argument("--sortida", required=True, help="Fitxer on escriure la gramàtica entrenada.")
+    parser.add_argument("--iteracions", type=int, default=10)
+    parser.add_argument("--jobs", type=int, default=1, help="Nombre de processos (0 = tots els nuclis).")
+    parser.add_argument("--mida-lot", type=int, default=500, help="Paraules per lot enviat a cada procés.")
+    parser.add_argument("--simbol-inicial", default=None, help="Símbol inicial (per defecte es detecta).")
+    parser.add_argument("--simbols-espai", action="store_true",
+                        help="Les paraules són símbols separats per espais en lloc de caràcters.")
+    parser.add_argument("--control", default=None,
+                        help="Directori de punts de control (es reprèn l'entrenament si ja n'hi ha un).")
+    parser.add_argument("--tolerancia", type=float, default=1e-6,
+                        help="Millora relativa mínima de la log-versemblança per continuar.")
+    args = parser.parse_args(argv)
+    if args.jobs <= 0:
+        args.jobs = os.cpu_count() or 1
+
+    regles = llegir_gramatica(args.gramatica, probabilistica=True)
+    regles, _ = entrena(regles, args.corpus, args.iteracions, args.jobs, args.mida_lot, args.simbol_inicial,
+                        args.simbols_espai, args.control, args.tolerancia,
+                        informa=lambda informe: print(json.dumps(informe), file=sys.stderr, flush=True))
+    escriure_gramatica(regles, args.sortida, probabilistica=True)
+
+
+if __name__ == "__main__":
+    main()
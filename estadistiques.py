@@ -0,0 +1,180 @@
+import json
+import tracemalloc
+
+
+class EstadistiquesParse:
+    """
+    Comptadors i temps d'una execució d'un reconeixedor CKY.
+
+    S'omplen només quan el reconeixedor s'ha creat amb estadistiques=True.
+    """
+
+    def __init__(self, motor):
+        '''
+        :param motor: Nom del motor que ha fet el parse.
+        '''
+        self.motor = motor
+        self.longitud_paraula = 0
+        self.celles_omplertes = 0
+        self.celles_totals = 0
+        self.aplicacions_intentades = 0
+        self.aplicacions_exitoses = 0
+        self.ocupacio_mitjana = 0.0
+        self.ocupacio_maxima = 0
+        self.temps_diagonal = 0.0
+        self.temps_per_longitud = {}
+        self.temps_total = 0.0
+
+    def registra_ocupacio(self, mides):
+        '''
+        Calcula les estadístiques d'ocupació a partir de la mida de cada cel·la de la taula.
+
+        :param mides: Iterable amb el nombre d'elements de cada cel·la.
+        '''
+        total = maxim = omplertes = celles = 0
+        for mida in mides:
+            celles += 1
+            total += mida
+            if mida:
+                omplertes += 1
+                if mida > maxim:
+                    maxim = mida
+        self.celles_totals = celles
+        self.celles_omplertes = omplertes
+        self.ocupacio_maxima = maxim
+        self.ocupacio_mitjana = total / celles if celles else 0.0
+
+    def a_dict(self):
+        '''
+        :return: Diccionari amb totes les estadístiques.
+        '''
+        return dict(vars(self))
+
+    def a_json(self, **kwargs):
+        '''
+        :return: Les estadístiques en format JSON.
+        '''
+        return json.dumps(self.a_dict(), **kwargs)
+
+    def __repr__(self):
+        return f"EstadistiquesParse({self.a_dict()})"
+
+
+class EstadistiquesConversio:
+    """
+    Temps i nombre de regles de cada fase de la conversió CFG → CNF.
+    """
+
+    def __init__(self):
+        '''
+        Inicialitza les estadístiques sense cap fase registrada.
+        '''
+        self.fases = []
+        self.temps_total = 0.0
+
+    def registra_fase(self, nom, temps, num_regles):
+        '''
+        :param nom: Nom de la fase (per exemple 'remove_epsilon').
+        :param temps: Durada de la fase en segons.
+        :param num_regles: Nombre de regles de la gramàtica en acabar la fase.
+        '''
+        self.fases.append({"fase": nom, "temps": temps, "regles": num_regles})
+        self.temps_total += temps
+
+    def a_dict(self):
+        '''
+        :return: Diccionari amb la llista de fases i el temps total.
+        '''
+        return {"fases": list(self.fases), "temps_total": self.temps_total}
+
+    def a_json(self, **kwargs):
+        '''
+        :return: Les estadístiques en format JSON.
+        '''
+        return json.dumps(self.a_dict(), **kwargs)
+
+    def __repr__(self):
+        return f"EstadistiquesConversio({self.a_dict()})"
+
+
+class PerfilMemoria:
+    """
+    Pic de memòria i principals llocs d'assignació de cada fase d'un parse, mesurats amb tracemalloc.
+
+    S'omple només quan el reconeixedor s'ha creat amb perfil_memoria=True. Cada fase registra el pic de bytes
+    per sobre de la memòria que hi havia en començar-la, els bytes assignats durant la fase que continuen
+    vius en acabar-la (net) i les línies de codi amb més bytes nous. Fer servir tracemalloc alenteix molt el
+    parse.
+    """
+
+    def __init__(self, motor, top=5):
+        '''
+        :param motor: Nom del motor que fa el parse.
+        :param top: Nombre de llocs d'assignació que es guarden per fase.
+        '''
+        self.motor = motor
+        self.top = top
+        self.fases = []
+        self.pic = 0
+        self._propi = False
+        self._instantania = None
+        self._base = 0
+
+    def __enter__(self):
+        # Si tracemalloc ja estava actiu (per exemple, a benchmark.py) no s'atura en acabar
+        self._propi = not tracemalloc.is_tracing()
+        if self._propi:
+            tracemalloc.start()
+        # La primera instantània compila els filtres; es descarta perquè no aparegui com a assignació del parse
+        self._pren_instantania()
+        self._instantania = self._pren_instantania()
+        tracemalloc.reset_peak()
+        self._base = tracemalloc.get_traced_memory()[0]
+        return self
+
+    def __exit__(self, *excepcio):
+        self._instantania = None
+        if self._propi:
+            tracemalloc.stop()
+        return False
+
+    @staticmethod
+    def _pren_instantania():
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ))
+
+    def fase(self, nom):
+        '''
+        Tanca la fase actual amb el nom indicat i en comença una de nova.
+
+        :param nom: Nom de la fase que acaba (per exemple 'diagonal').
+        '''
+        actual, pic = tracemalloc.get_traced_memory()
+        instantania = self._pren_instantania()
+        llocs = [
+            {"lloc": f"{d.traceback[0].filename}:{d.traceback[0].lineno}", "bytes": d.size_diff, "blocs": d.count_diff}
+            for d in instantania.compare_to(self._instantania, 'lineno')[:self.top]
+            if d.size_diff > 0
+        ]
+        self.fases.append({"fase": nom, "pic": pic - self._base, "net": actual - self._base, "llocs": llocs})
+        self.pic = max(self.pic, pic - self._base)
+        self._instantania = instantania
+        tracemalloc.reset_peak()
+        self._base = tracemalloc.get_traced_memory()[0]
+
+    def a_dict(self):
+        '''
+        :return: Diccionari amb el motor, el pic màxim i la llista de fases.
+        '''
+        return {"motor": self.motor, "pic": self.pic, "fases": list(self.fases)}
+
+    def a_json(self, **kwargs):
+        '''
+        :return: El perfil en format JSON.
+        '''
+        return json.dumps(self.a_dict(), **kwargs)
+
+    def __repr__(self):
+        return f"PerfilMemoria({self.a_dict()})"
@@ -1,121 +1,249 @@
 import sys
 import io
+import csv
+import json
+import time
+import hashlib
+import tracemalloc
 from generador_gramatiques import GrammarMaker
 from generador_paraula import ParaulaAleatoria
 from extensio_base import CKY
 from extensio_1 import CFGtoCNF
 from extensio_2 import ProbabilisticCKY
+from utils import detecta_simbol_inicial
 import random
-import numpy as np
 
 RANDOM_SEED = 1234
 
 random.seed(RANDOM_SEED)
-np.random.seed(RANDOM_SEED)
 
 RESULTS_FILE = "jocs_de_proves3.txt"
 
-def run_experiment(probabilistica, cnf, pertany, experiment_num):
-    old_stdout = sys.stdout
-    sys.stdout = mystdout = io.StringIO()
+CAMPS_RESULTAT = [
+    "cas", "llavor", "probabilistica", "cnf", "pertany", "num_regles", "mida_gramatica",
+    "longitud", "paraula", "veredicte", "temps_parse", "memoria_pic",
+]
 
-    print(f"\nEXPERIMENT {experiment_num}:")
-    print(f"Probabilística: {probabilistica}")
-    print(f"CNF: {cnf}")
-    print(f"Paraula pertany: {pertany}")
 
-    gm = GrammarMaker()
-    gramatica = None
-    simbol_inicial = "S"
-    gramatica_transformada = None
+def _genera_paraula(generador, pertany):
+    """
+    Genera una paraula que pertanyi (o no) al llenguatge, amb el mateix nombre d'intents que els experiments.
 
-    if probabilistica:
-        # Gramàtica probabilística (sempre en CNF)
-        gramatica = gm.crea_gramatica(en_cnf=True, probabilistica=True)
-        print("\nGramàtica probabilística generada (CNF):")
-        for (head, body), prob in gramatica:
-            print(f"({head}, {body}) -> {prob:.4f}")
-        # Trobar símbol inicial
-        simbol_inicial = "S"
-        for (head, body), prob in gramatica:
-            if head == "S_START":
-                simbol_inicial = head
-                break
-        if simbol_inicial == "S":
-            for (head, body), prob in gramatica:
-                if head in ["ST", "S"]:
-                    simbol_inicial = head
-                    break
-        cky = ProbabilisticCKY(gramatica, start_symbol=simbol_inicial)
-        generador = ParaulaAleatoria([x[0] for x in gramatica], simbol_inicial=simbol_inicial, max_len=8)
-    else:
-        # Gramàtica no probabilística
-        gramatica = gm.crea_gramatica(en_cnf=cnf)
-        print("\nGramàtica original generada:")
-        for head, body in gramatica:
-            print(f"({head}, {body})")
-        if not cnf:
-            convertidor = CFGtoCNF(gramatica)
-            gramatica_transformada = convertidor.convert()
-            print("\n--- S'ha convertit a CNF ---")
-            print("Gramàtica transformada a CNF:")
-            for head, body in gramatica_transformada:
-                print(f"({head}, {body})")
-            gramatica_cnf = gramatica_transformada
-        else:
-            gramatica_cnf = gramatica
-
-        # Trobar símbol inicial
-        simbol_inicial = "S"
-        for r in gramatica_cnf:
-            if r[0] == "S_START":
-                simbol_inicial = r[0]
-                break
-        if simbol_inicial == "S":
-            for r in gramatica_cnf:
-                if r[0] in ["ST", "S"]:
-                    simbol_inicial = r[0]
-                    break
-        cky = CKY(gramatica_cnf, start_symbol=simbol_inicial)
-        generador = ParaulaAleatoria(gramatica_cnf, simbol_inicial=simbol_inicial, max_len=8)
-
-    # Generar la paraula
+    :return: La paraula generada, o "" si no se n'ha pogut generar cap.
+    """
     paraula = ""
     intents = 0
     if pertany:
         while paraula == "" and intents < 30:
             paraula = generador.crea_paraula(True, min_len=2)
             intents += 1
-        if paraula == "":
-            while paraula == "" and intents < 50:
-                paraula = generador.crea_paraula(True, min_len=1)
-                intents += 1
-        if paraula == "":
-            print("No s'ha pogut generar cap paraula vàlida.")
-            sys.stdout = old_stdout
-            return mystdout.getvalue()
+        while paraula == "" and intents < 50:
+            paraula = generador.crea_paraula(True, min_len=1)
+            intents += 1
     else:
         while paraula == "" and intents < 20:
             paraula = generador.crea_paraula(False)
             intents += 1
-        if paraula == "":
-            print("No s'ha pogut generar cap paraula invàlida.")
-            sys.stdout = old_stdout
-            return mystdout.getvalue()
+    return paraula
 
-    print(f"\nParaula generada: {paraula}")
+
+def _prepara_cas(probabilistica, cnf, num_regles=None, rng=None, sortida=None):
+    """
+    Genera la gramàtica d'un experiment i en construeix el reconeixedor i el generador de paraules.
+
+    :return: Tupla (gramàtica usada pel reconeixedor, reconeixedor, generador de paraules).
+    """
+    gm = GrammarMaker(rng)
+    if probabilistica:
+        # Gramàtica probabilística (sempre en CNF)
+        gramatica = gm.crea_gramatica(en_cnf=True, num_regles=num_regles, probabilistica=True)
+        if sortida is not None:
+            print("\nGramàtica probabilística generada (CNF):", file=sortida)
+            for (head, body), prob in gramatica:
+                print(f"({head}, {body}) -> {prob:.4f}", file=sortida)
+        simbol_inicial = detecta_simbol_inicial(gramatica, probabilistica=True)
+        cky = ProbabilisticCKY(gramatica, start_symbol=simbol_inicial)
+        generador = ParaulaAleatoria([x[0] for x in gramatica], simbol_inicial=simbol_inicial, max_len=8, rng=rng)
+        return gramatica, cky, generador
+
+    # Gramàtica no probabilística
+    gramatica = gm.crea_gramatica(en_cnf=cnf, num_regles=num_regles)
+    if sortida is not None:
+        print("\nGramàtica original generada:", file=sortida)
+        for head, body in gramatica:
+            print(f"({head}, {body})", file=sortida)
+    if not cnf:
+        convertidor = CFGtoCNF(gramatica)
+        gramatica_cnf = convertidor.convert()
+        if sortida is not None:
+            print("\n--- S'ha convertit a CNF ---", file=sortida)
+            print("Gramàtica transformada a CNF:", file=sortida)
+            for head, body in gramatica_cnf:
+                print(f"({head}, {body})", file=sortida)
+    else:
+        gramatica_cnf = gramatica
+
+    simbol_inicial = detecta_simbol_inicial(gramatica_cnf)
+    cky = CKY(gramatica_cnf, start_symbol=simbol_inicial)
+    generador = ParaulaAleatoria(gramatica_cnf, simbol_inicial=simbol_inicial, max_len=8, rng=rng)
+    return gramatica_cnf, cky, generador
+
+
+def run_experiment(probabilistica, cnf, pertany, experiment_num, rng=None):
+    """
+    Executa un experiment i en retorna l'informe en format text.
+
+    :param rng: Generador aleatori de l'experiment (si és None, s'usa el mòdul random).
+    """
+    sortida = io.StringIO()
+
+    print(f"\nEXPERIMENT {experiment_num}:", file=sortida)
+    print(f"Probabilística: {probabilistica}", file=sortida)
+    print(f"CNF: {cnf}", file=sortida)
+    print(f"Paraula pertany: {pertany}", file=sortida)
+
+    _, cky, generador = _prepara_cas(probabilistica, cnf, rng=rng, sortida=sortida)
+
+    # Generar la paraula
+    paraula = _genera_paraula(generador, pertany)
+    if paraula == "":
+        if pertany:
+            print("No s'ha pogut generar cap paraula vàlida.", file=sortida)
+        else:
+            print("No s'ha pogut generar cap paraula invàlida.", file=sortida)
+        return sortida.getvalue()
+
+    print(f"\nParaula generada: {paraula}", file=sortida)
     if probabilistica:
         resultat = cky.parse(list(paraula))
         if resultat is False or resultat == 0:
-            print(f"La paraula **NO** pertany al llenguatge (probabilitat = 0)")
+            print(f"La paraula **NO** pertany al llenguatge (probabilitat = 0)", file=sortida)
         else:
-            print(f"Probabilitat d'aquesta paraula segons la gramàtica: {resultat}")
+            print(f"Probabilitat d'aquesta paraula segons la gramàtica: {resultat}", file=sortida)
     else:
         resultat = cky.parse_quiet(list(paraula))
-        print(f"La paraula pertany al llenguatge de la gramàtica: {resultat}")
+        print(f"La paraula pertany al llenguatge de la gramàtica: {resultat}", file=sortida)
+
+    return sortida.getvalue()
+
+
+def llavor_cas(llavor, index):
+    """
+    Deriva la llavor d'un cas a partir de la llavor global i del seu índex.
+    No depèn de l'ordre d'execució ni del nombre de processos.
+    """
+    resum = hashlib.sha256(f"{llavor}:{index}".encode()).digest()
+    return int.from_bytes(resum[:8], "big")
+
+
+def genera_casos(num_casos, llavor=RANDOM_SEED, min_regles=4, max_regles=8):
+    """
+    Genera de manera incremental els casos d'un experiment.
+
+    Cada cas recorre les combinacions (probabilística, CNF, pertany) vàlides i té una llavor pròpia,
+    de la qual es deriven la mida de la gramàtica i tota la resta d'aleatorietat del cas.
+
+    :param num_casos: Nombre de casos a generar.
+    :param llavor: Llavor global de l'experiment.
+    :param min_regles: Nombre mínim de regles de les gramàtiques generades.
+    :param max_regles: Nombre màxim de regles de les gramàtiques generades.
+    :return: Generador de diccionaris amb la descripció de cada cas.
+    """
+    from itertools import product
+    combinacions = [c for c in product([False, True], repeat=3) if not (c[0] and not c[1])]
+    for index in range(num_casos):
+        probabilistica, cnf, pertany = combinacions[index % len(combinacions)]
+        llavor_propia = llavor_cas(llavor, index)
+        yield {
+            "cas": index,
+            "llavor": llavor_propia,
+            "probabilistica": probabilistica,
+            "cnf": cnf,
+            "pertany": pertany,
+            "num_regles": random.Random(llavor_propia).randint(min_regles, max_regles),
+        }
+
+
+def executa_cas(cas, mesura_memoria=True):
+    """
+    Executa un cas de manera autocontinguda (apte per a processos treballadors).
+
+    :param cas: Diccionari generat per genera_casos.
+    :param mesura_memoria: Si True, repeteix el parse amb tracemalloc per obtenir-ne el pic de memòria.
+    :return: Diccionari amb els camps de CAMPS_RESULTAT.
+    """
+    rng = random.Random(cas["llavor"])
+    gramatica, cky, generador = _prepara_cas(cas["probabilistica"], cas["cnf"], cas["num_regles"], rng=rng)
+    resultat = dict(cas)
+    resultat["mida_gramatica"] = len(gramatica)
+
+    paraula = _genera_paraula(generador, cas["pertany"])
+    resultat["paraula"] = paraula
+    resultat["longitud"] = len(paraula)
+    if paraula == "":
+        resultat.update(veredicte=None, temps_parse=None, memoria_pic=None)
+        return resultat
+
+    simbols = list(paraula)
+    inici = time.perf_counter()
+    veredicte = cky.parse(simbols)
+    resultat["temps_parse"] = time.perf_counter() - inici
+    if cas["probabilistica"] and veredicte is False:
+        veredicte = 0.0
+    resultat["veredicte"] = veredicte
+
+    resultat["memoria_pic"] = None
+    if mesura_memoria:
+        # El traçat alenteix el parse, per això el pic es mesura en una segona execució. El motor reutilitza la
+        # taula entre parses: s'allibera abans perquè la segona execució la torni a reservar com la primera
+        cky.allibera_taula()
+        tracemalloc.start()
+        try:
+            cky.parse(simbols)
+            resultat["memoria_pic"] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return resultat
+
+
+def executa_experiments(num_casos, cami_sortida, jobs=None, llavor=RANDOM_SEED, format_sortida=None):
+    """
+    Executa molts casos en paral·lel i n'escriu els resultats a mesura que acaben.
+
+    Els resultats de cada cas només depenen de la seva llavor, de manera que són reproduïbles
+    amb qualsevol nombre de processos (només canvia l'ordre de les files).
+
+    :param num_casos: Nombre de casos.
+    :param cami_sortida: Fitxer de sortida (.csv o .jsonl).
+    :param jobs: Nombre de processos (None = tots els nuclis, 1 = sense processos).
+    :param llavor: Llavor global de l'experiment.
+    :param format_sortida: 'csv' o 'jsonl' (per defecte, segons l'extensió del fitxer).
+    :return: Nombre de casos escrits.
+    """
+    if format_sortida is None:
+        format_sortida = "jsonl" if cami_sortida.endswith(".jsonl") else "csv"
+    casos = genera_casos(num_casos, llavor)
+    escrits = 0
+    with open(cami_sortida, "w", encoding="utf-8", newline="") as f:
+        if format_sortida == "csv":
+            escriptor = csv.DictWriter(f, fieldnames=CAMPS_RESULTAT)
+            escriptor.writeheader()
+            escriu = escriptor.writerow
+        else:
+            escriu = lambda fila: f.write(json.dumps(fila, ensure_ascii=False) + "\n")
+
+        if jobs == 1:
+            for resultat in map(executa_cas, casos):
+                escriu(resultat)
+                escrits += 1
+        else:
+            import multiprocessing
+            with multiprocessing.Pool(jobs) as pool:
+                for resultat in pool.imap_unordered(executa_cas, casos, chunksize=8):
+                    escriu(resultat)
+                    escrits += 1
+    return escrits
 
-    sys.stdout = old_stdout
-    return mystdout.getvalue()
 
 def main():
     from itertools import product
@@ -128,4 +256,14 @@ def main():
             f.write("\n" + "="*80 + "\n")
 
 if __name__ == "__main__":
-    main()
+    if len(sys.argv) > 1:
+        import argparse
+        parser = argparse.ArgumentParser(description="Experiments massius amb CKY en paral·lel.")
+        parser.add_argument("--casos", type=int, default=1000, help="Nombre de casos a generar.")
+        parser.add_argument("--sortida", default="resultats_experiments.csv", help="Fitxer .csv o .jsonl.")
+        parser.add_argument("--jobs", type=int, default=None, help="Nombre de processos (per defecte, tots).")
+        parser.add_argument("--llavor", type=int, default=RANDOM_SEED)
+        args = parser.parse_args()
+        executa_experiments(args.casos, args.sortida, jobs=args.jobs, llavor=args.llavor)
+    else:
+        main()
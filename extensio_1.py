@@ -1,23 +1,101 @@
+import time
+from collections import OrderedDict
+from itertools import product
+
+from estadistiques import EstadistiquesConversio
+
+# Tipus de símbol de la taula de símbols
+TERMINAL = 0
+NO_TERMINAL = 1
+ALTRE = 2  # ni majúscula ni minúscula: es manté tal com és, sense tractar-lo com a terminal ni com a no-terminal
+
+
 class CFGtoCNF:
     """
     Classe per convertir una gramàtica lliure de context (CFG) en Forma Normal de Chomsky (CNF).
-    
+
     Aquesta classe implementa els passos clàssics: afegir nou símbol inicial, eliminar produccions lambda,
     eliminar unitàries, substituir terminals en produccions llargues i descompondre produccions llargues.
+
+    Internament, cada símbol es converteix un sol cop en un enter (self.simbols i self.tipus formen la taula
+    de símbols) i les regles són tuples (cap, cos) d'enters guardades en un conjunt ordenat i indexades pel
+    cap. Cada fase afegeix o elimina només les regles que canvien, sense copiar la gramàtica sencera.
     """
 
-    def __init__(self, rules, start='S'):
+    def __init__(self, rules, start='S', estadistiques=False):
         """
         Inicialitza la gramàtica.
 
         :param rules: Llista de tuples, cada tupla és (no_terminal, [simbols_dreta]).
         :param start: Símbol inicial de la gramàtica (per defecte 'S').
+        :param estadistiques: Si True, convert deixa a self.estadistiques el temps de cada fase.
         """
-        self.cfg = list(rules)
+        self.instrumentat = estadistiques
+        self.estadistiques = None
         self.initial = start
-        self.has_lambda_start = any(
-            lhs == self.initial and rhs == [''] for lhs, rhs in self.cfg
-        )
+        self._carrega(rules)
+        inicial = self._index.get(start)
+        self.has_lambda_start = () in self._per_cap.get(inicial, ())
+
+    def _carrega(self, rules):
+        """
+        Crea la taula de símbols i el magatzem de regles a partir d'una llista de regles.
+        """
+        self.simbols = []
+        self.tipus = []
+        self._index = {}
+        # (cap, cos) -> None, en ordre d'inserció;  cap -> {cos: None}
+        self._regles = OrderedDict()
+        self._per_cap = {}
+        for lhs, rhs in rules:
+            self._afegeix(self._id(lhs), tuple(self._id(s) for s in rhs if s != ''))
+
+    def _id(self, simbol):
+        """
+        Retorna l'enter del símbol, afegint-lo a la taula de símbols si és nou.
+        """
+        i = self._index.get(simbol)
+        if i is None:
+            i = len(self.simbols)
+            self._index[simbol] = i
+            self.simbols.append(simbol)
+            self.tipus.append(NO_TERMINAL if simbol.isupper() else TERMINAL if simbol.islower() else ALTRE)
+        return i
+
+    def _afegeix(self, cap, cos):
+        """
+        Afegeix la regla cap → cos si no hi era.
+
+        :return: True si s'ha afegit.
+        """
+        regla = (cap, cos)
+        if regla in self._regles:
+            return False
+        self._regles[regla] = None
+        self._per_cap.setdefault(cap, {})[cos] = None
+        return True
+
+    def _elimina(self, cap, cos):
+        """
+        Elimina la regla cap → cos.
+        """
+        del self._regles[(cap, cos)]
+        del self._per_cap[cap][cos]
+
+    def _es_unitaria(self, cos):
+        return len(cos) == 1 and self.tipus[cos[0]] == NO_TERMINAL
+
+    @property
+    def cfg(self):
+        """
+        Regles actuals de la gramàtica, com a llista de tuples (no_terminal, [simbols_dreta]).
+        """
+        simbols = self.simbols
+        return [(simbols[cap], [simbols[s] for s in cos] or ['']) for cap, cos in self._regles]
+
+    @cfg.setter
+    def cfg(self, rules):
+        self._carrega(rules)
 
     def _is_cnf(self):
         """
@@ -25,14 +103,19 @@ class CFGtoCNF:
 
         :return: True si està en CNF, False altrament.
         """
-        for lhs, rhs in self.cfg:
-            if lhs != self.initial and rhs == ['']:
-                return False
-            if len(rhs) == 1 and rhs[0].isupper():
-                return False
-            if len(rhs) == 2 and not all(s.isupper() for s in rhs):
-                return False
-            if len(rhs) > 2 or len(rhs) == 0:
+        inicial = self._index.get(self.initial)
+        tipus = self.tipus
+        for cap, cos in self._regles:
+            if not cos:
+                if cap != inicial:
+                    return False
+            elif len(cos) == 1:
+                if tipus[cos[0]] == NO_TERMINAL:
+                    return False
+            elif len(cos) == 2:
+                if tipus[cos[0]] != NO_TERMINAL or tipus[cos[1]] != NO_TERMINAL:
+                    return False
+            else:
                 return False
         return True
 
@@ -41,128 +124,136 @@ class CFGtoCNF:
         Garanteix que el símbol inicial no aparegui al cos de cap regla.
         Si cal, afegeix un nou símbol inicial que apunta a l'antic.
         """
-        heads = {lhs for lhs, rhs in self.cfg}
-        for lhs, rhs in self.cfg:
-            if self.initial in rhs:
-                new_start = self.initial + "_START"
-                self.cfg = [(new_start, [self.initial])] + self.cfg
-                self.initial = new_start
-                break
+        inicial = self._id(self.initial)
+        if any(inicial in cos for cos_cap in self._per_cap.values() for cos in cos_cap):
+            new_start = self.initial + "_START"
+            nou = self._id(new_start)
+            self._afegeix(nou, (inicial,))
+            self._regles.move_to_end((nou, (inicial,)), last=False)
+            self.initial = new_start
 
     def remove_epsilon(self):
         """
         Elimina les produccions lambda (ε) i genera totes les combinacions correctes.
         Manté la possibilitat de lambda només per al símbol inicial si era possible a la gramàtica original.
         """
+        # Troba no terminals que poden derivar ε: cada regla compta els símbols del cos que encara no se
+        # sap si són anul·lables, i quan arriba a 0 el cap passa a ser anul·lable.
+        pendents = {}
+        aparicions = {}
         nullable = set()
-        # Troba no terminals que poden derivar ε
-        for lhs, rhs in self.cfg:
-            if rhs == [''] or rhs == []:
-                nullable.add(lhs)
-
-        # Propagació de nul·labilitat
-        changed = True
-        while changed:
-            changed = False
-            for lhs, rhs in self.cfg:
-                if all(sym in nullable for sym in rhs) and lhs not in nullable:
-                    nullable.add(lhs)
-                    changed = True
-
-        new_rules = []
-        for lhs, rhs in self.cfg:
-            if rhs == ['']:
+        cua = []
+        for regla in self._regles:
+            cap, cos = regla
+            if not cos:
+                if cap not in nullable:
+                    nullable.add(cap)
+                    cua.append(cap)
                 continue
-            positions = [i for i, sym in enumerate(rhs) if sym in nullable]
-            from itertools import product
+            pendents[regla] = len(cos)
+            for s in cos:
+                aparicions.setdefault(s, []).append(regla)
+        while cua:
+            simbol = cua.pop()
+            for regla in aparicions.get(simbol, ()):
+                pendents[regla] -= 1
+                if pendents[regla] == 0 and regla[0] not in nullable:
+                    nullable.add(regla[0])
+                    cua.append(regla[0])
+
+        inicial = self._id(self.initial)
+        # Si el símbol inicial és anul·lable, la paraula buida pertany al llenguatge
+        if inicial in nullable:
+            self.has_lambda_start = True
+
+        # Només canvien les regles que contenen algun símbol anul·lable
+        afectades = dict.fromkeys(regla for s in nullable for regla in aparicions.get(s, ()))
+        for cap, cos in afectades:
+            positions = [i for i, s in enumerate(cos) if s in nullable]
             for bits in product([True, False], repeat=len(positions)):
-                temp_rhs = rhs[:]
-                for bit, pos in zip(bits, positions):
-                    if bit:
-                        temp_rhs[pos] = None
-                new_rhs = [x for x in temp_rhs if x is not None]
-                if new_rhs == []:
-                    if lhs == self.initial and self.has_lambda_start:
-                        new_rules.append((lhs, ['']))
-                else:
-                    if (lhs, new_rhs) not in self.cfg and (lhs, new_rhs) not in new_rules:
-                        new_rules.append((lhs, new_rhs))
-            if not positions and (lhs, rhs) not in new_rules:
-                new_rules.append((lhs, rhs))
+                if not any(bits):
+                    continue
+                treure = {pos for bit, pos in zip(bits, positions) if bit}
+                new_rhs = tuple(s for i, s in enumerate(cos) if i not in treure)
+                if new_rhs or (cap == inicial and self.has_lambda_start):
+                    self._afegeix(cap, new_rhs)
 
-        self.cfg += new_rules
         # Elimina les regles λ (excepte si és l'inicial i la tenia originalment)
-        self.cfg = [
-            (lhs, rhs) for lhs, rhs in self.cfg
-            if rhs != [''] or (lhs == self.initial and self.has_lambda_start)
-        ]
+        for cap in nullable:
+            if () in self._per_cap.get(cap, ()) and not (cap == inicial and self.has_lambda_start):
+                self._elimina(cap, ())
 
     def eliminate_unary(self):
         """
         Elimina totes les produccions unitàries (del tipus A → B amb A, B no-terminals).
         Substitueix-les per produccions equivalents més llargues, si cal.
         """
-        unit_pairs = set()
-        for lhs, rhs in self.cfg:
-            if len(rhs) == 1 and rhs[0].isupper():
-                unit_pairs.add((lhs, rhs[0]))
-
-        added = set()
-        while unit_pairs:
-            a, b = unit_pairs.pop()
-            for lhs, rhs in self.cfg:
-                if lhs == b and not (len(rhs) == 1 and rhs[0].isupper()):
-                    if (a, tuple(rhs)) not in added and (a, rhs) not in self.cfg:
-                        self.cfg.append((a, rhs))
-                        added.add((a, tuple(rhs)))
-                if lhs == b and len(rhs) == 1 and rhs[0].isupper():
-                    if (a, rhs[0]) not in unit_pairs:
-                        unit_pairs.add((a, rhs[0]))
-        self.cfg = [
-            (lhs, rhs) for lhs, rhs in self.cfg
-            if not (len(rhs) == 1 and rhs[0].isupper())
-        ]
+        unitaries = {}
+        for cap, cos in self._regles:
+            if self._es_unitaria(cos):
+                unitaries.setdefault(cap, []).append(cos[0])
+
+        for a, directes in unitaries.items():
+            # Tancament unitari de a: tots els B amb a ⇒* B només amb regles unitàries
+            abast = set(directes)
+            pila = list(directes)
+            while pila:
+                for c in unitaries.get(pila.pop(), ()):
+                    if c not in abast:
+                        abast.add(c)
+                        pila.append(c)
+            abast.discard(a)
+            for b in abast:
+                for cos in self._per_cap.get(b, ()):
+                    if not self._es_unitaria(cos):
+                        self._afegeix(a, cos)
+
+        for a, directes in unitaries.items():
+            for b in directes:
+                self._elimina(a, (b,))
 
     def split_terminals(self):
         """
         Substitueix terminals en produccions llargues (de 2 o més símbols)
         per no-terminals auxiliars, afegint les produccions corresponents.
         """
+        tipus = self.tipus
+        afectades = [
+            (cap, cos) for cap, cos in self._regles
+            if len(cos) >= 2 and any(tipus[s] == TERMINAL for s in cos)
+        ]
         aux_map = {}
         new_rules = []
-        for i, (lhs, rhs) in enumerate(self.cfg):
-            if len(rhs) >= 2:
-                new_rhs = []
-                for s in rhs:
-                    if s.islower():
-                        if s not in aux_map:
-                            aux_sym = f"T_{s.upper()}"
-                            aux_map[s] = aux_sym
-                            new_rules.append((aux_sym, [s]))
-                        new_rhs.append(aux_map[s])
-                    else:
-                        new_rhs.append(s)
-                self.cfg[i] = (lhs, new_rhs)
-        self.cfg += new_rules
+        for cap, cos in afectades:
+            new_rhs = []
+            for s in cos:
+                if tipus[s] == TERMINAL:
+                    if s not in aux_map:
+                        aux_map[s] = self._id(f"T_{self.simbols[s].upper()}")
+                        new_rules.append((aux_map[s], (s,)))
+                    new_rhs.append(aux_map[s])
+                else:
+                    new_rhs.append(s)
+            self._elimina(cap, cos)
+            self._afegeix(cap, tuple(new_rhs))
+        for cap, cos in new_rules:
+            self._afegeix(cap, cos)
 
     def break_long_productions(self):
         """
         Redueix totes les regles amb més de dos símbols en una cadena de regles binàries.
         """
         counter = 0
-        new_cfg = []
-        for lhs, rhs in self.cfg:
-            if len(rhs) <= 2:
-                new_cfg.append((lhs, rhs))
-            else:
-                prev_nt = lhs
-                for i in range(len(rhs) - 2):
-                    counter += 1
-                    new_nt = f"Y{counter}"
-                    new_cfg.append((prev_nt, [rhs[i], new_nt]))
-                    prev_nt = new_nt
-                new_cfg.append((prev_nt, rhs[-2:]))
-        self.cfg = new_cfg
+        llargues = [(cap, cos) for cap, cos in self._regles if len(cos) > 2]
+        for cap, cos in llargues:
+            self._elimina(cap, cos)
+            prev_nt = cap
+            for i in range(len(cos) - 2):
+                counter += 1
+                new_nt = self._id(f"Y{counter}")
+                self._afegeix(prev_nt, (cos[i], new_nt))
+                prev_nt = new_nt
+            self._afegeix(prev_nt, cos[-2:])
 
     def convert(self):
         """
@@ -170,16 +261,32 @@ class CFGtoCNF:
 
         :return: Llista de tuples (no_terminal, [simbols_dreta]) en Forma Normal de Chomsky.
         """
-        self.add_new_start()
-        self.remove_epsilon()
-        self.eliminate_unary()
-        self.split_terminals()
-        self.break_long_productions()
-        self.cfg = list(dict.fromkeys((lhs, tuple(rhs)) for lhs, rhs in self.cfg))
-        self.cfg = [(lhs, list(rhs)) for lhs, rhs in self.cfg]
+        fases = [
+            ('add_new_start', self.add_new_start),
+            ('remove_epsilon', self.remove_epsilon),
+            ('eliminate_unary', self.eliminate_unary),
+            ('split_terminals', self.split_terminals),
+            ('break_long_productions', self.break_long_productions),
+            ('deduplicate', self._deduplicate),
+        ]
+        if not self.instrumentat:
+            for _, fase in fases:
+                fase()
+            return self.cfg
 
+        self.estadistiques = EstadistiquesConversio()
+        for nom, fase in fases:
+            inici = time.perf_counter()
+            fase()
+            self.estadistiques.registra_fase(nom, time.perf_counter() - inici, len(self._regles))
         return self.cfg
 
+    def _deduplicate(self):
+        """
+        Elimina les regles repetides. El magatzem de regles ja no n'admet, de manera que no cal fer res;
+        la fase es manté per compatibilitat amb les estadístiques de conversió.
+        """
+
     def __str__(self):
         """
         Retorna la gramàtica en format llegible per consola o print.
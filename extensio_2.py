@@ -1,3 +1,12 @@
+import time
+
+from cache_resultats import empremta_gramatica
+from estadistiques import EstadistiquesParse, PerfilMemoria
+from gramatica_binaria import GramaticaBinaria
+from pressupost import ParseInterromput
+from reticle import Reticle
+
+
 class ProbabilisticCKY:
     """
     Implementació de l'algorisme CKY probabilístic (PCYK).
@@ -5,19 +14,69 @@ class ProbabilisticCKY:
     Aquesta classe permet calcular la probabilitat que una paraula hagi estat generada per una gramàtica probabilística en CNF.
     """
 
-    def __init__(self, grammar, start_symbol=None):
+    def __init__(self, grammar, start_symbol=None, estadistiques=False, cache=None, perfil_memoria=False):
         """
         Inicialitza el reconeixedor CKY probabilístic.
 
+        La taula de cada parse es reutilitza a les crides següents, de manera que una mateixa instància no s'ha de
+        fer servir des de diversos fils alhora.
+
         :param grammar: Llista de tuples de la forma ((no_terminal, [simbols_dreta]), probabilitat).
         :param start_symbol: Símbol inicial de la gramàtica (opcional, si no s'indica s'agafa el primer de la llista).
+        :param estadistiques: Si True, cada parse deixa a self.estadistiques un objecte EstadistiquesParse.
+        :param cache: Objecte CacheResultats opcional on es desen els resultats de parse.
+        :param perfil_memoria: Si True, cada parse deixa a self.perfil_memoria un objecte PerfilMemoria.
         """
         self.grammar = grammar
-        self.rules_dict = self._build_rules_dict()
+        self.instrumentat = estadistiques
+        self.estadistiques = None
+        self.perfilat = perfil_memoria
+        self.perfil_memoria = None
+        self.cache = cache
         if start_symbol is None:
             self.start_symbol, _ = self.grammar[0][0]
         else:
             self.start_symbol = start_symbol
+        # Taula reutilitzable entre parses: cel·les (i, j) amb j > i, per a paraules de fins a len(_taula) símbols
+        self._taula = []
+
+    @property
+    def grammar(self):
+        return self._grammar
+
+    @grammar.setter
+    def grammar(self, grammar):
+        # Les regles es guarden com a tuples immutables, perquè una modificació in situ no deixi els índexs
+        # desfasats. Per canviar la gramàtica cal assignar una llista nova a self.grammar.
+        self._rules_dict = None
+        self._empremta = None
+        if isinstance(grammar, GramaticaBinaria):
+            # Ja és de només lectura: els índexs es construeixen dels arrays d'enters, sense descodificar les regles
+            self._grammar = grammar
+            self._terminals, self._binaries, _ = grammar.index_motor(probabilitats=True)
+            return
+        grammar = tuple(((head, tuple(body)), prob) for (head, body), prob in grammar)
+        self._grammar = grammar
+
+        # terminal -> parelles (A, p);  B -> tripletes (C, A, p) de les regles A → B C. Les regles amb
+        # probabilitat 0 no poden contribuir a cap derivació i no es guarden
+        self._terminals = {}
+        self._binaries = {}
+        for (A, body), prob in grammar:
+            if prob <= 0:
+                continue
+            if len(body) == 1:
+                self._terminals.setdefault(body[0], []).append((A, prob))
+            elif len(body) == 2:
+                B, C = body
+                self._binaries.setdefault(B, []).append((C, A, prob))
+
+    @property
+    def rules_dict(self):
+        # Es construeix la primera vegada que es demana: el parse no el necessita
+        if self._rules_dict is None:
+            self._rules_dict = self._build_rules_dict()
+        return self._rules_dict
 
     def _build_rules_dict(self):
         """
@@ -30,38 +89,226 @@ class ProbabilisticCKY:
             rules_dict[(head, tuple(body))] = prob
         return rules_dict
 
-    def parse(self, word):
+    def parse(self, word, pressupost=None):
         """
         Aplica l'algorisme CKY probabilístic a una paraula per calcular la probabilitat que pertanyi al llenguatge de la gramàtica.
 
         :param word: Llista de símbols (caràcters) que formen la paraula d'entrada.
+        :param pressupost: Objecte Pressupost opcional. Es comprova entre longituds de subcadena i, si s'esgota,
+            es llança ParseInterromput amb el progrés parcial. Cada operació és una comprovació de regla: abans de
+            cada longitud es preveu la cota (n - l + 1)·(l - 1)·|R| i es compten les comprovacions fetes de debò,
+            que són menys perquè les regles s'indexen pel primer símbol del cos.
         :return: Probabilitat (float) si la paraula pertany al llenguatge, o False si la probabilitat és 0.
         """
+        if self.cache is None:
+            return self._parse(word, pressupost)
+        return self.cache.obte(self._empremta_cache(), word, lambda: self._parse(word, pressupost))
+
+    def _empremta_cache(self):
+        """
+        Empremta de la gramàtica per a la memòria cau, calculada un cop per versió: self.grammar és immutable i
+        qualsevol canvi de gramàtica passa pel setter, que la descarta. També es recalcula si canvia el símbol inicial.
+        """
+        if self._empremta is None or self._empremta[0] != self.start_symbol:
+            self._empremta = (self.start_symbol, empremta_gramatica(self.grammar, self.start_symbol, 'probabilistic'))
+        return self._empremta[1]
+
+    def _parse(self, word, pressupost):
+        if not self.perfilat:
+            return self._omple(word, pressupost, None)
+        self.perfil_memoria = PerfilMemoria('probabilistic')
+        with self.perfil_memoria as perfil:
+            return self._omple(word, pressupost, perfil)
+
+    def allibera_taula(self):
+        """
+        Allibera la taula reutilitzable. El proper parse la torna a crear, com si fos el primer (per exemple, per
+        recuperar la memòria després d'una paraula molt llarga o per mesurar la memòria d'un parse aïllat).
+        """
+        self._taula = []
+
+    def _prepara_taula(self, n):
+        """
+        Retorna la taula per a una paraula de longitud n, amb les cel·les (i, j), j > i, buides.
+
+        Només es creen diccionaris nous quan la paraula és més llarga que totes les anteriors. Les cel·les es
+        buiden amb popitem() perquè el diccionari conservi la mida interna i no s'hagi de tornar a reservar.
+        """
+        if n > len(self._taula):
+            self._taula = [[dict() if j > i else None for j in range(n + 1)] for i in range(n)]
+            return self._taula
+        table = self._taula
+        for i in range(n):
+            fila = table[i]
+            for j in range(i + 1, n + 1):
+                cel = fila[j]
+                while cel:
+                    cel.popitem()
+        return table
+
+    def _omple(self, word, pressupost, perfil):
+        stats = EstadistiquesParse('probabilistic') if self.instrumentat else None
+        self.estadistiques = stats
+        if stats is not None:
+            inici = time.perf_counter()
+            stats.longitud_paraula = len(word)
+
         n = len(word)
         if n == 0:
             return 0.0
 
-        table = [[dict() for _ in range(n + 1)] for _ in range(n)]
+        table = self._prepara_taula(n)
+        # Comprovacions de regla fetes de debò (només es recorren les regles indexades que poden aplicar-se)
+        intentades = exitoses = 0
+        if perfil is not None:
+            perfil.fase('taula')
+        if pressupost is not None:
+            termini = pressupost.inicia()
+            inici_pressupost = time.perf_counter()
+            # Cota superior de les comprovacions de la diagonal
+            motiu = pressupost.motiu_esgotat(termini, n * len(self.grammar))
+            if motiu:
+                raise self._interromput(motiu, table, n, 0, intentades, inici_pressupost)
 
         # Omplim la diagonal (regles terminals)
+        terminals = self._terminals
         for i in range(n):
-            for (A, body), prob in self.grammar:
-                if len(body) == 1 and body[0] == word[i]:
-                    table[i][i + 1][A] = max(table[i][i + 1].get(A, 0), prob)
+            cel = table[i][i + 1]
+            for A, prob in terminals.get(word[i], ()):
+                if A not in cel or prob > cel[A]:
+                    cel[A] = prob
+                intentades += 1
+                exitoses += 1
+
+        if stats is not None:
+            stats.temps_diagonal = time.perf_counter() - inici
+            inici_longitud = time.perf_counter()
+        if perfil is not None:
+            perfil.fase('diagonal')
 
-        # Omplim la resta de la taula per subcadenes de longitud 2 a n
+        # Omplim la resta de la taula per subcadenes de longitud 2 a n. Les regles A → B C s'agrupen per B, de
+        # manera que per a cada partició només es recorren les regles dels símbols que hi ha a la cel·la esquerra
+        binaries = self._binaries
         for l in range(2, n + 1):
+            if pressupost is not None:
+                # Cota superior: cada partició podria comprovar totes les regles
+                cota = (n - l + 1) * (l - 1) * len(self.grammar)
+                motiu = pressupost.motiu_esgotat(termini, intentades + cota)
+                if motiu:
+                    raise self._interromput(motiu, table, n, l - 1, intentades, inici_pressupost)
             for i in range(n - l + 1):
                 j = i + l
+                fila = table[i]
+                cel = fila[j]
                 for k in range(i + 1, j):
-                    for (A, body), prob in self.grammar:
-                        if len(body) == 2:
-                            B, C = body
-                            prob_B = table[i][k].get(B, 0)
-                            prob_C = table[k][j].get(C, 0)
-                            if prob_B > 0 and prob_C > 0:
-                                candidate = prob * prob_B * prob_C
-                                table[i][j][A] = max(table[i][j].get(A, 0), candidate)
+                    esquerra = fila[k]
+                    dreta = table[k][j]
+                    if not esquerra or not dreta:
+                        continue
+                    for B, prob_B in esquerra.items():
+                        regles = binaries.get(B)
+                        if regles is None:
+                            continue
+                        intentades += len(regles)
+                        for C, A, prob in regles:
+                            if C in dreta:
+                                candidate = prob * prob_B * dreta[C]
+                                if A not in cel or candidate > cel[A]:
+                                    cel[A] = candidate
+                                exitoses += 1
+            if stats is not None:
+                ara = time.perf_counter()
+                stats.temps_per_longitud[l] = ara - inici_longitud
+                inici_longitud = ara
+        if perfil is not None:
+            perfil.fase('combinacio')
+
+        if stats is not None:
+            stats.aplicacions_intentades = intentades
+            stats.aplicacions_exitoses = exitoses
+            stats.registra_ocupacio(len(table[i][j]) for i in range(n) for j in range(i + 1, n + 1))
+            stats.temps_total = time.perf_counter() - inici
 
         probability = table[0][n].get(self.start_symbol, 0.0)
         return probability if probability > 0 else False
+
+    def parse_reticle(self, reticle):
+        """
+        Aplica el CKY probabilístic a un reticle de paraules i en retorna el millor camí.
+
+        La taula s'indexa per parells de nodes del reticle i es recorre un sol cop. La puntuació d'una derivació
+        és el producte de les probabilitats de les regles i dels pesos de les arestes que fa servir, de manera
+        que el resultat és el màxim sobre totes les paraules del reticle i totes les seves derivacions.
+
+        :param reticle: Reticle, o llista amb els terminals candidats de cada posició (conjunts o diccionaris
+            {terminal: pes}).
+        :return: Tupla (puntuació, camí). La puntuació és False si cap camí pertany al llenguatge; el camí és la
+            llista d'arestes (origen, desti, terminal) de la millor paraula (la paraula és [t for _, _, t in camí]).
+        """
+        reticle = Reticle.de(reticle)
+        n = reticle.nodes
+        if n == 1:
+            return False, []
+
+        table = [[dict() for _ in range(n)] for _ in range(n)]
+        # Per reconstruir el camí: (terminal,) per a les arestes, (k, B, C) per a les regles binàries
+        origens = [[dict() for _ in range(n)] for _ in range(n)]
+
+        # Omplim les cel·les de les arestes amb totes les alternatives
+        terminals = self._terminals
+        for origen, desti, simbol, pes in reticle.arestes:
+            cel = table[origen][desti]
+            for A, prob in terminals.get(simbol, ()):
+                candidate = prob * pes
+                if candidate > cel.get(A, 0):
+                    cel[A] = candidate
+                    origens[origen][desti][A] = (simbol,)
+
+        # Combinem camins de nodes i -> k -> j, per distància creixent entre nodes, amb les regles agrupades per B
+        binaries = self._binaries
+        for l in range(2, n):
+            for i in range(n - l):
+                j = i + l
+                fila = table[i]
+                cel = fila[j]
+                origens_cel = origens[i][j]
+                for k in range(i + 1, j):
+                    esquerra = fila[k]
+                    dreta = table[k][j]
+                    if not esquerra or not dreta:
+                        continue
+                    for B, prob_B in esquerra.items():
+                        for C, A, prob in binaries.get(B, ()):
+                            prob_C = dreta.get(C)
+                            if prob_C:
+                                candidate = prob * prob_B * prob_C
+                                if candidate > cel.get(A, 0):
+                                    cel[A] = candidate
+                                    origens_cel[A] = (k, B, C)
+
+        probability = table[0][n - 1].get(self.start_symbol, 0.0)
+        if probability <= 0:
+            return False, []
+
+        cami = []
+        pila = [(0, n - 1, self.start_symbol)]
+        while pila:
+            i, j, A = pila.pop()
+            origen = origens[i][j][A]
+            if len(origen) == 1:
+                cami.append((i, j, origen[0]))
+            else:
+                k, B, C = origen
+                # La dreta s'apila primer perquè el camí surti d'esquerra a dreta
+                pila.append((k, j, C))
+                pila.append((i, k, B))
+        return probability, cami
+
+    def _interromput(self, motiu, table, n, longitud, operacions, inici):
+        """
+        Crea l'excepció ParseInterromput amb el progrés de la taula (de la paraula de longitud n) fins a la
+        longitud indicada.
+        """
+        omplertes = sum(1 for l in range(1, longitud + 1) for i in range(n - l + 1) if table[i][i + l])
+        return ParseInterromput(motiu, n, longitud, omplertes, n * (n + 1) // 2, operacions,
+                                time.perf_counter() - inici)
@@ -0,0 +1,273 @@
+import hashlib
+import json
+import os
+import platform
+import random
+import sys
+import time
+from collections import Counter
+from importlib.util import find_spec
+
+from estadistiques import EstadistiquesParse
+from extensio_base import CKY
+from motors import MOTORS, MOTORS_PRESSUPOST, carrega_motor
+
+# Motors CNF entre els quals tria el motor automàtic
+CANDIDATS = ['cky', 'bitset', 'cky_plus', 'numpy']
+
+CAMI_CALIBRATGE = os.environ.get(
+    'CKY_CALIBRATGE', os.path.join(os.path.expanduser('~'), '.cache', 'cky', 'calibratge.json')
+)
+# Versió del format del fitxer de calibració. A més, una calibració només és vàlida per al codi dels motors amb
+# què es va fer (veure empremta_codi): qualsevol canvi en un motor candidat obliga a tornar a calibrar
+VERSIO_CALIBRATGE = 2
+
+# Gramàtiques de calibració (nombre de regles, nombre de no-terminals): per a cada mida de |N| n'hi ha una
+# d'esparsa i una de densa, perquè el model pugui separar l'efecte de la densitat del de la mida
+GRAMATIQUES_CALIBRATGE = ((8, 3), (16, 3), (40, 10), (120, 10), (100, 40), (400, 40))
+
+
+def densitat(num_binaries, num_no_terminals):
+    '''
+    :return: Fracció de les |N|³ regles binàries possibles que té la gramàtica.
+    '''
+    return min(1.0, num_binaries / num_no_terminals ** 3) if num_no_terminals else 0.0
+
+
+def caracteristiques(n, num_binaries, num_no_terminals):
+    '''
+    Característiques del model de cost: [1, n, n³·|R₂|, n³·|N|, n³·|R₂|·d], on |R₂| és el nombre de regles
+    binàries i d la densitat de la gramàtica. Com més densa és la gramàtica, més plenes són les cel·les i més
+    regles indexades es recorren a cada partició, de manera que el cost per regla no és constant.
+    '''
+    cub = n ** 3 / 6
+    return [1.0, float(n), cub * num_binaries, cub * num_no_terminals,
+            cub * num_binaries * densitat(num_binaries, num_no_terminals)]
+
+
+def _resol(files, temps, columnes):
+    # Mínims quadrats amb les columnes indicades, normalitzant cada columna pel seu màxim
+    escales = [max(abs(f[c]) for f in files) or 1.0 for c in columnes]
+    m = len(columnes)
+    a = [[0.0] * (m + 1) for _ in range(m)]
+    for f, t in zip(files, temps):
+        x = [f[c] / e for c, e in zip(columnes, escales)]
+        for p in range(m):
+            for q in range(m):
+                a[p][q] += x[p] * x[q]
+            a[p][m] += x[p] * t
+    # Eliminació gaussiana amb pivotatge parcial
+    for p in range(m):
+        pivot = max(range(p, m), key=lambda r: abs(a[r][p]))
+        a[p], a[pivot] = a[pivot], a[p]
+        if abs(a[p][p]) < 1e-15:
+            continue
+        for r in range(m):
+            if r != p:
+                factor = a[r][p] / a[p][p]
+                for q in range(p, m + 1):
+                    a[r][q] -= factor * a[p][q]
+    return [a[p][m] / a[p][p] / escales[p] if abs(a[p][p]) >= 1e-15 else 0.0 for p in range(m)]
+
+
+def ajusta_model(files, temps):
+    '''
+    Ajusta els coeficients no negatius del model de cost per mínims quadrats.
+
+    :param files: Llista de vectors de característiques.
+    :param temps: Temps mesurats (en segons) per a cada vector.
+    :return: Llista de coeficients, un per característica.
+    '''
+    columnes = list(range(len(files[0])))
+    while columnes:
+        coeficients = _resol(files, temps, columnes)
+        negatius = [c for c, v in zip(columnes, coeficients) if v < 0]
+        if not negatius:
+            resultat = [0.0] * len(files[0])
+            for c, v in zip(columnes, coeficients):
+                resultat[c] = v
+            return resultat
+        columnes = [c for c in columnes if c not in negatius]
+    return [0.0] * len(files[0])
+
+
+def candidats_disponibles():
+    '''
+    :return: Motors candidats que es poden fer servir en aquesta màquina (numpy només si està instal·lat).
+    '''
+    return [nom for nom in CANDIDATS if nom != 'numpy' or find_spec('numpy') is not None]
+
+
+def empremta_codi():
+    '''
+    :return: Resum (hexadecimal) del codi font dels motors candidats i d'aquest mòdul. Canvia en modificar
+        qualsevol motor, de manera que una calibració feta amb una altra versió del codi deixa de ser vàlida.
+    '''
+    resum = hashlib.blake2b(digest_size=16)
+    for modul in sorted({MOTORS[nom][0] for nom in CANDIDATS} | {'extensio_auto'}):
+        especificacio = find_spec(modul)
+        if especificacio is None or not especificacio.origin:
+            continue
+        resum.update(modul.encode('utf-8'))
+        with open(especificacio.origin, 'rb') as f:
+            resum.update(f.read())
+    return resum.hexdigest()
+
+
+def calibra(cami=None, llavor=1234, repeticions=2):
+    '''
+    Mesura cada motor candidat sobre gramàtiques i paraules sintètiques, ajusta el model de cost
+    i el desa en un fitxer JSON.
+
+    :param cami: Fitxer on desar la calibració (per defecte CAMI_CALIBRATGE).
+    :return: Diccionari amb la calibració.
+    '''
+    from generador_gramatiques import GrammarMaker
+    from generador_paraula import ParaulaAleatoria
+
+    rng = random.Random(llavor)
+    mostres = {nom: ([], []) for nom in candidats_disponibles()}
+    for num_regles, num_nt in GRAMATIQUES_CALIBRATGE:
+        regles = GrammarMaker(rng).crea_gramatica_gran(num_nt, 4, num_regles, seed=rng.random())
+        num_binaries = sum(1 for _, cos in regles if len(cos) == 2)
+        generador = ParaulaAleatoria(regles, rng=rng)
+        motors = {nom: carrega_motor(nom)(regles, start_symbol='S') for nom in mostres}
+        for longitud in (2, 4, 6, 10, 14, 20):
+            paraula = list(generador.crea_paraula_longitud(longitud)) or list('a' * longitud)
+            x = caracteristiques(longitud, num_binaries, num_nt)
+            for nom, motor in motors.items():
+                millor = float('inf')
+                for _ in range(repeticions):
+                    inici = time.perf_counter()
+                    motor.parse(paraula)
+                    millor = min(millor, time.perf_counter() - inici)
+                mostres[nom][0].append(x)
+                mostres[nom][1].append(millor)
+
+    calibratge = {
+        'versio': VERSIO_CALIBRATGE,
+        'codi': empremta_codi(),
+        'maquina': platform.node(),
+        'python': sys.version.split()[0],
+        'motors': {nom: ajusta_model(files, temps) for nom, (files, temps) in mostres.items()},
+    }
+    cami = cami or CAMI_CALIBRATGE
+    try:
+        os.makedirs(os.path.dirname(cami) or '.', exist_ok=True)
+        # Escriptura atòmica: diversos processos poden calibrar alhora
+        temporal = f"{cami}.{os.getpid()}.tmp"
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump(calibratge, f, indent=2)
+        os.replace(temporal, cami)
+    except OSError:
+        pass  # Sense permisos d'escriptura: es fa servir la calibració només en memòria
+    return calibratge
+
+
+def carrega_calibratge(cami=None):
+    '''
+    Llegeix la calibració desada; si no existeix, no és vàlida, és d'una altra versió o es va fer amb un altre
+    codi dels motors, en fa una de nova.
+
+    Amb diversos processos, cal cridar-la un sol cop al procés principal i passar el resultat a cada motor
+    (paràmetre calibratge de CKYAuto), perquè tots facin servir el mateix model.
+    '''
+    cami = cami or CAMI_CALIBRATGE
+    try:
+        with open(cami, encoding='utf-8') as f:
+            calibratge = json.load(f)
+        if (calibratge.get('versio') == VERSIO_CALIBRATGE and calibratge.get('codi') == empremta_codi()
+                and calibratge.get('motors')):
+            return calibratge
+    except (OSError, ValueError):
+        pass
+    return calibra(cami)
+
+
+class CKYAuto(CKY):
+    """
+    Motor CKY que, per a cada paraula, tria el motor candidat amb menor cost previst.
+
+    És un CKY (mateixa interfície, pressupost i memòria cau) que, darrere de parse, delega cada paraula al motor
+    candidat amb menor cost previst segons la longitud de la paraula, la mida i la densitat de la gramàtica, amb
+    coeficients obtinguts per un micro-benchmark que s'executa un sol cop a la màquina i es desa a disc (veure
+    calibra). Si el triat és 'cky', el parse el fa la mateixa instància. Les eleccions es compten a
+    self.eleccions i, si estadistiques=True, el nom del motor triat queda a self.estadistiques.motor.
+    """
+
+    def __init__(self, rules, start_symbol='S', estadistiques=False, cache=None, calibratge=None,
+                 cami_calibratge=None):
+        '''
+        Inicialitza el motor automàtic.
+
+        :param rules: Llista de tuples (no_terminal, [simbols_dreta]) que representen les regles de la gramàtica en CNF.
+        :param start_symbol: Símbol inicial de la gramàtica (per defecte 'S').
+        :param estadistiques: Si True, cada parse deixa a self.estadistiques un objecte EstadistiquesParse.
+        :param cache: Objecte CacheResultats opcional on es desen els resultats (de qualsevol motor triat).
+        :param calibratge: Calibració ja carregada (veure carrega_calibratge). Si és None, es llegeix del fitxer.
+        :param cami_calibratge: Fitxer de calibració (per defecte CAMI_CALIBRATGE).
+        '''
+        super().__init__(rules, start_symbol, estadistiques=estadistiques, cache=cache)
+        # Els altres motors reben les regles tal com han arribat (self.rules les guarda com a tuples)
+        self._regles_motors = rules
+        self.eleccions = Counter()
+        if calibratge is None:
+            calibratge = carrega_calibratge(cami_calibratge)
+        self.models = {nom: coef for nom, coef in calibratge['motors'].items() if nom in candidats_disponibles()}
+        self.num_binaries = sum(1 for _, rhs in self.rules if len(rhs) == 2)
+        self.num_no_terminals = len({lhs for lhs, _ in self.rules})
+        self._motors = {'cky': self}
+        self._eleccio_per_longitud = {}
+
+    def cost(self, nom, n):
+        '''
+        :return: Temps previst (en segons) del motor indicat per a una paraula de longitud n.
+        '''
+        x = caracteristiques(n, self.num_binaries, self.num_no_terminals)
+        return sum(c * v for c, v in zip(self.models[nom], x))
+
+    def tria(self, n, pressupost=None):
+        '''
+        :param pressupost: Si s'indica, només es consideren els motors que accepten un Pressupost.
+        :return: Nom del motor amb menor cost previst per a una paraula de longitud n.
+        '''
+        clau = (n, pressupost is not None)
+        nom = self._eleccio_per_longitud.get(clau)
+        if nom is None:
+            candidats = [m for m in self.models if pressupost is None or m in MOTORS_PRESSUPOST]
+            nom = min(candidats, key=lambda m: self.cost(m, n))
+            self._eleccio_per_longitud[clau] = nom
+        return nom
+
+    def motor(self, nom):
+        '''
+        :return: Instància (creada un sol cop) del motor indicat per a aquesta gramàtica.
+        '''
+        if nom not in self._motors:
+            self._motors[nom] = carrega_motor(nom)(self._regles_motors, start_symbol=self.start_symbol)
+        return self._motors[nom]
+
+    def _parse_quiet(self, paraula, pressupost):
+        # CKY.parse_quiet hi arriba després de consultar la memòria cau: aquí es tria el motor
+        nom = self.tria(len(paraula), pressupost)
+        self.eleccions[nom] += 1
+        if nom == 'cky':
+            return super()._parse_quiet(paraula, pressupost)
+        motor = self.motor(nom)
+        arguments = (paraula,) if pressupost is None else (paraula, pressupost)
+        if not self.instrumentat:
+            return motor.parse(*arguments)
+
+        stats = EstadistiquesParse(nom)
+        stats.longitud_paraula = len(paraula)
+        inici = time.perf_counter()
+        resultat = motor.parse(*arguments)
+        stats.temps_total = time.perf_counter() - inici
+        self.estadistiques = stats
+        return resultat
+
+
+if __name__ == '__main__':
+    # Recalibra el model de cost d'aquesta màquina
+    resultat = calibra(sys.argv[1] if len(sys.argv) > 1 else None)
+    print(json.dumps(resultat, indent=2))
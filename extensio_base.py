@@ -1,3 +1,12 @@
+import time
+
+from cache_resultats import empremta_gramatica
+from estadistiques import EstadistiquesParse, PerfilMemoria
+from gramatica_binaria import GramaticaBinaria
+from pressupost import ParseInterromput
+from reticle import Reticle
+
+
 class CKY:
     """
     Implementació de l'algorisme CKY per reconeixement de llenguatges amb gramàtiques en Forma Normal de Chomsky (CNF).
@@ -5,65 +14,272 @@ class CKY:
     Aquesta classe permet comprovar si una paraula pertany al llenguatge generat per una gramàtica donada.
     """
 
-    def __init__(self, rules, start_symbol='S'):
+    def __init__(self, rules, start_symbol='S', estadistiques=False, cache=None, perfil_memoria=False):
         '''
         Inicialitza el reconeixedor CKY.
 
+        La taula de cada parse es reutilitza a les crides següents, de manera que una mateixa instància no s'ha de
+        fer servir des de diversos fils alhora.
+
         :param rules: Llista de tuples (no_terminal, [simbols_dreta]) que representen les regles de la gramàtica en CNF.
         :param start_symbol: Símbol inicial de la gramàtica (per defecte 'S').
+        :param estadistiques: Si True, cada parse deixa a self.estadistiques un objecte EstadistiquesParse.
+        :param cache: Objecte CacheResultats opcional on es desen els resultats de parse_quiet.
+        :param perfil_memoria: Si True, cada parse deixa a self.perfil_memoria un objecte PerfilMemoria.
         '''
-        self.rules = rules
         self.start_symbol = start_symbol
-        
+        self.rules = rules
+        self.instrumentat = estadistiques
+        self.estadistiques = None
+        self.perfilat = perfil_memoria
+        self.perfil_memoria = None
+        self.cache = cache
+        # Taula reutilitzable entre parses: cel·les (i, j) amb j >= i, per a paraules de fins a len(_taula) símbols
+        self._taula = []
+
+    @property
+    def rules(self):
+        return self._rules
+
+    @rules.setter
+    def rules(self, rules):
+        # Les regles es guarden com a tuples immutables: els índexs següents es construeixen aquí i una
+        # modificació in situ (per exemple rules.append) deixaria de coincidir-hi sense que se n'assabentés ningú.
+        # Per canviar la gramàtica cal assignar una llista nova a self.rules.
+        self._empremta = None
+        if isinstance(rules, GramaticaBinaria):
+            # Ja és de només lectura: els índexs es construeixen dels arrays d'enters, sense descodificar les regles
+            self._rules = rules
+            self._terminals, self._binaries, buides = rules.index_motor()
+            self.start_generates_epsilon = self.start_symbol in buides
+            return
+        rules = tuple((lhs, tuple(rhs)) for lhs, rhs in rules)
+        self._rules = rules
+
         # Verificar si el símbol inicial pot generar epsilon
         self.start_generates_epsilon = any(
-            lhs == start_symbol and rhs == [''] 
+            lhs == self.start_symbol and rhs == ('',)
             for lhs, rhs in rules
         )
 
-    def parse(self, paraula):
+        # terminal -> caps que el generen;  B -> parelles (C, A) de les regles A → B C
+        self._terminals = {}
+        self._binaries = {}
+        for lhs, rhs in rules:
+            if len(rhs) == 1 and rhs[0].islower():
+                self._terminals.setdefault(rhs[0], []).append(lhs)
+            elif len(rhs) == 2:
+                B, C = rhs
+                self._binaries.setdefault(B, []).append((C, lhs))
+
+    def parse(self, paraula, pressupost=None):
         '''
         Comprova si la paraula proporcionada pertany al llenguatge de la gramàtica.
 
         Aquesta versió crida internament `parse_quiet`. Mantinguda per compatibilitat i debug.
 
         :param paraula: Llista de símbols (caràcters) que formen la paraula a comprovar.
+        :param pressupost: Objecte Pressupost opcional amb els límits del parse.
         :return: True si la paraula pertany al llenguatge, False altrament.
         '''
-        return self.parse_quiet(paraula)
+        return self.parse_quiet(paraula, pressupost)
 
-    def parse_quiet(self, paraula):
+    def parse_quiet(self, paraula, pressupost=None):
         '''
         Algorisme CKY sense missatges de debug.
 
         Omple la taula de programació dinàmica per a la paraula donada i comprova si el símbol inicial pot derivar-la.
 
         :param paraula: Llista de símbols (caràcters) de la paraula d'entrada.
+        :param pressupost: Objecte Pressupost opcional. Es comprova entre longituds de subcadena i, si s'esgota,
+            es llança ParseInterromput amb el progrés parcial. Cada operació és una comprovació de regla: abans de
+            cada longitud es preveu la cota (n - l + 1)·(l - 1)·|R| i es compten les comprovacions fetes de debò,
+            que són menys perquè les regles s'indexen pel primer símbol del cos.
         :return: True si la paraula pertany al llenguatge de la gramàtica, False en cas contrari.
         '''
+        if self.cache is None:
+            return self._parse_quiet(paraula, pressupost)
+        return self.cache.obte(self._empremta_cache(), paraula, lambda: self._parse_quiet(paraula, pressupost))
+
+    def _empremta_cache(self):
+        '''
+        Empremta de la gramàtica per a la memòria cau, calculada un cop per versió: self.rules és immutable i
+        qualsevol canvi de gramàtica passa pel setter, que la descarta. També es recalcula si canvia el símbol inicial.
+        '''
+        if self._empremta is None or self._empremta[0] != self.start_symbol:
+            self._empremta = (self.start_symbol, empremta_gramatica(self.rules, self.start_symbol, 'cky'))
+        return self._empremta[1]
+
+    def _parse_quiet(self, paraula, pressupost):
+        if not self.perfilat:
+            return self._omple(paraula, pressupost, None)
+        self.perfil_memoria = PerfilMemoria('cky')
+        with self.perfil_memoria as perfil:
+            return self._omple(paraula, pressupost, perfil)
+
+    def allibera_taula(self):
+        '''
+        Allibera la taula reutilitzable. El proper parse la torna a crear, com si fos el primer (per exemple, per
+        recuperar la memòria després d'una paraula molt llarga o per mesurar la memòria d'un parse aïllat).
+        '''
+        self._taula = []
+
+    def _prepara_taula(self, n):
+        '''
+        Retorna la taula per a una paraula de longitud n, amb les cel·les (i, j), j >= i, buides.
+
+        Només es creen conjunts nous quan la paraula és més llarga que totes les anteriors. Les cel·les es
+        buiden amb pop() perquè el conjunt conservi la mida interna i no s'hagi de tornar a reservar.
+        '''
+        if n > len(self._taula):
+            self._taula = [[set() if j >= i else None for j in range(n)] for i in range(n)]
+            return self._taula
+        table = self._taula
+        for i in range(n):
+            fila = table[i]
+            for j in range(i, n):
+                cel = fila[j]
+                while cel:
+                    cel.pop()
+        return table
+
+    def _omple(self, paraula, pressupost, perfil):
+        stats = EstadistiquesParse('cky') if self.instrumentat else None
+        self.estadistiques = stats
+        if stats is not None:
+            inici = time.perf_counter()
+            stats.longitud_paraula = len(paraula)
+
         # Cas especial: paraula buida
         if len(paraula) == 0:
             return self.start_generates_epsilon
         
         n = len(paraula)
-        table = [[set() for _ in range(n)] for _ in range(n)]
+        table = self._prepara_taula(n)
+        # Comprovacions de regla fetes de debò (només es recorren les regles indexades que poden aplicar-se)
+        intentades = exitoses = 0
+        if perfil is not None:
+            perfil.fase('taula')
+        if pressupost is not None:
+            termini = pressupost.inicia()
+            inici_pressupost = time.perf_counter()
+            # Cota superior de les comprovacions de la diagonal
+            motiu = pressupost.motiu_esgotat(termini, n * len(self.rules))
+            if motiu:
+                raise self._interromput(motiu, table, n, 0, intentades, inici_pressupost)
 
         # Omplir la diagonal (subcadenes de longitud 1)
+        terminals = self._terminals
         for i in range(n):
-            simbol = paraula[i]
-            for lhs, rhs in self.rules:
-                if len(rhs) == 1 and rhs[0] == simbol and rhs[0].islower():
-                    table[i][i].add(lhs)
+            caps = terminals.get(paraula[i])
+            if caps:
+                table[i][i].update(caps)
+                intentades += len(caps)
+                exitoses += len(caps)
+
+        if stats is not None:
+            stats.temps_diagonal = time.perf_counter() - inici
+            inici_longitud = time.perf_counter()
+        if perfil is not None:
+            perfil.fase('diagonal')
 
-        # Omplir la resta de la taula (subcadenes de longitud 2 a n)
+        # Omplir la resta de la taula (subcadenes de longitud 2 a n). Les regles A → B C s'agrupen per B, de
+        # manera que per a cada partició només es recorren les regles del primer símbol que hi ha a la cel·la
+        binaries = self._binaries
         for longitud in range(2, n + 1):
+            if pressupost is not None:
+                # Cota superior: cada partició podria comprovar totes les regles
+                cota = (n - longitud + 1) * (longitud - 1) * len(self.rules)
+                motiu = pressupost.motiu_esgotat(termini, intentades + cota)
+                if motiu:
+                    raise self._interromput(motiu, table, n, longitud - 1, intentades, inici_pressupost)
             for i in range(n - longitud + 1):
                 j = i + longitud - 1
+                fila = table[i]
+                cel = fila[j]
                 for k in range(i, j):
-                    for lhs, rhs in self.rules:
-                        if len(rhs) == 2:
-                            B, C = rhs
-                            if B in table[i][k] and C in table[k+1][j]:
-                                table[i][j].add(lhs)
+                    esquerra = fila[k]
+                    dreta = table[k + 1][j]
+                    if not esquerra or not dreta:
+                        continue
+                    for B in esquerra:
+                        regles = binaries.get(B)
+                        if regles is None:
+                            continue
+                        intentades += len(regles)
+                        for C, lhs in regles:
+                            if C in dreta:
+                                cel.add(lhs)
+                                exitoses += 1
+            if stats is not None:
+                ara = time.perf_counter()
+                stats.temps_per_longitud[longitud] = ara - inici_longitud
+                inici_longitud = ara
+        if perfil is not None:
+            perfil.fase('combinacio')
 
+        if stats is not None:
+            self._completa_estadistiques(stats, table, n, intentades, exitoses, inici)
         return self.start_symbol in table[0][n-1]
+
+    def parse_reticle(self, reticle):
+        '''
+        Comprova si alguna de les paraules d'un reticle pertany al llenguatge, en una sola passada de CKY.
+
+        La taula s'indexa per parells de nodes del reticle: la cel·la (i, j) conté els no-terminals que deriven
+        algun camí del node i al node j. Cada aresta inicialitza la seva cel·la amb tots els caps que generen el
+        seu terminal, de manera que el cost és cúbic en el nombre de nodes i no depèn del nombre de camins.
+
+        :param reticle: Reticle, o llista amb els terminals candidats de cada posició.
+        :return: True si algun camí del node inicial al final és una paraula del llenguatge.
+        '''
+        reticle = Reticle.de(reticle)
+        n = reticle.nodes
+        if n == 1:
+            return self.start_generates_epsilon
+
+        table = [[set() for _ in range(n)] for _ in range(n)]
+
+        # Inicialitzar les cel·les de les arestes amb totes les alternatives
+        terminals = self._terminals
+        for origen, desti, simbol, _ in reticle.arestes:
+            caps = terminals.get(simbol)
+            if caps:
+                table[origen][desti].update(caps)
+
+        # Combinar camins de nodes i -> k -> j, per distància creixent entre nodes, amb les regles agrupades per B
+        binaries = self._binaries
+        for longitud in range(2, n):
+            for i in range(n - longitud):
+                j = i + longitud
+                fila = table[i]
+                cel = fila[j]
+                for k in range(i + 1, j):
+                    esquerra = fila[k]
+                    dreta = table[k][j]
+                    if not esquerra or not dreta:
+                        continue
+                    for B in esquerra:
+                        for C, lhs in binaries.get(B, ()):
+                            if C in dreta:
+                                cel.add(lhs)
+
+        return self.start_symbol in table[0][n - 1]
+
+    def _interromput(self, motiu, table, n, longitud, operacions, inici):
+        '''
+        Crea l'excepció ParseInterromput amb el progrés de la taula (de la paraula de longitud n) fins a la
+        longitud indicada.
+        '''
+        omplertes = sum(1 for l in range(1, longitud + 1) for i in range(n - l + 1) if table[i][i + l - 1])
+        return ParseInterromput(motiu, n, longitud, omplertes, n * (n + 1) // 2, operacions,
+                                time.perf_counter() - inici)
+
+    def _completa_estadistiques(self, stats, table, n, intentades, exitoses, inici):
+        '''
+        Omple els comptadors que es poden deduir de la taula acabada, sense cost dins dels bucles.
+        '''
+        stats.aplicacions_intentades = intentades
+        stats.aplicacions_exitoses = exitoses
+        stats.registra_ocupacio(len(table[i][j]) for i in range(n) for j in range(i, n))
+        stats.temps_total = time.perf_counter() - inici
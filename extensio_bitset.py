@@ -0,0 +1,128 @@
+import time
+
+from pressupost import ParseInterromput
+
+
+class CKYBitset:
+    """
+    Implementació de l'algorisme CKY amb cel·les representades com a enters (bitsets).
+
+    Cada no-terminal té assignat un bit, de manera que una cel·la de la taula és un enter i
+    les regles binàries s'indexen pel primer símbol del cos. Reconeix el mateix llenguatge
+    que `CKY`, però evita recórrer totes les regles per a cada partició.
+    """
+
+    def __init__(self, rules, start_symbol='S'):
+        '''
+        Inicialitza el reconeixedor CKY amb bitsets.
+
+        :param rules: Llista de tuples (no_terminal, [simbols_dreta]) que representen les regles de la gramàtica en CNF.
+        :param start_symbol: Símbol inicial de la gramàtica (per defecte 'S').
+        '''
+        self.rules = rules
+        self.start_symbol = start_symbol
+        self.start_generates_epsilon = any(
+            lhs == start_symbol and tuple(rhs) == ('',)
+            for lhs, rhs in rules
+        )
+
+        # Assignació d'un bit a cada no-terminal
+        self.index = {}
+        for lhs, rhs in rules:
+            self.index.setdefault(lhs, len(self.index))
+            if len(rhs) == 2:
+                for simbol in rhs:
+                    self.index.setdefault(simbol, len(self.index))
+        self.start_mask = 1 << self.index[start_symbol] if start_symbol in self.index else 0
+
+        # terminal -> màscara de no-terminals que el generen
+        self.terminals = {}
+        # bit de B -> {bit de C: màscara de caps A amb A → B C}
+        binaries = {}
+        for lhs, rhs in rules:
+            bit_lhs = 1 << self.index[lhs]
+            if len(rhs) == 1 and rhs[0].islower():
+                self.terminals[rhs[0]] = self.terminals.get(rhs[0], 0) | bit_lhs
+            elif len(rhs) == 2:
+                B, C = rhs
+                per_c = binaries.setdefault(self.index[B], {})
+                bit_c = 1 << self.index[C]
+                per_c[bit_c] = per_c.get(bit_c, 0) | bit_lhs
+        self.binaries = {b: tuple(per_c.items()) for b, per_c in binaries.items()}
+
+    def parse(self, paraula, pressupost=None):
+        '''
+        Comprova si la paraula proporcionada pertany al llenguatge de la gramàtica.
+
+        :param paraula: Llista de símbols (caràcters) que formen la paraula a comprovar.
+        :param pressupost: Objecte Pressupost opcional amb els límits del parse.
+        :return: True si la paraula pertany al llenguatge, False altrament.
+        '''
+        return self.parse_quiet(paraula, pressupost)
+
+    def parse_quiet(self, paraula, pressupost=None):
+        '''
+        Omple la taula de bitsets i comprova si el símbol inicial deriva tota la paraula.
+
+        :param paraula: Llista de símbols (caràcters) de la paraula d'entrada.
+        :param pressupost: Objecte Pressupost opcional. Es comprova entre longituds de subcadena i, si s'esgota,
+            es llança ParseInterromput amb el progrés parcial. Cada operació és una partició (i, k, j).
+        :return: True si la paraula pertany al llenguatge de la gramàtica, False en cas contrari.
+        '''
+        n = len(paraula)
+        if n == 0:
+            return self.start_generates_epsilon
+
+        terminals = self.terminals
+        binaries = self.binaries
+        table = [[0] * n for _ in range(n)]
+        if pressupost is not None:
+            termini = pressupost.inicia()
+            inici_pressupost = time.perf_counter()
+            operacions = 0
+            motiu = pressupost.motiu_esgotat(termini, 0)
+            if motiu:
+                raise self._interromput(motiu, table, 0, operacions, inici_pressupost)
+
+        # Omplir la diagonal (subcadenes de longitud 1)
+        for i in range(n):
+            mask = terminals.get(paraula[i], 0)
+            if not mask:
+                return False
+            table[i][i] = mask
+
+        # Omplir la resta de la taula (subcadenes de longitud 2 a n)
+        for longitud in range(2, n + 1):
+            if pressupost is not None:
+                cost = (n - longitud + 1) * (longitud - 1)
+                motiu = pressupost.motiu_esgotat(termini, operacions + cost)
+                if motiu:
+                    raise self._interromput(motiu, table, longitud - 1, operacions, inici_pressupost)
+                operacions += cost
+            for i in range(n - longitud + 1):
+                j = i + longitud - 1
+                fila = table[i]
+                cel = 0
+                for k in range(i, j):
+                    esquerra = fila[k]
+                    dreta = table[k + 1][j]
+                    if not esquerra or not dreta:
+                        continue
+                    while esquerra:
+                        bit = esquerra & -esquerra
+                        esquerra ^= bit
+                        for bit_c, caps in binaries.get(bit.bit_length() - 1, ()):
+                            if dreta & bit_c:
+                                cel |= caps
+                fila[j] = cel
+
+        return bool(table[0][n - 1] & self.start_mask)
+
+    def _interromput(self, motiu, table, longitud, operacions, inici):
+        '''
+        Crea l'excepció ParseInterromput amb el progrés de la taula fins a la longitud indicada.
+        '''
+        n = len(table)
+        omplertes = sum(1 for l in range(1, longitud + 1) for i in range(n - l + 1) if table[i][i + l - 1])
+        return ParseInterromput(motiu, n, longitud, omplertes, n * (n + 1) // 2, operacions,
+                                time.perf_counter() - inici)
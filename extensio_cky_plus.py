@@ -0,0 +1,180 @@
+class CKYPlus:
+    """
+    Variant de l'algorisme CKY (CKY+) que treballa directament amb regles de qualsevol longitud.
+
+    A més dels no-terminals complets, cada cel·la guarda ítems amb punt (regla, posició) que indiquen
+    quin prefix del cos de la regla deriva la subcadena. Les regles unitàries (i les que ho són un cop
+    eliminats els símbols anul·lables) es resolen amb un tancament unitari precalculat. Així no calen
+    els símbols auxiliars `Y{n}` i `T_X` que introdueix la transformació a CNF.
+    """
+
+    def __init__(self, rules, start_symbol='S'):
+        '''
+        Inicialitza el reconeixedor CKY+.
+
+        :param rules: Llista de tuples (no_terminal, [simbols_dreta]) d'una CFG qualsevol. El cos [''] representa λ.
+        :param start_symbol: Símbol inicial de la gramàtica (per defecte 'S').
+        '''
+        self.rules = rules
+        self.start_symbol = start_symbol
+        heads = []
+        bodies = []
+        for lhs, rhs in rules:
+            heads.append(lhs)
+            bodies.append(tuple(s for s in rhs if s != ''))
+
+        # No-terminals anul·lables (deriven λ)
+        self.nullable = set()
+        changed = True
+        while changed:
+            changed = False
+            for lhs, cos in zip(heads, bodies):
+                if lhs not in self.nullable and all(s in self.nullable for s in cos):
+                    self.nullable.add(lhs)
+                    changed = True
+
+        # Tancament unitari: símbol X -> conjunt de símbols A (inclòs X) tals que A ⇒* X
+        # amb regles A → α X β on α i β són anul·lables.
+        pares = {}
+        for lhs, cos in zip(heads, bodies):
+            for pos, simbol in enumerate(cos):
+                if all(s in self.nullable for s in cos[:pos]) and all(s in self.nullable for s in cos[pos + 1:]):
+                    pares.setdefault(simbol, set()).add(lhs)
+        self.tancament = {}
+        for simbol in set(pares) | set(heads):
+            tancat = {simbol}
+            pendents = [simbol]
+            while pendents:
+                for cap in pares.get(pendents.pop(), ()):
+                    if cap not in tancat:
+                        tancat.add(cap)
+                        pendents.append(cap)
+            self.tancament[simbol] = frozenset(tancat)
+
+        # Ítems amb punt numerats: per a cada ítem, el símbol que espera (None si és complet),
+        # el cap (si és complet) i els ítems successors en avançar el punt (saltant anul·lables).
+        self.seguent = []
+        self.cap_complet = []
+        primer_item = []
+        for r, cos in enumerate(bodies):
+            primer_item.append(len(self.seguent))
+            for d in range(len(cos) + 1):
+                self.seguent.append(cos[d] if d < len(cos) else None)
+                self.cap_complet.append(heads[r] if d == len(cos) else None)
+        self.successors = []
+        for r, cos in enumerate(bodies):
+            for d in range(len(cos) + 1):
+                self.successors.append(
+                    tuple(primer_item[r] + p for p in self._punts(cos, d + 1)) if d < len(cos) else ()
+                )
+
+        # Ítems inicials (prefix buit, després de saltar anul·lables) agrupats pel símbol que esperen
+        self.inicials = {}
+        for r, cos in enumerate(bodies):
+            for d in self._punts(cos, 0):
+                if d < len(cos):
+                    self.inicials.setdefault(cos[d], []).append(primer_item[r] + d)
+
+        # Efecte precalculat d'avançar el punt d'un ítem, perquè el parse no hagi de recórrer els successors:
+        # els símbols que passen a derivar la subcadena (tancament unitari dels caps dels successors complets)
+        # i els successors incomplets, com a parelles (símbol que esperen, ítem)
+        self.completats = []
+        self.avancats = []
+        for item in range(len(self.seguent)):
+            completat = set()
+            avancat = []
+            for successor in self.successors[item]:
+                cap = self.cap_complet[successor]
+                if cap is not None:
+                    completat |= self.tancament[cap]
+                else:
+                    avancat.append((self.seguent[successor], successor))
+            self.completats.append(frozenset(completat))
+            self.avancats.append(tuple(avancat))
+        # símbol X -> parelles (símbol esperat, ítem) dels ítems incomplets que surten d'avançar un ítem inicial
+        # que esperava X
+        self.inicis = {}
+        for simbol, items in self.inicials.items():
+            self.inicis[simbol] = tuple(parella for item in items for parella in self.avancats[item])
+
+    def _punts(self, cos, d):
+        '''
+        Retorna les posicions del punt a partir de d, avançant sobre els símbols anul·lables.
+        '''
+        punts = [d]
+        while d < len(cos) and cos[d] in self.nullable:
+            d += 1
+            punts.append(d)
+        return punts
+
+    def parse(self, paraula):
+        '''
+        Comprova si la paraula proporcionada pertany al llenguatge de la gramàtica.
+
+        :param paraula: Llista de símbols (caràcters) que formen la paraula a comprovar.
+        :return: True si la paraula pertany al llenguatge, False altrament.
+        '''
+        return self.parse_quiet(paraula)
+
+    def parse_quiet(self, paraula):
+        '''
+        Omple la taula de símbols complets i ítems amb punt i comprova si el símbol inicial deriva la paraula.
+
+        :param paraula: Llista de símbols (caràcters) de la paraula d'entrada.
+        :return: True si la paraula pertany al llenguatge de la gramàtica, False en cas contrari.
+        '''
+        n = len(paraula)
+        if n == 0:
+            return self.start_symbol in self.nullable
+
+        completats = self.completats
+        avancats = self.avancats
+        inicis = self.inicis
+        tancament = self.tancament
+        buit = frozenset()
+        # passius[i][j]: símbols (terminals inclosos) que deriven paraula[i:j]
+        # actius[i][j]: {símbol esperat: ítems amb el prefix derivant paraula[i:j]}
+        passius = [[buit] * (n + 1) for _ in range(n)]
+        actius = [[None] * (n + 1) for _ in range(n)]
+
+        for longitud in range(1, n + 1):
+            for i in range(n - longitud + 1):
+                j = i + longitud
+                fila_actius = actius[i]
+                # Ítems amb prefix no buit: actius[i][k] seguits d'un símbol de passius[k][j]. Es recullen en
+                # un conjunt perquè un ítem que encaixa amb diverses particions només s'avanci un cop
+                avancen = set()
+                for k in range(i + 1, j):
+                    esperant = fila_actius[k]
+                    if not esperant:
+                        continue
+                    derivats = passius[k][j]
+                    if not derivats:
+                        continue
+                    for simbol in esperant.keys() & derivats:
+                        avancen.update(esperant[simbol])
+
+                cel = set(tancament.get(paraula[i], (paraula[i],))) if longitud == 1 else set()
+                actiu = {}
+                for item in avancen:
+                    cel |= completats[item]
+                    for simbol, successor in avancats[item]:
+                        items = actiu.get(simbol)
+                        if items is None:
+                            actiu[simbol] = {successor}
+                        else:
+                            items.add(successor)
+
+                # Ítems amb prefix buit que comencen amb un símbol que deriva tota la subcadena
+                for simbol in cel:
+                    for seguent, successor in inicis.get(simbol, ()):
+                        items = actiu.get(seguent)
+                        if items is None:
+                            actiu[seguent] = {successor}
+                        else:
+                            items.add(successor)
+
+                passius[i][j] = cel
+                fila_actius[j] = actiu
+
+        return self.start_symbol in passius[0][n]
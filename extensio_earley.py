@@ -0,0 +1,152 @@
+class Earley:
+    """
+    Reconeixedor d'Earley per a gramàtiques lliures de context qualssevol.
+
+    Treballa directament amb les regles de `utils.llegir_gramatica` (incloses les produccions λ i les
+    unitàries), sense passar per la CNF. Les prediccions de cada no-terminal es precalculen un sol cop
+    i els símbols anul·lables es tracten avançant el punt directament (tècnica d'Aycock i Horspool),
+    de manera que en gramàtiques no ambigües i gairebé deterministes el cost és gairebé lineal.
+    """
+
+    def __init__(self, rules, start_symbol='S'):
+        '''
+        Inicialitza el reconeixedor d'Earley.
+
+        :param rules: Llista de tuples (no_terminal, [simbols_dreta]). El cos [''] representa λ.
+        :param start_symbol: Símbol inicial de la gramàtica (per defecte 'S').
+        '''
+        self.rules = rules
+        self.start_symbol = start_symbol
+        self.heads = []
+        self.bodies = []
+        per_cap = {}
+        for lhs, rhs in rules:
+            cos = tuple(s for s in rhs if s != '')
+            per_cap.setdefault(lhs, []).append(len(self.heads))
+            self.heads.append(lhs)
+            self.bodies.append(cos)
+
+        # No-terminals anul·lables (deriven λ)
+        self.nullable = set()
+        changed = True
+        while changed:
+            changed = False
+            for lhs, cos in zip(self.heads, self.bodies):
+                if lhs not in self.nullable and all(s in self.nullable for s in cos):
+                    self.nullable.add(lhs)
+                    changed = True
+
+        # Predicció precalculada: no-terminal -> (ítems (regla, punt) a afegir, no-terminals predits)
+        self.prediccio = {}
+        for simbol in per_cap:
+            predits = {simbol}
+            pendents = [simbol]
+            items = []
+            while pendents:
+                cap = pendents.pop()
+                for r in per_cap[cap]:
+                    for d in self._punts(r, 0):
+                        items.append((r, d))
+                        cos = self.bodies[r]
+                        if d < len(cos) and cos[d] in per_cap and cos[d] not in predits:
+                            predits.add(cos[d])
+                            pendents.append(cos[d])
+            self.prediccio[simbol] = (items, predits)
+
+    def _punts(self, r, d):
+        '''
+        Retorna les posicions del punt a partir de d, avançant sobre els símbols anul·lables.
+        '''
+        cos = self.bodies[r]
+        punts = [d]
+        while d < len(cos) and cos[d] in self.nullable:
+            d += 1
+            punts.append(d)
+        return punts
+
+    def parse(self, paraula):
+        '''
+        Comprova si la paraula proporcionada pertany al llenguatge de la gramàtica.
+
+        :param paraula: Llista de símbols (caràcters) que formen la paraula a comprovar.
+        :return: True si la paraula pertany al llenguatge, False altrament.
+        '''
+        return self.parse_quiet(paraula)
+
+    def parse_quiet(self, paraula):
+        '''
+        Construeix els conjunts d'Earley de la paraula i comprova si el símbol inicial la deriva.
+
+        :param paraula: Llista de símbols (caràcters) de la paraula d'entrada.
+        :return: True si la paraula pertany al llenguatge de la gramàtica, False en cas contrari.
+        '''
+        n = len(paraula)
+        if self.start_symbol not in self.prediccio:
+            return False
+        if n == 0:
+            return self.start_symbol in self.nullable
+
+        bodies = self.bodies
+        heads = self.heads
+        prediccio = self.prediccio
+        # Per a cada posició: ítems esperant cada símbol {simbol: [(regla, punt, origen)]}
+        esperant = []
+
+        items = []
+        vistos = set()
+        espera = {}
+        predits = set()
+
+        def afegeix(r, d, o):
+            for punt in self._punts(r, d):
+                item = (r, punt, o)
+                if item in vistos:
+                    continue
+                vistos.add(item)
+                items.append(item)
+                cos = bodies[r]
+                if punt < len(cos):
+                    espera.setdefault(cos[punt], []).append(item)
+
+        def prediu(simbol, k):
+            llista, nous = prediccio[simbol]
+            predits.update(nous)
+            for r, d in llista:
+                item = (r, d, k)
+                if item not in vistos:
+                    vistos.add(item)
+                    items.append(item)
+                    cos = bodies[r]
+                    if d < len(cos):
+                        espera.setdefault(cos[d], []).append(item)
+
+        prediu(self.start_symbol, 0)
+        for k in range(n + 1):
+            i = 0
+            while i < len(items):
+                r, d, o = items[i]
+                i += 1
+                cos = bodies[r]
+                if d == len(cos):
+                    # Completar (les complecions amb origen k ja estan cobertes pels anul·lables)
+                    if o < k:
+                        for r2, d2, o2 in esperant[o].get(heads[r], ()):
+                            afegeix(r2, d2 + 1, o2)
+                else:
+                    simbol = cos[d]
+                    if simbol in prediccio and simbol not in predits:
+                        prediu(simbol, k)
+
+            esperant.append(espera)
+            if k == n:
+                break
+            # Escanejar el símbol k-èssim
+            seguents = espera.get(paraula[k], ())
+            if not seguents:
+                return False
+            items, vistos, espera, predits = [], set(), {}, set()
+            for r, d, o in seguents:
+                afegeix(r, d + 1, o)
+
+        start = self.start_symbol
+        return any(d == len(bodies[r]) and o == 0 and heads[r] == start for r, d, o in items)
@@ -0,0 +1,97 @@
+import numpy as np
+
+
+class CKYNumpy:
+    """
+    Implementació vectoritzada de l'algorisme CKY amb NumPy.
+
+    La taula és una matriu booleana de mida n x n x |N| i, per a cada longitud de subcadena,
+    totes les posicions inicials i tots els punts de tall es combinen alhora. És útil per a
+    paraules llargues o gramàtiques amb molts no-terminals.
+    """
+
+    def __init__(self, rules, start_symbol='S'):
+        '''
+        Inicialitza el reconeixedor CKY vectoritzat.
+
+        :param rules: Llista de tuples (no_terminal, [simbols_dreta]) que representen les regles de la gramàtica en CNF.
+        :param start_symbol: Símbol inicial de la gramàtica (per defecte 'S').
+        '''
+        self.rules = rules
+        self.start_symbol = start_symbol
+        self.start_generates_epsilon = any(
+            lhs == start_symbol and tuple(rhs) == ('',)
+            for lhs, rhs in rules
+        )
+
+        self.index = {}
+        for lhs, rhs in rules:
+            self.index.setdefault(lhs, len(self.index))
+            if len(rhs) == 2:
+                for simbol in rhs:
+                    self.index.setdefault(simbol, len(self.index))
+        num_nt = len(self.index)
+
+        # terminal -> vector booleà dels no-terminals que el generen
+        self.terminals = {}
+        caps, esquerres, dretes = [], [], []
+        for lhs, rhs in rules:
+            if len(rhs) == 1 and rhs[0].islower():
+                if rhs[0] not in self.terminals:
+                    self.terminals[rhs[0]] = np.zeros(num_nt, dtype=bool)
+                self.terminals[rhs[0]][self.index[lhs]] = True
+            elif len(rhs) == 2:
+                caps.append(self.index[lhs])
+                esquerres.append(self.index[rhs[0]])
+                dretes.append(self.index[rhs[1]])
+
+        self.esquerres = np.array(esquerres, dtype=np.intp)
+        self.dretes = np.array(dretes, dtype=np.intp)
+        # Matriu regla -> cap, per reduir les regles aplicades a no-terminals amb un producte
+        self.caps = np.zeros((len(caps), num_nt), dtype=np.float32)
+        self.caps[np.arange(len(caps)), caps] = 1.0
+        self.start_index = self.index.get(start_symbol)
+
+    def parse(self, paraula):
+        '''
+        Comprova si la paraula proporcionada pertany al llenguatge de la gramàtica.
+
+        :param paraula: Llista de símbols (caràcters) que formen la paraula a comprovar.
+        :return: True si la paraula pertany al llenguatge, False altrament.
+        '''
+        return self.parse_quiet(paraula)
+
+    def parse_quiet(self, paraula):
+        '''
+        Omple la taula booleana per longituds de subcadena i comprova el símbol inicial.
+
+        :param paraula: Llista de símbols (caràcters) de la paraula d'entrada.
+        :return: True si la paraula pertany al llenguatge de la gramàtica, False en cas contrari.
+        '''
+        n = len(paraula)
+        if n == 0:
+            return self.start_generates_epsilon
+        if self.start_index is None:
+            return False
+
+        table = np.zeros((n, n, len(self.index)), dtype=bool)
+        for i, simbol in enumerate(paraula):
+            fila = self.terminals.get(simbol)
+            if fila is None:
+                return False
+            table[i, i] = fila
+
+        if len(self.caps) == 0:
+            return n == 1 and bool(table[0, 0, self.start_index])
+
+        for longitud in range(2, n + 1):
+            m = n - longitud + 1
+            inicis = np.arange(m)[:, None]
+            talls = np.arange(longitud - 1)[None, :]
+            # esquerra[i, k] = taula[i][i+k], dreta[i, k] = taula[i+k+1][i+longitud-1]
+            esquerra = table[inicis, inicis + talls]
+            dreta = table[inicis + talls + 1, inicis + longitud - 1]
+            aplicades = (esquerra[..., self.esquerres] & dreta[..., self.dretes]).any(axis=1)
+            table[np.arange(m), np.arange(m) + longitud - 1] = (aplicades @ self.caps) > 0
+
+        return bool(table[0, n - 1, self.start_index])
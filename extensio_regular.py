@@ -0,0 +1,416 @@
+import time
+from array import array
+
+from estadistiques import EstadistiquesParse
+from extensio_base import CKY
+
+# Nombre màxim d'estats (de l'autòmat no determinista i del determinista) abans de renunciar a compilar-lo
+MAX_ESTATS = 20000
+
+
+class _MassaEstats(Exception):
+    pass
+
+
+class AFD:
+    """
+    Autòmat finit determinista complet, amb les transicions en una taula plana d'enters.
+
+    La transició de l'estat e amb el símbol d'índex s és taula[e * len(alfabet) + s]. L'estat inicial és el 0.
+    """
+
+    def __init__(self, alfabet, taula, acceptadors, accepta_buida=False):
+        '''
+        :param alfabet: Llista de terminals.
+        :param taula: array('i') amb estats * len(alfabet) transicions.
+        :param acceptadors: bytes amb un 1 per a cada estat acceptador.
+        :param accepta_buida: Si la paraula buida pertany al llenguatge.
+        '''
+        self.alfabet = alfabet
+        self.index = {simbol: i for i, simbol in enumerate(alfabet)}
+        self.taula = taula
+        self.acceptadors = acceptadors
+        self.accepta_buida = accepta_buida
+        k = len(alfabet)
+        # Estat pou: no acceptador i amb totes les transicions cap a ell mateix (-1 si no n'hi ha)
+        self.mort = next(
+            (e for e in range(len(acceptadors))
+             if not acceptadors[e] and all(taula[e * k + s] == e for s in range(k))),
+            -1
+        )
+
+    def __len__(self):
+        return len(self.acceptadors)
+
+    def reconeix(self, paraula):
+        '''
+        Recorre la paraula una sola vegada (temps lineal).
+
+        :param paraula: Llista de símbols.
+        :return: True si l'autòmat accepta la paraula.
+        '''
+        if len(paraula) == 0:
+            return self.accepta_buida
+        index = self.index
+        taula = self.taula
+        k = len(self.alfabet)
+        mort = self.mort
+        estat = 0
+        for simbol in paraula:
+            s = index.get(simbol)
+            if s is None:
+                return False
+            estat = taula[estat * k + s]
+            if estat == mort:
+                return False
+        return bool(self.acceptadors[estat])
+
+
+def _redueix(regles, simbol_inicial):
+    '''
+    Es queda amb les regles útils de la mateixa manera que les interpreta CKY: A → t (terminal en minúscula)
+    i A → B C. Elimina els no-terminals no productius i els no accessibles des del símbol inicial.
+
+    :return: Tupla (terminals {A: [t]}, binaries {A: [(B, C)]}, alfabet ordenat).
+    '''
+    terminals = {}
+    binaries = {}
+    alfabet = set()
+    for lhs, rhs in regles:
+        if len(rhs) == 1 and rhs[0].islower():
+            terminals.setdefault(lhs, []).append(rhs[0])
+            alfabet.add(rhs[0])
+        elif len(rhs) == 2:
+            binaries.setdefault(lhs, []).append(tuple(rhs))
+
+    productius = set(terminals)
+    canvi = True
+    while canvi:
+        canvi = False
+        for A, cossos in binaries.items():
+            if A not in productius and any(B in productius and C in productius for B, C in cossos):
+                productius.add(A)
+                canvi = True
+
+    accessibles = set()
+    pila = [simbol_inicial] if simbol_inicial in productius else []
+    while pila:
+        A = pila.pop()
+        if A in accessibles:
+            continue
+        accessibles.add(A)
+        for B, C in binaries.get(A, ()):
+            if B in productius and C in productius:
+                pila.extend((B, C))
+
+    terminals = {A: ts for A, ts in terminals.items() if A in accessibles}
+    binaries = {
+        A: [(B, C) for B, C in cossos if B in productius and C in productius]
+        for A, cossos in binaries.items() if A in accessibles
+    }
+    return terminals, binaries, sorted(alfabet)
+
+
+def _components(binaries, simbol_inicial):
+    '''
+    Components fortament connexes del graf A → B, A → C (algorisme de Tarjan iteratiu).
+
+    :return: Llista de components (conjunts), de manera que cada component apareix després de tots
+        els components dels quals depèn.
+    '''
+    index = {}
+    baix = {}
+    pila = []
+    a_pila = set()
+    components = []
+    comptador = 0
+    for arrel in [simbol_inicial]:
+        feina = [(arrel, iter([s for cos in binaries.get(arrel, ()) for s in cos]))]
+        index[arrel] = baix[arrel] = comptador
+        comptador += 1
+        pila.append(arrel)
+        a_pila.add(arrel)
+        while feina:
+            node, fills = feina[-1]
+            for fill in fills:
+                if fill not in index:
+                    index[fill] = baix[fill] = comptador
+                    comptador += 1
+                    pila.append(fill)
+                    a_pila.add(fill)
+                    feina.append((fill, iter([s for cos in binaries.get(fill, ()) for s in cos])))
+                    break
+                if fill in a_pila:
+                    baix[node] = min(baix[node], index[fill])
+            else:
+                feina.pop()
+                if feina:
+                    pare = feina[-1][0]
+                    baix[pare] = min(baix[pare], baix[node])
+                if baix[node] == index[node]:
+                    component = set()
+                    while True:
+                        s = pila.pop()
+                        a_pila.discard(s)
+                        component.add(s)
+                        if s == node:
+                            break
+                    components.append(component)
+    return components
+
+
+def _classifica(component, binaries):
+    '''
+    :return: 'dreta' si totes les regles recursives del component són lineals per la dreta (A → B C amb només
+        C al component), 'esquerra' si ho són per l'esquerra, o None si el component té autoencastament.
+    '''
+    tipus = set()
+    for A in component:
+        for B, C in binaries.get(A, ()):
+            b, c = B in component, C in component
+            if b and c:
+                return None
+            if c:
+                tipus.add('dreta')
+            elif b:
+                tipus.add('esquerra')
+    if len(tipus) > 1:
+        return None
+    return tipus.pop() if tipus else 'dreta'
+
+
+def sense_autoencastament(regles, simbol_inicial='S'):
+    '''
+    Comprova si una gramàtica en CNF no té autoencastament, és a dir, si cap no-terminal útil deriva u A v amb
+    u i v no buides. Aquestes gramàtiques generen llenguatges regulars.
+
+    :param regles: Llista de tuples (no_terminal, [simbols_dreta]) en CNF.
+    :param simbol_inicial: Símbol inicial de la gramàtica.
+    :return: True si la gramàtica no té autoencastament.
+    '''
+    terminals, binaries, _ = _redueix(regles, simbol_inicial)
+    return all(_classifica(c, binaries) is not None for c in _components(binaries, simbol_inicial))
+
+
+class _Constructor:
+    """
+    Autòmat no determinista amb transicions ε (símbol None) que es construeix per trossos.
+    """
+
+    def __init__(self, max_estats):
+        self.estats = 0
+        self.transicions = []
+        self.max_estats = max_estats
+
+    def nou_estat(self):
+        self.estats += 1
+        if self.estats > self.max_estats:
+            raise _MassaEstats()
+        return self.estats - 1
+
+    def insereix(self, plantilla):
+        '''
+        Afegeix una còpia de l'autòmat d'un no-terminal ja compilat.
+
+        :param plantilla: Tupla (estats, transicions, inicial, final).
+        :return: Tupla (inicial, final) de la còpia.
+        '''
+        estats, transicions, inicial, final = plantilla
+        desplacament = self.estats
+        self.estats += estats
+        if self.estats > self.max_estats:
+            raise _MassaEstats()
+        self.transicions.extend((p + desplacament, s, q + desplacament) for p, s, q in transicions)
+        return inicial + desplacament, final + desplacament
+
+
+def _afn(terminals, binaries, components, max_estats):
+    '''
+    Construeix, component a component, l'autòmat de cada no-terminal. Els no-terminals de components inferiors
+    s'insereixen com a còpies; dins d'un component lineal per la dreta cada no-terminal és un estat del qual
+    surten els seus cossos, i en un de lineal per l'esquerra és l'estat on s'arriba després de derivar-lo.
+
+    :return: Diccionari {no_terminal: (estats, transicions, inicial, final)}.
+    '''
+    plantilles = {}
+    for component in components:
+        tipus = _classifica(component, binaries)
+        c = _Constructor(max_estats)
+        estat = {A: c.nou_estat() for A in component}
+        extrem = c.nou_estat()
+        for A in component:
+            for t in terminals.get(A, ()):
+                if tipus == 'dreta':
+                    c.transicions.append((estat[A], t, extrem))
+                else:
+                    c.transicions.append((extrem, t, estat[A]))
+            for B, C in binaries.get(A, ()):
+                if tipus == 'dreta':
+                    origen, desti = estat[A], estat[C] if C in component else extrem
+                    simbols = (B,) if C in component else (B, C)
+                else:
+                    origen, desti = estat[B] if B in component else extrem, estat[A]
+                    simbols = (C,) if B in component else (B, C)
+                for simbol in simbols:
+                    inicial, final = c.insereix(plantilles[simbol])
+                    c.transicions.append((origen, None, inicial))
+                    origen = final
+                c.transicions.append((origen, None, desti))
+        for A in component:
+            if tipus == 'dreta':
+                plantilles[A] = (c.estats, c.transicions, estat[A], extrem)
+            else:
+                plantilles[A] = (c.estats, c.transicions, extrem, estat[A])
+    return plantilles
+
+
+def _determinitza(estats, transicions, inicial, final, alfabet, max_estats):
+    '''
+    Construcció per subconjunts. Retorna la taula de transicions (llista de llistes, amb l'estat 0 com a
+    inicial) i la llista d'estats acceptadors. El conjunt buit és l'estat pou.
+    '''
+    epsilon = [[] for _ in range(estats)]
+    per_simbol = [{} for _ in range(estats)]
+    for p, s, q in transicions:
+        if s is None:
+            epsilon[p].append(q)
+        else:
+            per_simbol[p].setdefault(s, []).append(q)
+
+    def tancament(conjunt):
+        pila = list(conjunt)
+        vist = set(conjunt)
+        while pila:
+            for q in epsilon[pila.pop()]:
+                if q not in vist:
+                    vist.add(q)
+                    pila.append(q)
+        return frozenset(vist)
+
+    inici = tancament([inicial])
+    numeros = {inici: 0}
+    conjunts = [inici]
+    taula = []
+    for conjunt in conjunts:
+        fila = []
+        for simbol in alfabet:
+            desti = tancament([q for p in conjunt for q in per_simbol[p].get(simbol, ())])
+            if desti not in numeros:
+                if len(conjunts) >= max_estats:
+                    raise _MassaEstats()
+                numeros[desti] = len(conjunts)
+                conjunts.append(desti)
+            fila.append(numeros[desti])
+        taula.append(fila)
+    return taula, [final in conjunt for conjunt in conjunts]
+
+
+def _minimitza(taula, acceptadors):
+    '''
+    Minimitza l'autòmat per refinament de particions (algorisme de Moore), deixant l'estat inicial com a 0.
+
+    :return: Tupla (taula, acceptadors) de l'autòmat mínim.
+    '''
+    classe = [int(a) for a in acceptadors]
+    nombre = len(set(classe))
+    while True:
+        signatures = {}
+        nova = []
+        for e, fila in enumerate(taula):
+            signatura = (classe[e], tuple(classe[d] for d in fila))
+            nova.append(signatures.setdefault(signatura, len(signatures)))
+        if len(signatures) == nombre:
+            break
+        classe, nombre = nova, len(signatures)
+
+    # Renumera les classes en ordre d'aparició des de l'estat inicial
+    ordre = {}
+    pila = [0]
+    while pila:
+        e = pila.pop()
+        if classe[e] in ordre:
+            continue
+        ordre[classe[e]] = len(ordre)
+        pila.extend(reversed(taula[e]))
+    representant = {}
+    for e in range(len(taula)):
+        if classe[e] in ordre:
+            representant.setdefault(ordre[classe[e]], e)
+    nova_taula = [[ordre[classe[d]] for d in taula[representant[c]]] for c in range(len(ordre))]
+    return nova_taula, [acceptadors[representant[c]] for c in range(len(ordre))]
+
+
+def compila_afd(regles, simbol_inicial='S', max_estats=MAX_ESTATS):
+    '''
+    Compila una gramàtica en CNF sense autoencastament en un autòmat finit determinista mínim equivalent.
+
+    :param regles: Llista de tuples (no_terminal, [simbols_dreta]) en CNF.
+    :param simbol_inicial: Símbol inicial de la gramàtica.
+    :param max_estats: Nombre màxim d'estats dels autòmats intermedis i del resultat.
+    :return: Objecte AFD, o None si la gramàtica té autoencastament o l'autòmat supera max_estats.
+    '''
+    # El cos pot ser una llista o una tupla (CKY.rules guarda les regles com a tuples)
+    accepta_buida = any(lhs == simbol_inicial and tuple(rhs) == ('',) for lhs, rhs in regles)
+    terminals, binaries, alfabet = _redueix(regles, simbol_inicial)
+    components = _components(binaries, simbol_inicial)
+    if any(_classifica(c, binaries) is None for c in components):
+        return None
+    try:
+        plantilles = _afn(terminals, binaries, components, max_estats)
+        taula, acceptadors = _determinitza(*plantilles[simbol_inicial], alfabet, max_estats)
+    except _MassaEstats:
+        return None
+    taula, acceptadors = _minimitza(taula, acceptadors)
+    return AFD(alfabet, array('i', [d for fila in taula for d in fila]), bytes(acceptadors), accepta_buida)
+
+
+class CKYRegular(CKY):
+    """
+    Reconeixedor que, si la gramàtica genera un llenguatge regular (no té autoencastament), la compila en un
+    autòmat finit determinista mínim i reconeix cada paraula en temps lineal. Si no és el cas, o si l'autòmat
+    seria massa gran, fa servir CKY.
+    """
+
+    def __init__(self, rules, start_symbol='S', max_estats=MAX_ESTATS, **opcions):
+        '''
+        Inicialitza el reconeixedor.
+
+        :param rules: Llista de tuples (no_terminal, [simbols_dreta]) que representen les regles de la gramàtica en CNF.
+        :param start_symbol: Símbol inicial de la gramàtica (per defecte 'S').
+        :param max_estats: Nombre màxim d'estats de l'autòmat.
+        :param opcions: Paràmetres addicionals de CKY. La memòria cau i les estadístiques valen per als dos casos;
+            perfil_memoria només afecta el cas CKY.
+        '''
+        super().__init__(rules, start_symbol, **opcions)
+        self.afd = compila_afd(rules, start_symbol, max_estats)
+
+    @property
+    def regular(self):
+        return self.afd is not None
+
+    def parse_quiet(self, paraula, pressupost=None):
+        '''
+        Comprova si la paraula pertany al llenguatge, amb l'autòmat si n'hi ha i amb CKY altrament. En tots dos
+        casos el resultat passa per la memòria cau (si n'hi ha) i, si estadistiques=True, deixa les estadístiques
+        a self.estadistiques (amb l'autòmat, motor 'regular' i només la longitud i el temps).
+
+        :param paraula: Llista de símbols (caràcters) de la paraula d'entrada.
+        :param pressupost: Objecte Pressupost opcional, només per al cas CKY (l'autòmat és lineal).
+        :return: True si la paraula pertany al llenguatge de la gramàtica, False en cas contrari.
+        '''
+        return super().parse_quiet(paraula, pressupost)
+
+    def _parse_quiet(self, paraula, pressupost):
+        # CKY.parse_quiet hi arriba després de consultar la memòria cau (l'empremta és la de CKY: els resultats
+        # de l'autòmat i de CKY són els mateixos)
+        if self.afd is None:
+            return super()._parse_quiet(paraula, pressupost)
+        if not self.instrumentat:
+            return self.afd.reconeix(paraula)
+        stats = EstadistiquesParse('regular')
+        stats.longitud_paraula = len(paraula)
+        inici = time.perf_counter()
+        resultat = self.afd.reconeix(paraula)
+        stats.temps_total = time.perf_counter() - inici
+        self.estadistiques = stats
+        return resultat
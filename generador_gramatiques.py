@@ -8,11 +8,14 @@ class GrammarMaker:
     Permet controlar la recursivitat i la complexitat de les regles.
     """
 
-    def __init__(self):
+    def __init__(self, rng=None):
         """
         Inicialitza la instància de GrammarMaker. Prepara les estructures
         per guardar no-terminals, regles i terminals utilitzats.
+
+        :param rng: Generador aleatori (per exemple random.Random(llavor)). Si és None, s'usa el mòdul random.
         """
+        self.rng = rng if rng is not None else random
         self.nonterminals = set()
         self.regles = []
         self.terminals_used = set()
@@ -21,18 +24,17 @@ class GrammarMaker:
         """
         Genera i retorna un nou símbol no-terminal del tipus X1, X2, ..., Xn.
         """
-        for i in range(1, 100):
-            nt = f"X{i}"
-            if nt not in self.nonterminals:
-                return nt
-        return "X" + str(random.randint(100, 999))
+        i = 1
+        while f"X{i}" in self.nonterminals:
+            i += 1
+        return f"X{i}"
 
     def _nou_terminal(self):
         """
         Retorna un nou símbol terminal aleatori entre les 26 lletres minúscules.
         """
         available = [chr(i) for i in range(ord('a'), ord('z') + 1)]
-        return random.choice(available)
+        return self.rng.choice(available)
 
     def _regla_cnf_recursiva(self, head):
         """
@@ -41,15 +43,15 @@ class GrammarMaker:
         :param head: Símbol no-terminal del cap de la regla.
         :return: Tuple (head, [cos])
         """
-        if random.random() < 0.3:  # 30% terminals
+        if self.rng.random() < 0.3:  # 30% terminals
             return (head, [self._nou_terminal()])
         else:
-            existing_nts = list(self.nonterminals - {head})
-            if len(existing_nts) >= 1 and random.random() < 0.8:
+            existing_nts = sorted(self.nonterminals - {head})
+            if len(existing_nts) >= 1 and self.rng.random() < 0.8:
                 if len(existing_nts) >= 2:
-                    nt1, nt2 = random.sample(existing_nts, 2)
+                    nt1, nt2 = self.rng.sample(existing_nts, 2)
                 else:
-                    nt1 = random.choice(existing_nts)
+                    nt1 = self.rng.choice(existing_nts)
                     nt2 = self._nou_no_terminal()
                     self.nonterminals.add(nt2)
             else:
@@ -68,23 +70,23 @@ class GrammarMaker:
         :return: Tuple (head, [cos])
         """
         opciones = []
-        if random.random() < 0.2:
+        if self.rng.random() < 0.2:
             opciones.append([self._nou_terminal()])
-        longitud = random.randint(2, 4)
+        longitud = self.rng.randint(2, 4)
         cos = []
-        existing_nts = list(self.nonterminals - {head})
+        existing_nts = sorted(self.nonterminals - {head})
         for _ in range(longitud):
-            if random.random() < 0.4:
+            if self.rng.random() < 0.4:
                 cos.append(self._nou_terminal())
             else:
-                if existing_nts and random.random() < 0.7:
-                    nt = random.choice(existing_nts)
+                if existing_nts and self.rng.random() < 0.7:
+                    nt = self.rng.choice(existing_nts)
                 else:
                     nt = self._nou_no_terminal()
                     self.nonterminals.add(nt)
                 cos.append(nt)
         opciones.append(cos)
-        return (head, random.choice(opciones))
+        return (head, self.rng.choice(opciones))
 
     def crea_gramatica_recursiva(self, en_cnf=True, num_regles=None, probabilistica=False):
         """
@@ -96,7 +98,7 @@ class GrammarMaker:
         :return: Llista de tuples (head, [cos]) o [ ((head, [cos]), prob), ... ]
         """
         if num_regles is None:
-            num_regles = random.randint(4, 8)  
+            num_regles = self.rng.randint(4, 8)  
 
         self.nonterminals = set()
         self.regles = []
@@ -119,7 +121,7 @@ class GrammarMaker:
 
         regles_agregades = len(self.regles)
         while regles_agregades < num_regles:
-            cap = random.choice(list(self.nonterminals))
+            cap = self.rng.choice(sorted(self.nonterminals))
             if en_cnf:
                 regla = self._regla_cnf_recursiva(cap)
             else:
@@ -132,7 +134,7 @@ class GrammarMaker:
                         self.nonterminals.add(simbol)
 
         # Garantir regla terminal per cada no-terminal
-        for cap in list(self.nonterminals):
+        for cap in sorted(self.nonterminals):
             has_terminal_rule = any(
                 r[0] == cap and len(r[1]) == 1 and r[1][0].islower() 
                 for r in self.regles
@@ -144,8 +146,8 @@ class GrammarMaker:
 
         # Afegir recursives extra
         for _ in range(2):
-            cap = random.choice(list(self.nonterminals))
-            other_nt = random.choice(list(self.nonterminals - {cap}))
+            cap = self.rng.choice(sorted(self.nonterminals))
+            other_nt = self.rng.choice(sorted(self.nonterminals - {cap}))
             if en_cnf:
                 recursive_rule = (cap, [cap, other_nt])
             else:
@@ -162,11 +164,11 @@ class GrammarMaker:
                 cap_a_regles[head].append(body)
             regles_prob = []
             for head, bodys in cap_a_regles.items():
-                probs = [random.random() for _ in bodys]
+                probs = [self.rng.random() for _ in bodys]
                 total = sum(probs)
                 probs = [p / total for p in probs]
                 for body, prob in zip(bodys, probs):
-                    regles_prob.append(((head, body), round(prob, 2)))
+                    regles_prob.append(((head, body), prob))
             return regles_prob
 
     def crea_gramatica(self, en_cnf=True, num_regles=None, probabilistica=False):
@@ -180,3 +182,122 @@ class GrammarMaker:
         :return: Llista de regles (veure crea_gramatica_recursiva).
         """
         return self.crea_gramatica_recursiva(en_cnf, num_regles, probabilistica)
+
+    @staticmethod
+    def alfabet(num_terminals):
+        """
+        Retorna els primers num_terminals símbols terminals: les lletres minúscules a-z i, si cal,
+        altres lletres minúscules Unicode d'un sol caràcter.
+
+        Cada terminal ha de tenir una majúscula diferent, perquè CFGtoCNF anomena els no-terminals auxiliars
+        T_<majúscula>: es descarten les lletres la majúscula de les quals coincideix amb la d'una lletra anterior
+        (ı i i, ſ i s, µ i μ). També es descarta 'ε', que llegir_gramatica interpreta com a λ.
+        """
+        terminals = []
+        majuscules = set()
+        codi = ord('a')
+        while len(terminals) < num_terminals:
+            c = chr(codi)
+            if (c.islower() and c.isalpha() and len(c.upper()) == 1 and c.upper() != c and c != 'ε'
+                    and c.upper() not in majuscules):
+                terminals.append(c)
+                majuscules.add(c.upper())
+            codi += 1
+            if codi > 0x2FFF:
+                raise ValueError(f"No hi ha prou lletres minúscules per a {num_terminals} terminals.")
+        return terminals
+
+    def crea_gramatica_gran(self, num_no_terminals, num_terminals, num_regles, ambiguitat=0.0,
+                            prob_recursio=0.2, en_cnf=True, probabilistica=False, longitud_max_cos=4,
+                            seed=None):
+        """
+        Genera gramàtiques grans (milers de no-terminals i centenars de milers de regles) amb cost O(1) per regla.
+
+        Els no-terminals són S, X1, ..., X(n-1). Primer es garanteix que tots siguin accessibles des de S
+        (cada Xi apareix al cos d'una regla d'un no-terminal anterior) i productius (cada un té una regla
+        terminal); la resta de regles fins a num_regles es generen aleatòriament. Per això num_regles
+        és com a mínim 2·num_no_terminals − 1.
+
+        :param num_no_terminals: Nombre de no-terminals (incloent-hi S).
+        :param num_terminals: Nombre de terminals diferents.
+        :param num_regles: Nombre de regles (distintes) de la gramàtica.
+        :param ambiguitat: Probabilitat que una regla nova reutilitzi el cos d'una regla existent amb un altre cap.
+        :param prob_recursio: Probabilitat que una regla nova contingui el seu propi cap al cos.
+        :param en_cnf: Si True, gramàtica en CNF; si no, cossos de longitud 1 a longitud_max_cos.
+        :param probabilistica: Si True, assigna probabilitats (normalitzades per cap, sense arrodonir).
+        :param longitud_max_cos: Longitud màxima dels cossos en mode CFG.
+        :param seed: Llavor d'un random.Random local. Si és None, s'usa el generador de la instància.
+        :return: Llista de tuples (head, [cos]) o [ ((head, [cos]), prob), ... ]
+        """
+        if num_no_terminals < 1 or num_terminals < 1:
+            raise ValueError("Calen com a mínim un no-terminal i un terminal.")
+        rng = random.Random(seed) if seed is not None else self.rng
+        nts = ['S'] + [f"X{i}" for i in range(1, num_no_terminals)]
+        terminals = self.alfabet(num_terminals)
+        num_regles = max(num_regles, 2 * num_no_terminals - 1)
+
+        vistes = set()
+        regles = []
+        cossos = []
+
+        def afegeix(cap, cos):
+            clau = (cap, tuple(cos))
+            if clau in vistes:
+                return False
+            vistes.add(clau)
+            regles.append((cap, cos))
+            if len(cos) > 1:
+                cossos.append(cos)
+            return True
+
+        def simbol():
+            if rng.random() < 0.4:
+                return rng.choice(terminals)
+            return rng.choice(nts)
+
+        def cos_aleatori(obligat=None):
+            if en_cnf:
+                cos = [rng.choice(nts), rng.choice(nts)]
+            else:
+                cos = [simbol() for _ in range(rng.randint(1, longitud_max_cos))]
+                if len(cos) == 1 and obligat is not None:
+                    cos.append(simbol())
+            if obligat is not None:
+                cos[rng.randrange(len(cos))] = obligat
+            return cos
+
+        # Accessibilitat: Xi apareix al cos d'una regla d'algun no-terminal ja accessible
+        for i in range(1, num_no_terminals):
+            while not afegeix(nts[rng.randrange(i)], cos_aleatori(nts[i])):
+                pass
+        # Productivitat: cada no-terminal té una regla terminal
+        for cap in nts:
+            afegeix(cap, [rng.choice(terminals)])
+
+        intents = 0
+        max_intents = 20 * num_regles
+        while len(regles) < num_regles and intents < max_intents:
+            intents += 1
+            cap = rng.choice(nts)
+            if cossos and rng.random() < ambiguitat:
+                cos = list(rng.choice(cossos))
+            elif rng.random() < prob_recursio:
+                cos = cos_aleatori(cap)
+            elif rng.random() < 0.2:
+                cos = [rng.choice(terminals)]
+            else:
+                cos = cos_aleatori()
+            afegeix(cap, cos)
+
+        self.nonterminals = set(nts)
+        conjunt_terminals = set(terminals)
+        self.terminals_used = {s for _, cos in regles for s in cos if s in conjunt_terminals}
+        self.regles = regles
+        if not probabilistica:
+            return regles
+
+        pesos = [rng.random() for _ in regles]
+        totals = defaultdict(float)
+        for (cap, _), pes in zip(regles, pesos):
+            totals[cap] += pes
+        return [((cap, cos), pes / totals[cap]) for (cap, cos), pes in zip(regles, pesos)]
@@ -1,23 +1,507 @@
+import math
 import random
 
+from extensio_1 import CFGtoCNF
+from extensio_bitset import CKYBitset
+
+
+class _ComptadorDerivacions:
+    """
+    Taula de programació dinàmica amb el pes total de les derivacions de cada no-terminal
+    per a cada longitud, sobre una gramàtica en CNF.
+
+    En mode exacte els pesos són enters (nombre de derivacions). En mode ponderat són reals
+    escalats per longitud (escala[n] és el logaritme del factor comú) per evitar underflow
+    amb paraules llargues.
+    """
+
+    def __init__(self, terminals, binaries, inici, buida, exacte):
+        '''
+        :param terminals: Diccionari {A: [(terminal, pes), ...]}.
+        :param binaries: Diccionari {A: [(B, C, pes), ...]}.
+        :param inici: Símbol inicial.
+        :param buida: Pes de la regla inicial → ε (0 si no n'hi ha).
+        :param exacte: Si True, els pesos són enters i la taula compta derivacions exactes.
+        '''
+        self.terminals = terminals
+        self.binaries = binaries
+        self.inici = inici
+        self.buida = buida
+        self.exacte = exacte
+        simbols = {inici} | set(terminals) | set(binaries)
+        for regles in binaries.values():
+            for B, C, _ in regles:
+                simbols.update((B, C))
+        self.no_terminals = sorted(simbols)
+        zero = 0 if exacte else 0.0
+        self.taula = {A: [zero] for A in self.no_terminals}
+        self.escala = [0.0]
+
+    def _factors(self, n):
+        # Factor d'escala relatiu de cada punt de tall k per a la longitud n
+        if self.exacte:
+            return None, [1] * n
+        exponents = [self.escala[k] + self.escala[n - k] for k in range(1, n)]
+        referencia = max(exponents)
+        return referencia, [0.0] + [math.exp(e - referencia) for e in exponents]
+
+    def amplia(self, longitud):
+        '''
+        Calcula la taula fins a la longitud indicada (inclosa).
+        '''
+        taula = self.taula
+        for n in range(len(self.escala), longitud + 1):
+            if n == 1:
+                referencia = 0.0
+                for A in self.no_terminals:
+                    taula[A].append(sum(pes for _, pes in self.terminals.get(A, ())))
+            else:
+                referencia, factors = self._factors(n)
+                for A in self.no_terminals:
+                    total = 0
+                    for B, C, pes in self.binaries.get(A, ()):
+                        files_b, files_c = taula[B], taula[C]
+                        for k in range(1, n):
+                            total += pes * files_b[k] * files_c[n - k] * factors[k]
+                    taula[A].append(total)
+            if self.exacte:
+                self.escala.append(0.0)
+                continue
+            maxim = max(taula[A][n] for A in self.no_terminals)
+            if maxim > 0:
+                for A in self.no_terminals:
+                    taula[A][n] /= maxim
+                self.escala.append(referencia + math.log(maxim))
+            else:
+                self.escala.append(0.0)
+
+    def pes(self, longitud):
+        '''
+        :return: Pes de les derivacions del símbol inicial de la longitud indicada (relatiu si no és exacte).
+        '''
+        if longitud == 0:
+            return self.buida
+        self.amplia(longitud)
+        return self.taula[self.inici][longitud]
+
+    def _tria(self, opcions, total, rng):
+        if self.exacte:
+            r = rng.randrange(total)
+        else:
+            r = rng.random() * total
+        for opcio, pes in opcions:
+            if r < pes:
+                return opcio
+            r -= pes
+        return opcions[-1][0]
+
+    def mostra(self, longitud, rng):
+        '''
+        Genera una paraula de la longitud indicada triant cada derivació amb probabilitat proporcional al seu pes.
+
+        :return: Llista de terminals, o None si no hi ha cap derivació d'aquesta longitud.
+        '''
+        if not self.pes(longitud):
+            return None
+        if longitud == 0:
+            return []
+        paraula = []
+        pila = [(self.inici, longitud)]
+        while pila:
+            A, n = pila.pop()
+            if n == 1:
+                opcions = [(t, pes) for t, pes in self.terminals.get(A, ()) if pes]
+                paraula.append(self._tria(opcions, sum(p for _, p in opcions), rng))
+                continue
+            _, factors = self._factors(n)
+            opcions = []
+            for B, C, pes in self.binaries.get(A, ()):
+                files_b, files_c = self.taula[B], self.taula[C]
+                for k in range(1, n):
+                    w = pes * files_b[k] * files_c[n - k] * factors[k]
+                    if w:
+                        opcions.append(((B, C, k), w))
+            B, C, k = self._tria(opcions, sum(w for _, w in opcions), rng)
+            pila.append((C, n - k))
+            pila.append((B, k))
+        return paraula
+
+
+def _taula_alies(pesos):
+    '''
+    Construeix la taula d'àlies de Vose per a una distribució discreta.
+
+    :param pesos: Llista de probabilitats (sumen 1).
+    :return: Tupla (llindars, alies). Per triar: u = random() * n, i = int(u); si u - i >= llindars[i], i = alies[i].
+    '''
+    n = len(pesos)
+    escalats = [p * n for p in pesos]
+    llindars = [1.0] * n
+    alies = list(range(n))
+    petits = [i for i, p in enumerate(escalats) if p < 1.0]
+    grans = [i for i, p in enumerate(escalats) if p >= 1.0]
+    while petits and grans:
+        petit = petits.pop()
+        gran = grans[-1]
+        llindars[petit] = escalats[petit]
+        alies[petit] = gran
+        escalats[gran] -= 1.0 - escalats[petit]
+        if escalats[gran] < 1.0:
+            petits.append(grans.pop())
+    # Els que queden valen 1 (llevat d'errors d'arrodoniment)
+    return llindars, alies
+
+
+class MostrejadorPCFG:
+    """
+    Generador de paraules d'una gramàtica probabilística (PCFG), a partir de les seves probabilitats.
+
+    Cada no-terminal té una taula d'àlies precalculada, de manera que triar una regla costa O(1)
+    independentment del nombre d'alternatives. Abans de construir les taules es diagnostica la gramàtica:
+    - regles amb probabilitat no positiva o amb símbols no productius (es descarten);
+    - caps amb probabilitats que no sumen 1 (es normalitzen);
+    - gramàtiques impròpies, que perden massa de probabilitat en derivacions infinites (es condicionen a
+      acabar, amb les probabilitats de terminació de cada no-terminal);
+    - gramàtiques crítiques, amb radi espectral de la matriu d'esperances (dels no-terminals accessibles des de
+      l'inicial) ≥ 1 i longitud esperada infinita
+      (es redueix el pes de les regles que allunyen de la terminació fins que el radi és radi_maxim).
+    El resultat del diagnòstic queda a self.diagnostic.
+    """
+
+    def __init__(self, regles, simbol_inicial='S', rng=None, repara=True, radi_maxim=0.95, max_longitud=10000):
+        '''
+        :param regles: Llista [((capçalera, [cos]), probabilitat), ...] (format de llegir_gramatica amb probabilistica=True).
+            Els no-terminals són els símbols que tenen alguna regla; el cos [''] representa λ.
+        :param simbol_inicial: Símbol inicial de la gramàtica.
+        :param rng: Generador aleatori (per exemple random.Random(llavor)). Si és None, s'usa el mòdul random.
+        :param repara: Si False, una gramàtica amb problemes llança ValueError en lloc de reparar-se.
+        :param radi_maxim: Radi espectral màxim admès per a la gramàtica reparada.
+        :param max_longitud: Les derivacions que superen aquesta longitud es descarten i es tornen a generar.
+        '''
+        self.rng = rng if rng is not None else random
+        self.inici = simbol_inicial
+        self.max_longitud = max_longitud
+        self.diagnostic = {
+            "regles_descartades": 0,
+            "caps_normalitzats": [],
+            "no_productius": [],
+            "probabilitat_terminacio": 1.0,
+            "radi_espectral": 0.0,
+            "radi_espectral_reparat": 0.0,
+            "factor_recursio": 1.0,
+            "descartades_per_longitud": 0,
+        }
+        problemes = []
+
+        per_cap = {}
+        for (cap, cos), prob in regles:
+            if not prob > 0:
+                self.diagnostic["regles_descartades"] += 1
+                continue
+            per_cap.setdefault(cap, []).append((tuple(s for s in cos if s != ''), float(prob)))
+        if self.diagnostic["regles_descartades"]:
+            problemes.append(f"{self.diagnostic['regles_descartades']} regles amb probabilitat no positiva")
+
+        # Símbols productius i altura mínima de derivació (els terminals tenen altura 0)
+        altura = {}
+        canvis = True
+        while canvis:
+            canvis = False
+            for cap, alternatives in per_cap.items():
+                for cos, _ in alternatives:
+                    if all(s in altura or s not in per_cap for s in cos):
+                        h = 1 + max((altura.get(s, 0) for s in cos), default=0)
+                        if h < altura.get(cap, math.inf):
+                            altura[cap] = h
+                            canvis = True
+        no_productius = sorted(set(per_cap) - set(altura))
+        if no_productius:
+            self.diagnostic["no_productius"] = no_productius
+            problemes.append(f"no-terminals no productius: {', '.join(no_productius)}")
+        if simbol_inicial not in altura:
+            raise ValueError(f"El símbol inicial {simbol_inicial} no genera cap paraula.")
+        per_cap = {
+            cap: [(cos, p) for cos, p in alternatives if all(s in altura or s not in per_cap for s in cos)]
+            for cap, alternatives in per_cap.items() if cap in altura
+        }
+
+        # Normalització per cap
+        for cap, alternatives in per_cap.items():
+            total = sum(p for _, p in alternatives)
+            if abs(total - 1.0) > 1e-9:
+                self.diagnostic["caps_normalitzats"].append(cap)
+            per_cap[cap] = [(cos, p / total) for cos, p in alternatives]
+        if self.diagnostic["caps_normalitzats"]:
+            problemes.append(f"probabilitats que no sumen 1 a {len(self.diagnostic['caps_normalitzats'])} caps")
+
+        # Amb radi espectral < 1 la gramàtica és pròpia. Si no, es calcula la probabilitat de terminació de
+        # cada no-terminal (menor punt fix de Z = F(Z)) i, si alguna és clarament < 1, es condiciona a acabar.
+        # (La iteració convergeix molt lentament en gramàtiques crítiques, per això el marge de 1e-3.)
+        # L'estructura de la matriu d'esperances (i, per tant, quins no-terminals són accessibles des de l'inicial
+        # i quins formen cicles) no canvia en condicionar ni en reduir la recursió: es calcula un sol cop
+        files = self._matriu_esperances(per_cap)
+        components = self._components_ciclics(files, simbol_inicial)
+        radi, _ = self._radi_espectral(files, components)
+        self.diagnostic["radi_espectral"] = radi
+        if radi >= 1.0 - 1e-9:
+            terminacio = self._terminacio(per_cap, altura)
+            self.diagnostic["probabilitat_terminacio"] = terminacio[simbol_inicial]
+            if min(terminacio.values()) < 1.0 - 1e-3:
+                problemes.append(f"gramàtica impròpia (probabilitat de terminació {terminacio[simbol_inicial]:.6g})")
+                per_cap = {
+                    cap: [(cos, p * math.prod(terminacio.get(s, 1.0) for s in cos) / terminacio[cap])
+                          for cos, p in alternatives]
+                    for cap, alternatives in per_cap.items()
+                }
+                radi, _ = self._radi_espectral(self._matriu_esperances(per_cap), components)
+        if radi >= 1.0 - 1e-9:
+            problemes.append(f"gramàtica crítica (radi espectral {radi:.6g})")
+            per_cap, radi = self._redueix_recursio(per_cap, altura, radi_maxim, components)
+        self.diagnostic["radi_espectral_reparat"] = radi
+
+        if problemes and not repara:
+            raise ValueError("Gramàtica probabilística incorrecta: " + "; ".join(problemes))
+        self.diagnostic["problemes"] = problemes
+        self.per_cap = per_cap
+
+        # Taules d'àlies. Els no-terminals es numeren; als cossos (invertits per a la pila) els terminals
+        # es guarden com a cadenes i els no-terminals com a enters.
+        index = {cap: i for i, cap in enumerate(per_cap)}
+        self.taules = []
+        for cap, alternatives in per_cap.items():
+            llindars, alies = _taula_alies([p for _, p in alternatives])
+            cossos = [tuple(index.get(s, s) for s in reversed(cos)) for cos, _ in alternatives]
+            self.taules.append((len(alternatives), llindars, alies, cossos))
+        self._inici = index[simbol_inicial]
+
+    @staticmethod
+    def _terminacio(per_cap, altura, tolerancia=1e-13, max_iteracions=10000):
+        '''
+        Probabilitat de terminació de cada no-terminal: menor punt fix de Z = F(Z), per iteració des de Z = 0.
+
+        Els no-terminals s'actualitzen in situ en ordre d'altura creixent (Gauss–Seidel), de manera que després
+        del primer recorregut tots tenen probabilitat positiva, i s'itera fins que el canvi màxim és menor que
+        la tolerància. En gramàtiques crítiques la convergència és lenta (l'error decreix com 1/k) i s'atura a
+        max_iteracions, amb un error de l'ordre de 1e-4, per sota del marge de 1e-3 amb què es fa servir.
+        '''
+        ordre = sorted(per_cap, key=lambda cap: altura[cap])
+        z = {cap: 0.0 for cap in per_cap}
+        for _ in range(max_iteracions):
+            canvi = 0.0
+            for cap in ordre:
+                nou = min(1.0, sum(p * math.prod(z.get(s, 1.0) for s in cos) for cos, p in per_cap[cap]))
+                canvi = max(canvi, abs(nou - z[cap]))
+                z[cap] = nou
+            if canvi < tolerancia:
+                break
+        nuls = sorted(cap for cap, valor in z.items() if not valor > 0)
+        if nuls:
+            raise ValueError("No es pot condicionar la gramàtica a acabar: la probabilitat de terminació de "
+                             f"{', '.join(nuls)} és 0 en coma flotant (derivacions massa improbables).")
+        return z
+
+    @staticmethod
+    def _matriu_esperances(per_cap):
+        '''
+        :return: Matriu d'esperances per files: {A: {B: nombre esperat de B en una expansió d'A}}.
+        '''
+        files = {}
+        for cap, alternatives in per_cap.items():
+            fila = {}
+            for cos, p in alternatives:
+                for s in cos:
+                    if s in per_cap:
+                        fila[s] = fila.get(s, 0.0) + p
+            files[cap] = fila
+        return files
+
+    @staticmethod
+    def _components_ciclics(files, simbol_inicial):
+        '''
+        Components fortament connexes del graf de la matriu d'esperances accessibles des del símbol inicial
+        (algorisme de Tarjan iteratiu), descartant les que no tenen cap cicle.
+
+        El radi espectral de la matriu, restringida als no-terminals accessibles, és el màxim dels radis dels
+        blocs d'aquestes components; la resta hi aporten 0.
+
+        :return: Llista de components (llistes de no-terminals).
+        '''
+        index = {simbol_inicial: 0}
+        baix = {simbol_inicial: 0}
+        pila = [simbol_inicial]
+        a_pila = {simbol_inicial}
+        feina = [(simbol_inicial, iter(files[simbol_inicial]))]
+        components = []
+        while feina:
+            node, fills = feina[-1]
+            for fill in fills:
+                if fill not in index:
+                    index[fill] = baix[fill] = len(index)
+                    pila.append(fill)
+                    a_pila.add(fill)
+                    feina.append((fill, iter(files[fill])))
+                    break
+                if fill in a_pila:
+                    baix[node] = min(baix[node], index[fill])
+            else:
+                feina.pop()
+                if feina:
+                    pare = feina[-1][0]
+                    baix[pare] = min(baix[pare], baix[node])
+                if baix[node] == index[node]:
+                    component = []
+                    while True:
+                        s = pila.pop()
+                        a_pila.discard(s)
+                        component.append(s)
+                        if s == node:
+                            break
+                    if len(component) > 1 or node in files[node]:
+                        components.append(component)
+        return components
+
+    @staticmethod
+    def _radi_espectral(files, components, v=None, tolerancia=1e-10, max_iteracions=10000):
+        '''
+        Fita superior del radi espectral de la matriu d'esperances (restringida als no-terminals accessibles),
+        com el màxim sobre les components cícliques del radi del seu bloc. El de cada bloc es fita per iteració
+        de la potència sobre M + I i la fita de Collatz–Wielandt, que no creix d'una iteració a la següent:
+        s'itera fins que les fites inferior i superior coincideixen, o fins que la superior deixa de baixar, amb
+        la tolerància indicada.
+
+        :param files: Matriu d'esperances (veure _matriu_esperances).
+        :param components: Components cícliques (veure _components_ciclics).
+        :param v: Vector inicial positiu (per exemple, el resultat d'una matriu semblant). Per defecte, uns.
+        :return: Tupla (fita, vector de la darrera iteració de cada bloc).
+        '''
+        radi = 0.0
+        resultat = {}
+        for component in components:
+            membres = set(component)
+            bloc = {cap: [(s, m) for s, m in files[cap].items() if s in membres] for cap in component}
+            w = {cap: max(v.get(cap, 1.0), 1e-12) if v else 1.0 for cap in component}
+            fita = math.inf
+            for _ in range(max_iteracions):
+                nou = {cap: w[cap] + sum(m * w[s] for s, m in fila) for cap, fila in bloc.items()}
+                quocients = [nou[cap] / w[cap] for cap in component if w[cap] > 0]
+                anterior, fita = fita, max(quocients) - 1.0
+                maxim = max(nou.values())
+                w = {cap: x / maxim for cap, x in nou.items()}
+                if fita - (min(quocients) - 1.0) <= tolerancia or anterior - fita <= tolerancia:
+                    break
+            radi = max(radi, fita)
+            resultat.update(w)
+        return radi, resultat
+
+    def _redueix_recursio(self, per_cap, altura, radi_maxim, components):
+        '''
+        Multiplica cada regla per t^(altura de la regla - altura del cap) i normalitza, buscant per bisecció
+        el valor de t més gran amb radi espectral ≤ radi_maxim. Amb t → 0 només queden les regles que
+        porten a la terminació més curta, que formen una gramàtica acíclica (radi 0).
+        '''
+        # L'exponent de cada regla i els no-terminals del seu cos es calculen un sol cop: cada pas de la bisecció
+        # només refà els pesos, i la iteració de la potència parteix del vector del darrer pas acceptat
+        exponents = {cap: [1 + max((altura.get(s, 0) for s in cos), default=0) - altura[cap] for cos, _ in alternatives]
+                     for cap, alternatives in per_cap.items()}
+
+        def escala(t):
+            resultat = {}
+            for cap, alternatives in per_cap.items():
+                pesos = [p * t ** e for (_, p), e in zip(alternatives, exponents[cap])]
+                total = sum(pesos)
+                resultat[cap] = [(cos, w / total) for (cos, _), w in zip(alternatives, pesos)]
+            return resultat
+
+        baix, alt = 0.0, 1.0
+        radi, v = self._radi_espectral(self._matriu_esperances(escala(0.0)), components)
+        for _ in range(30):
+            t = (baix + alt) / 2
+            r, v_t = self._radi_espectral(self._matriu_esperances(escala(t)), components, v)
+            if r <= radi_maxim:
+                baix, radi, v = t, r, v_t
+            else:
+                alt = t
+        self.diagnostic["factor_recursio"] = baix
+        return escala(baix), radi
+
+    def regles(self):
+        '''
+        :return: Les regles de la gramàtica reparada, en el format [((capçalera, [cos]), probabilitat), ...].
+        '''
+        return [((cap, list(cos) or ['']), p) for cap, alternatives in self.per_cap.items() for cos, p in alternatives]
+
+    def mostra(self):
+        '''
+        Genera una paraula seguint les probabilitats de la gramàtica.
+
+        :return: Cadena amb la paraula generada.
+        '''
+        taules = self.taules
+        aleatori = self.rng.random
+        max_longitud = self.max_longitud
+        while True:
+            pila = [self._inici]
+            sortida = []
+            while pila:
+                simbol = pila.pop()
+                if simbol.__class__ is str:
+                    sortida.append(simbol)
+                    if len(sortida) > max_longitud:
+                        break
+                    continue
+                n, llindars, alies, cossos = taules[simbol]
+                u = aleatori() * n
+                i = int(u)
+                if u - i >= llindars[i]:
+                    i = alies[i]
+                pila.extend(cossos[i])
+            else:
+                return ''.join(sortida)
+            self.diagnostic["descartades_per_longitud"] += 1
+
+    def mostra_lot(self, quantitat):
+        '''
+        :return: Llista amb la quantitat indicada de paraules generades.
+        '''
+        mostra = self.mostra
+        return [mostra() for _ in range(quantitat)]
+
+
 class ParaulaAleatoria:
     """
     Classe per a la generació de paraules (cadenes) a partir d'una gramàtica.
     Pot generar paraules que pertanyen o no pertanyen al llenguatge de la gramàtica donada.
     """
 
-    def __init__(self, regles, probabilistica=False, simbol_inicial="S", profunditat_max=15, max_len=8):
+    def __init__(self, regles, probabilistica=False, simbol_inicial="S", profunditat_max=15, max_len=8, rng=None):
         """
         Inicialitza el generador de paraules.
 
         :param regles: Llista de regles de la gramàtica (tuples del tipus (capçalera, [cos])).
-        :param probabilistica: Booleà, indica si la gramàtica és probabilística (no es fa servir directament aquí).
+        :param probabilistica: Booleà, indica si la gramàtica és probabilística. En aquest cas les regles tenen
+            el format ((capçalera, [cos]), probabilitat) i les probabilitats es fan servir a crea_paraula_longitud
+            i crea_paraula_pcfg.
         :param simbol_inicial: Símbol inicial per començar la generació (per defecte "S").
         :param profunditat_max: Profunditat màxima de recursió per evitar bucles infinits.
         :param max_len: Longitud màxima de la paraula generada.
+        :param rng: Generador aleatori (per exemple random.Random(llavor)). Si és None, s'usa el mòdul random.
         """
-        self.regles = regles
+        self.rng = rng if rng is not None else random
         self.es_prob = probabilistica
+        self.probabilitats = {}
+        self.regles_probabilistiques = regles if probabilistica else None
+        self._mostrejador = None
+        if probabilistica:
+            self.probabilitats = {(head, tuple(body)): prob for (head, body), prob in regles}
+            regles = [regla for regla, _ in regles]
+        self.regles = regles
+        # Índex capçalera -> regles, per no recórrer totes les regles a cada expansió
+        self.per_cap = {}
+        for regla in regles:
+            self.per_cap.setdefault(regla[0], []).append(regla)
+        self._comptadors = {}
+        self._cnf = None
+        self.estadistiques_negatives = None
         self.inici = simbol_inicial
         self.profunditat_max = profunditat_max
         self.max_len = max_len
@@ -56,6 +540,172 @@ class ParaulaAleatoria:
                 return ''
             return self._modificar_paraula(base)
 
+    def crea_paraula_longitud(self, longitud, ponderada=False):
+        """
+        Genera una paraula de longitud exacta sense cap bucle de rebuig.
+
+        Es precalcula, per programació dinàmica, el nombre de derivacions de cada (no-terminal, longitud)
+        i es tria cada regla i cada punt de tall proporcionalment a aquest nombre. Així, en mode uniforme
+        totes les derivacions de la longitud demanada són equiprobables. Si la gramàtica no és en CNF,
+        es transforma abans amb CFGtoCNF i el mostreig és uniforme sobre les derivacions de la CNF.
+
+        :param longitud: Longitud exacta de la paraula.
+        :param ponderada: Si True, cada derivació es pondera pel producte de les probabilitats de les seves
+            regles (cal una gramàtica probabilística en CNF).
+        :return: Cadena amb la paraula generada, o "" si la gramàtica no genera cap paraula d'aquesta longitud.
+        """
+        paraula = self._comptador(ponderada).mostra(longitud, self.rng)
+        return ''.join(paraula) if paraula else ''
+
+    def crea_paraula_pcfg(self, quantitat=None):
+        """
+        Genera paraules seguint les probabilitats de la gramàtica (veure MostrejadorPCFG).
+
+        Les taules d'àlies i el diagnòstic de la gramàtica es calculen la primera vegada; el diagnòstic
+        queda a self.mostrejador_pcfg().diagnostic.
+
+        :param quantitat: Si és None, retorna una sola paraula; altrament, una llista amb tantes paraules.
+        :return: Cadena o llista de cadenes.
+        """
+        mostrejador = self.mostrejador_pcfg()
+        if quantitat is None:
+            return mostrejador.mostra()
+        return mostrejador.mostra_lot(quantitat)
+
+    def mostrejador_pcfg(self):
+        """
+        :return: El MostrejadorPCFG de la gramàtica (creat un sol cop).
+        """
+        if not self.es_prob:
+            raise ValueError("El mostreig PCFG necessita una gramàtica probabilística.")
+        if self._mostrejador is None:
+            self._mostrejador = MostrejadorPCFG(self.regles_probabilistiques, self.inici, rng=self.rng)
+        return self._mostrejador
+
+    def compta_derivacions(self, longitud):
+        """
+        :return: Nombre de derivacions (de la gramàtica en CNF) de paraules de la longitud indicada.
+        """
+        return self._comptador(False).pes(longitud)
+
+    def _comptador(self, ponderada):
+        """
+        Construeix (un sol cop per mode) la taula de comptatge de derivacions.
+        """
+        if ponderada in self._comptadors:
+            return self._comptadors[ponderada]
+        if ponderada and not self.es_prob:
+            raise ValueError("El mostreig ponderat necessita una gramàtica probabilística.")
+        regles, inici = self._gramatica_cnf()
+        if ponderada and regles is not self.regles:
+            raise ValueError("El mostreig ponderat necessita una gramàtica probabilística en CNF.")
+
+        terminals, binaries, buida = {}, {}, 0
+        for cap, cos in regles:
+            pes = self.probabilitats.get((cap, tuple(cos)), 1.0) if ponderada else 1
+            if cos == ['']:
+                if cap == inici:
+                    buida = pes
+            elif len(cos) == 1:
+                terminals.setdefault(cap, []).append((cos[0], pes))
+            else:
+                binaries.setdefault(cap, []).append((cos[0], cos[1], pes))
+        comptador = _ComptadorDerivacions(terminals, binaries, inici, buida, exacte=not ponderada)
+        self._comptadors[ponderada] = comptador
+        return comptador
+
+    def _gramatica_cnf(self):
+        """
+        :return: Tupla (regles en CNF, símbol inicial). Si la gramàtica no és en CNF es transforma un sol cop.
+        """
+        if self._cnf is None:
+            if CFGtoCNF(self.regles, start=self.inici)._is_cnf():
+                self._cnf = (self.regles, self.inici)
+            else:
+                convertidor = CFGtoCNF(self.regles, start=self.inici)
+                self._cnf = (convertidor.convert(), convertidor.initial)
+        return self._cnf
+
+    def crea_negatives(self, quantitat, longituds, alfabet=None, mida_lot=256, max_candidats=None, uniques=True):
+        """
+        Genera en bloc paraules que, garantidament, NO pertanyen al llenguatge.
+
+        Els candidats es proposen per lots, barrejant mutacions d'una lletra de paraules vàlides de la mateixa
+        longitud i cadenes aleatòries sobre l'alfabet. Abans de fer cap parse s'apliquen dos filtres: un candidat
+        amb algun símbol que no és terminal de la gramàtica, o d'una longitud sense cap derivació, és negatiu
+        segur. La resta es comprova amb CKYBitset.
+
+        Les estadístiques (candidats, duplicats, filtrats, comprovats i taxa de rebuig) queden a
+        self.estadistiques_negatives. Els rebutjats són els candidats que el reconeixedor accepta; la taxa de rebuig
+        es calcula sobre els candidats no duplicats.
+
+        :param quantitat: Nombre de paraules negatives a generar.
+        :param longituds: Longitud, llista de longituds (equiprobables) o diccionari {longitud: pes}.
+        :param alfabet: Símbols amb què es construeixen les cadenes aleatòries (per defecte, els terminals).
+        :param mida_lot: Nombre de candidats proposats a cada lot.
+        :param max_candidats: Límit de candidats a provar (per defecte, 1000 per paraula demanada).
+        :param uniques: Si True, no es repeteix cap paraula.
+        :return: Llista de paraules (cadenes) que no pertanyen al llenguatge.
+        """
+        regles, inici = self._gramatica_cnf()
+        terminals = sorted({cos[0] for _, cos in regles if len(cos) == 1 and cos[0] != ''})
+        alfabet = sorted(set(alfabet)) if alfabet is not None else terminals
+        if not alfabet:
+            raise ValueError("Cal un alfabet no buit per generar paraules.")
+        conjunt_terminals = set(terminals)
+        reconeixedor = CKYBitset(regles, start_symbol=inici)
+
+        if isinstance(longituds, int):
+            longituds = {longituds: 1}
+        elif not isinstance(longituds, dict):
+            longituds = {longitud: 1 for longitud in longituds}
+        opcions_longitud = list(longituds)
+        pesos_longitud = [longituds[longitud] for longitud in opcions_longitud]
+        if max_candidats is None:
+            max_candidats = 1000 * quantitat
+
+        stats = {"candidats": 0, "duplicats": 0, "filtrats_alfabet": 0, "filtrats_longitud": 0, "comprovats": 0,
+                 "rebutjats": 0}
+        self.estadistiques_negatives = stats
+        negatives = []
+        vistes = set()
+        while len(negatives) < quantitat and stats["candidats"] < max_candidats:
+            lot = self.rng.choices(opcions_longitud, pesos_longitud, k=mida_lot)
+            for longitud in lot:
+                candidat = None
+                # La paraula buida no es pot mutar: només es proposa com a cadena aleatòria (buida)
+                if longitud > 0 and self.rng.random() < 0.5 and self.compta_derivacions(longitud):
+                    base = self.crea_paraula_longitud(longitud)
+                    if base:
+                        pos = self.rng.randrange(longitud)
+                        lletres = [c for c in alfabet if c != base[pos]]
+                        if lletres:
+                            candidat = base[:pos] + self.rng.choice(lletres) + base[pos + 1:]
+                if candidat is None:
+                    candidat = ''.join(self.rng.choice(alfabet) for _ in range(longitud))
+                stats["candidats"] += 1
+
+                if uniques and candidat in vistes:
+                    stats["duplicats"] += 1
+                    continue
+                if not set(candidat) <= conjunt_terminals:
+                    stats["filtrats_alfabet"] += 1
+                elif not self.compta_derivacions(longitud):
+                    stats["filtrats_longitud"] += 1
+                else:
+                    stats["comprovats"] += 1
+                    if reconeixedor.parse(list(candidat)):
+                        stats["rebutjats"] += 1
+                        continue
+                vistes.add(candidat)
+                negatives.append(candidat)
+                if len(negatives) == quantitat:
+                    break
+
+        nous = stats["candidats"] - stats["duplicats"]
+        stats["taxa_rebuig"] = stats["rebutjats"] / nous if nous else 0.0
+        return negatives
+
     def _construeix_amb_preferencia(self, simbol, profunditat, target_len):
         """
         Construeix una paraula intentant aconseguir una longitud objectiu.
@@ -68,7 +718,7 @@ class ParaulaAleatoria:
         if profunditat > self.profunditat_max:
             return ''
 
-        matches = [r for r in self.regles if r[0] == simbol]
+        matches = self.per_cap.get(simbol)
         if not matches:
             return ''
 
@@ -84,7 +734,7 @@ class ParaulaAleatoria:
             if terminal_rules:
                 matches = terminal_rules
 
-        cos = random.choice(matches)[1]
+        cos = self.rng.choice(matches)[1]
         return self._expandir_cos(cos, profunditat, target_len)
 
     def _construeix(self, simbol, profunditat):
@@ -98,16 +748,16 @@ class ParaulaAleatoria:
         if profunditat > self.profunditat_max:
             return ''
 
-        matches = [r for r in self.regles if r[0] == simbol]
+        matches = self.per_cap.get(simbol)
         if not matches:
             return ''
         # Liger biaix a regles binàries a profunditat baixa
-        if profunditat < 2 and random.random() < 0.6:
+        if profunditat < 2 and self.rng.random() < 0.6:
             binary_rules = [r for r in matches if len(r[1]) == 2]
             if binary_rules:
                 matches = binary_rules
 
-        cos = random.choice(matches)[1]
+        cos = self.rng.choice(matches)[1]
         return self._expandir_cos(cos, profunditat)
 
     def _expandir_cos(self, cos, profunditat, target_len=None):
@@ -148,17 +798,17 @@ class ParaulaAleatoria:
             return 'xyz'  # Paraula clarament invàlida
         # Canviar un caràcter
         if base:
-            pos = random.randrange(len(base))
+            pos = self.rng.randrange(len(base))
             all_letters = [chr(i) for i in range(ord('a'), ord('z') + 1)]
             available_chars = [c for c in all_letters if c != base[pos]]
             if available_chars:
                 paraula_llista = list(base)
-                paraula_llista[pos] = random.choice(available_chars)
+                paraula_llista[pos] = self.rng.choice(available_chars)
                 return ''.join(paraula_llista)
         # Altres modificacions si no ha funcionat
         modifications = [
-            lambda w: w + random.choice(['x', 'y', 'z', 'q', 'w']),
-            lambda w: random.choice(['x', 'y', 'z', 'q', 'w']) + w,
+            lambda w: w + self.rng.choice(['x', 'y', 'z', 'q', 'w']),
+            lambda w: self.rng.choice(['x', 'y', 'z', 'q', 'w']) + w,
         ]
-        mod = random.choice(modifications)
+        mod = self.rng.choice(modifications)
         return mod(base)
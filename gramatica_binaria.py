@@ -0,0 +1,299 @@
+"""
+Format binari compacte per a gramàtiques, pensat per carregar-se en temps constant amb mmap.
+
+Estructura del fitxer (little-endian, seccions alineades a 8 bytes):
+    capçalera         CAPCALERA: màgic b'CKYG', versió, indicadors, nombre de símbols, de regles i de símbols als cossos
+    uint32[S+1]       desplaçaments de cada símbol dins de les dades de símbols
+    bytes             noms dels símbols en UTF-8, concatenats
+    uint8[S]          tipus de cada símbol (1 = no-terminal, 0 = terminal)
+    int32[R]          cap de cada regla (índex de símbol)
+    uint32[R+1]       inici del cos de cada regla dins de l'array de cossos
+    int32[C]          símbols dels cossos (un cos buit representa λ)
+    float64[R]        probabilitat de cada regla (només si la gramàtica és probabilística)
+
+Exemple:
+    python gramatica_binaria.py gramatica.txt gramatica.ckyg [--probabilistica]
+"""
+import hashlib
+import mmap
+import struct
+import sys
+from array import array
+
+MAGIC = b'CKYG'
+VERSIO = 1
+CAPCALERA = struct.Struct('<4sHHIII')
+PROBABILISTICA = 1
+
+
+def _alinea(posicio):
+    return (posicio + 7) & ~7
+
+
+def _seccions(num_simbols, mida_noms, num_regles, num_cos, probabilistica):
+    '''
+    Calcula el desplaçament de cada secció a partir de les mides (inici i final de cadascuna).
+    '''
+    seccions = {}
+    posicio = _alinea(CAPCALERA.size)
+    for nom, mida in (('desplacaments', 4 * (num_simbols + 1)), ('noms', mida_noms), ('tipus', num_simbols),
+                      ('caps', 4 * num_regles), ('inicis', 4 * (num_regles + 1)), ('cossos', 4 * num_cos),
+                      ('probs', 8 * num_regles if probabilistica else 0)):
+        seccions[nom] = (posicio, posicio + mida)
+        posicio = _alinea(posicio + mida)
+    return seccions, posicio
+
+
+def _little_endian(arr):
+    if sys.byteorder != 'little':
+        arr.byteswap()
+    return arr
+
+
+def escriu_binaria(regles, cami, probabilistica=False):
+    '''
+    Desa una gramàtica en format binari.
+
+    :param regles: Regles en el format de llegir_gramatica: [(head, [body]), ...] o [((head, [body]), prob), ...].
+    :param cami: Fitxer de sortida.
+    :param probabilistica: Indica si les regles porten probabilitat.
+    '''
+    index = {}
+    caps = array('i')
+    inicis = array('I', [0])
+    cossos = array('i')
+    probs = array('d')
+
+    def id_simbol(simbol):
+        if simbol not in index:
+            index[simbol] = len(index)
+        return index[simbol]
+
+    for regla in regles:
+        if probabilistica:
+            (cap, cos), prob = regla
+            probs.append(prob)
+        else:
+            cap, cos = regla
+        caps.append(id_simbol(cap))
+        cossos.extend(id_simbol(s) for s in cos if s != '')
+        inicis.append(len(cossos))
+
+    caps_conjunt = set(caps)
+    noms = bytearray()
+    desplacaments = array('I', [0])
+    for simbol in index:
+        noms += simbol.encode('utf-8')
+        desplacaments.append(len(noms))
+    tipus = bytes(1 if i in caps_conjunt or s.isupper() else 0 for s, i in index.items())
+
+    seccions, mida_total = _seccions(len(index), len(noms), len(caps), len(cossos), probabilistica)
+    contingut = {
+        'desplacaments': _little_endian(desplacaments).tobytes(),
+        'noms': bytes(noms),
+        'tipus': tipus,
+        'caps': _little_endian(caps).tobytes(),
+        'inicis': _little_endian(inicis).tobytes(),
+        'cossos': _little_endian(cossos).tobytes(),
+        'probs': _little_endian(probs).tobytes() if probabilistica else b'',
+    }
+    dades = bytearray(mida_total)
+    CAPCALERA.pack_into(dades, 0, MAGIC, VERSIO, PROBABILISTICA if probabilistica else 0,
+                        len(index), len(caps), len(cossos))
+    for nom, (inici, final) in seccions.items():
+        dades[inici:final] = contingut[nom]
+    with open(cami, 'wb') as f:
+        f.write(dades)
+
+
+def converteix(cami_text, cami_binari, probabilistica=False):
+    '''
+    Converteix una gramàtica del format text de llegir_gramatica al format binari.
+    '''
+    from utils import llegir_gramatica
+    escriu_binaria(llegir_gramatica(cami_text, probabilistica), cami_binari, probabilistica)
+
+
+def es_binaria(cami):
+    '''
+    :return: True si el fitxer comença amb la marca del format binari.
+    '''
+    with open(cami, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+class GramaticaBinaria:
+    """
+    Gramàtica carregada d'un fitxer binari amb mmap, sense copiar ni descodificar les regles.
+
+    Es comporta com la llista de regles de llegir_gramatica (len, indexació i iteració), de manera que
+    es pot passar directament a CKY, ProbabilisticCKY o qualsevol altre motor. Els noms dels símbols es
+    descodifiquen només quan es necessiten i les regles, al primer recorregut complet. CKY i ProbabilisticCKY
+    no recorren les regles: construeixen els seus índexs amb index_motor, directament dels arrays d'enters.
+    """
+
+    def __init__(self, cami):
+        '''
+        Obre el fitxer i en mapeja les seccions. El cost no depèn de la mida de la gramàtica.
+
+        :param cami: Fitxer en format binari (veure escriu_binaria).
+        '''
+        self._fitxer = open(cami, 'rb')
+        self._mmap = mmap.mmap(self._fitxer.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, versio, indicadors, num_simbols, num_regles, num_cos = CAPCALERA.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{cami} no és una gramàtica en format binari.")
+        if versio != VERSIO:
+            raise ValueError(f"Versió de format binari no suportada: {versio}.")
+        self.probabilistica = bool(indicadors & PROBABILISTICA)
+        self.num_simbols = num_simbols
+        self.num_regles = num_regles
+
+        vista = memoryview(self._mmap)
+        seccions, _ = _seccions(num_simbols, 0, num_regles, num_cos, self.probabilistica)
+        inici, final = seccions['desplacaments']
+        self.desplacaments = self._vista(vista[inici:final], 'I')
+        mida_noms = self.desplacaments[num_simbols]
+        seccions, _ = _seccions(num_simbols, mida_noms, num_regles, num_cos, self.probabilistica)
+        self._noms = vista[slice(*seccions['noms'])]
+        self.tipus = vista[slice(*seccions['tipus'])]
+        self.caps = self._vista(vista[slice(*seccions['caps'])], 'i')
+        self.inicis = self._vista(vista[slice(*seccions['inicis'])], 'I')
+        self.cossos = self._vista(vista[slice(*seccions['cossos'])], 'i')
+        self.probs = self._vista(vista[slice(*seccions['probs'])], 'd') if self.probabilistica else None
+        self._simbols = [None] * num_simbols
+        self._regles = None
+
+    @staticmethod
+    def _vista(bytes_seccio, format_):
+        if sys.byteorder == 'little':
+            return bytes_seccio.cast(format_)
+        return _little_endian(array(format_, bytes_seccio))  # màquines big-endian: cal una còpia
+
+    def simbol(self, i):
+        '''
+        :return: Nom del símbol i-èssim (descodificat la primera vegada que es demana).
+        '''
+        nom = self._simbols[i]
+        if nom is None:
+            nom = bytes(self._noms[self.desplacaments[i]:self.desplacaments[i + 1]]).decode('utf-8')
+            self._simbols[i] = nom
+        return nom
+
+    @property
+    def simbols(self):
+        '''
+        :return: Llista amb els noms de tots els símbols.
+        '''
+        return [self.simbol(i) for i in range(self.num_simbols)]
+
+    def regla(self, r):
+        '''
+        :return: La regla r-èssima en el format de llegir_gramatica.
+        '''
+        cos = [self.simbol(s) for s in self.cossos[self.inicis[r]:self.inicis[r + 1]]] or ['']
+        regla = (self.simbol(self.caps[r]), cos)
+        if self.probabilistica:
+            return regla, self.probs[r]
+        return regla
+
+    def __len__(self):
+        return self.num_regles
+
+    def __getitem__(self, r):
+        if isinstance(r, slice):
+            return [self.regla(i) for i in range(*r.indices(self.num_regles))]
+        if r < 0:
+            r += self.num_regles
+        if not 0 <= r < self.num_regles:
+            raise IndexError(r)
+        return self.regla(r)
+
+    def resum(self):
+        '''
+        :return: Resum (hexadecimal) del contingut del fitxer, per identificar la gramàtica sense descodificar-la.
+        '''
+        return hashlib.blake2b(self._mmap, digest_size=16).hexdigest()
+
+    def noms_caps(self):
+        '''
+        :return: Llista amb el nom del cap de cada regla, en ordre (sense descodificar els cossos).
+        '''
+        noms = self.simbols
+        return [noms[cap] for cap in self.caps.tolist()]
+
+    def index_motor(self, probabilitats=False):
+        '''
+        Construeix els índexs que fan servir els motors CKY directament a partir dels arrays d'enters, sense
+        descodificar les regles: només es descodifica un cop el nom de cada símbol.
+
+        :param probabilitats: Si True, cada entrada porta la probabilitat de la regla i s'ometen les regles amb
+            probabilitat 0 (com fa ProbabilisticCKY). Si False, els índexs tenen el format de CKY i les regles
+            unàries només s'indexen si el símbol és un terminal en minúscula.
+        :return: Tupla (terminals, binaries, buides): terminal -> caps que el generen (parelles (A, p) si
+            probabilitats); B -> parelles (C, A) de les regles A → B C (tripletes (C, A, p) si probabilitats);
+            i el conjunt de caps amb alguna regla λ.
+        '''
+        if probabilitats and not self.probabilistica:
+            raise ValueError("La gramàtica binària no porta probabilitats.")
+        noms = self.simbols
+        minuscula = [nom.islower() for nom in noms]
+        caps = self.caps.tolist()
+        inicis = self.inicis.tolist()
+        cossos = self.cossos.tolist()
+        probs = self.probs.tolist() if probabilitats else None
+        terminals = {}
+        binaries = {}
+        buides = set()
+        for r, cap in enumerate(caps):
+            inici = inicis[r]
+            mida = inicis[r + 1] - inici
+            if probabilitats:
+                prob = probs[r]
+                if prob <= 0:
+                    continue
+            if mida == 1:
+                t = cossos[inici]
+                if probabilitats:
+                    terminals.setdefault(noms[t], []).append((noms[cap], prob))
+                elif minuscula[t]:
+                    terminals.setdefault(noms[t], []).append(noms[cap])
+            elif mida == 2:
+                B, C = cossos[inici], cossos[inici + 1]
+                entrada = (noms[C], noms[cap], prob) if probabilitats else (noms[C], noms[cap])
+                binaries.setdefault(noms[B], []).append(entrada)
+            elif mida == 0:
+                buides.add(noms[cap])
+        return terminals, binaries, buides
+
+    def __iter__(self):
+        # Els motors recorren les regles moltes vegades: es descodifiquen un sol cop, al primer recorregut
+        if self._regles is None:
+            self._regles = [self.regla(r) for r in range(self.num_regles)]
+        return iter(self._regles)
+
+    def close(self):
+        '''
+        Allibera el mapeig i tanca el fitxer.
+        '''
+        for vista in (self.desplacaments, self._noms, self.tipus, self.caps, self.inicis, self.cossos, self.probs):
+            if isinstance(vista, memoryview):
+                vista.release()
+        self._mmap.close()
+        self._fitxer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excepcio):
+        self.close()
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="Converteix una gramàtica de text al format binari.")
+    parser.add_argument("entrada", help="Gramàtica en format text.")
+    parser.add_argument("sortida", help="Fitxer binari de sortida.")
+    parser.add_argument("--probabilistica", action="store_true")
+    args = parser.parse_args()
+    converteix(args.entrada, args.sortida, args.probabilistica)
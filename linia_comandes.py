@@ -0,0 +1,277 @@
+"""
+Punt d'entrada no interactiu per comprovar paraules en lots.
+
+Exemple:
+    python linia_comandes.py gramatica.txt --tipus cfg --entrada paraules.txt --format jsonl --jobs 4 --stats
+
+Llegeix una paraula per línia (d'un fitxer o de l'entrada estàndard) i escriu un resultat per línia,
+en el mateix ordre, en format JSONL o TSV.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+
+from utils import llegir_gramatica, detecta_simbol_inicial
+
+# Motor de cada procés treballador (s'inicialitza un cop per procés)
+_motor = None
+_separa = None
+_format = None
+_pressupost = None
+
+
+def prepara_motor(cami_gramatica, tipus, nom_motor, simbol_inicial=None, **opcions):
+    """
+    Llegeix la gramàtica, la transforma a CNF si cal i crea el motor demanat.
+
+    :param cami_gramatica: Camí al fitxer de la gramàtica (en format text o binari, veure gramatica_binaria).
+    :param tipus: 'cnf', 'cfg' o 'prob'.
+    :param nom_motor: Nom del motor (veure motors.MOTORS).
+    :param simbol_inicial: Símbol inicial; si és None es detecta automàticament.
+    :param opcions: Paràmetres addicionals del constructor del motor (per exemple cache).
+    :return: Instància del motor.
+    """
+    from motors import crea_motor, MOTORS_CFG
+    from gramatica_binaria import GramaticaBinaria, es_binaria
+
+    if es_binaria(cami_gramatica):
+        regles = GramaticaBinaria(cami_gramatica)
+    else:
+        regles = llegir_gramatica(cami_gramatica, probabilistica=(tipus == 'prob'))
+    if tipus == 'cfg' and nom_motor not in MOTORS_CFG:
+        from extensio_1 import CFGtoCNF
+        convertidor = CFGtoCNF(regles, start=simbol_inicial or 'S')
+        regles = convertidor.convert()
+        simbol_inicial = convertidor.initial
+    if simbol_inicial is None:
+        simbol_inicial = detecta_simbol_inicial(regles, probabilistica=(tipus == 'prob'))
+    return crea_motor(nom_motor, regles, simbol_inicial, **opcions)
+
+
+def _inicialitza_treballador(cami_gramatica, tipus, nom_motor, simbol_inicial, simbols_espai, format_sortida,
+                             temps_maxim=None, operacions_maximes=None, mida_cache=0, cache_disc=None,
+                             calibratge=None):
+    global _motor, _separa, _format, _pressupost
+    opcions = {}
+    if calibratge is not None:
+        opcions['calibratge'] = calibratge
+    if mida_cache or cache_disc:
+        from cache_resultats import CacheResultats
+        opcions['cache'] = CacheResultats(max_entrades=mida_cache, cami_disc=cache_disc)
+    _motor = prepara_motor(cami_gramatica, tipus, nom_motor, simbol_inicial, **opcions)
+    _separa = str.split if simbols_espai else list
+    _format = format_sortida
+    _pressupost = None
+    if temps_maxim is not None or operacions_maximes is not None:
+        from pressupost import Pressupost
+        _pressupost = Pressupost(temps=temps_maxim, operacions=operacions_maximes)
+
+
+def _format_resultat(resultat):
+    if resultat is None or resultat is True or resultat is False:
+        return resultat
+    return float(resultat)
+
+
+# Comptadors de la memòria cau que es sumen entre lots i processos
+CAMPS_CACHE = ('encerts', 'encerts_disc', 'errades', 'expulsions')
+
+
+def processa_lot(linies):
+    """
+    Comprova un lot de paraules amb el motor del procés actual.
+
+    :param linies: Llista de paraules (cadenes sense salt de línia).
+    :return: Tupla (text de sortida, temps de parse en segons, nombre de paraules acceptades,
+        eleccions del motor automàtic en aquest lot, nombre de paraules interrompudes,
+        encerts i errades de la memòria cau en aquest lot).
+    """
+    from pressupost import ParseInterromput
+
+    sortida = []
+    acceptades = interrompudes = 0
+    inici = time.perf_counter()
+    for linia in linies:
+        interrupcio = None
+        try:
+            if _pressupost is None:
+                resultat = _motor.parse(_separa(linia))
+            else:
+                resultat = _motor.parse(_separa(linia), _pressupost)
+        except ParseInterromput as e:
+            resultat = None
+            interrupcio = e.a_dict()
+            interrompudes += 1
+        if resultat:
+            acceptades += 1
+        if _format == 'tsv':
+            text = 'interromput' if interrupcio else _format_resultat(resultat)
+            sortida.append(f"{linia}\t{text}\n")
+        else:
+            registre = {"paraula": linia, "resultat": _format_resultat(resultat)}
+            if interrupcio:
+                registre["interromput"] = interrupcio
+            sortida.append(json.dumps(registre, ensure_ascii=False) + "\n")
+    temps = time.perf_counter() - inici
+    eleccions = {}
+    if hasattr(_motor, 'eleccions'):
+        eleccions = dict(_motor.eleccions)
+        _motor.eleccions.clear()
+    cache = {}
+    if getattr(_motor, 'cache', None) is not None:
+        for camp in CAMPS_CACHE:
+            cache[camp] = getattr(_motor.cache, camp)
+            setattr(_motor.cache, camp, 0)
+    return ''.join(sortida), temps, acceptades, eleccions, interrompudes, cache
+
+
+def llegeix_lots(fitxer, mida_lot):
+    """
+    Llegeix el fitxer de manera incremental i en retorna les paraules agrupades en lots.
+    """
+    lot = []
+    for linia in fitxer:
+        lot.append(linia.rstrip('\r\n'))
+        if len(lot) >= mida_lot:
+            yield lot
+            lot = []
+    if lot:
+        yield lot
+
+
+def executa(args, entrada, sortida):
+    """
+    Processa totes les paraules de l'entrada i escriu els resultats a la sortida, en ordre.
+
+    :return: Diccionari amb les estadístiques de l'execució.
+    """
+    inici = time.perf_counter()
+    calibratge = None
+    if args.engine == 'auto':
+        # Es calibra (o es llegeix la calibració) un sol cop aquí, perquè tots els processos triïn igual
+        from extensio_auto import carrega_calibratge
+        calibratge = carrega_calibratge()
+    inicialitzacio = (args.gramatica, args.tipus, args.engine, args.simbol_inicial,
+                      args.simbols_espai, args.format, args.temps_maxim, args.operacions_maximes,
+                      args.cache, args.cache_disc, calibratge)
+    paraules = acceptades = interrompudes = 0
+    temps_parse = 0.0
+    eleccions = {}
+    cache = {}
+
+    def escriu(resultat, mida):
+        nonlocal paraules, acceptades, interrompudes, temps_parse
+        text, temps, acc, eleccions_lot, interr, cache_lot = resultat
+        sortida.write(text)
+        paraules += mida
+        acceptades += acc
+        interrompudes += interr
+        temps_parse += temps
+        for nom, vegades in eleccions_lot.items():
+            eleccions[nom] = eleccions.get(nom, 0) + vegades
+        for camp, valor in cache_lot.items():
+            cache[camp] = cache.get(camp, 0) + valor
+
+    if args.jobs == 1:
+        _inicialitza_treballador(*inicialitzacio)
+        for lot in llegeix_lots(entrada, args.mida_lot):
+            escriu(processa_lot(lot), len(lot))
+    else:
+        import multiprocessing
+        # Es limita el nombre de lots en vol perquè l'entrada es llegeixi de manera incremental
+        en_vol = deque()
+        max_en_vol = 4 * args.jobs
+        with multiprocessing.Pool(args.jobs, _inicialitza_treballador, inicialitzacio) as pool:
+            for lot in llegeix_lots(entrada, args.mida_lot):
+                en_vol.append((pool.apply_async(processa_lot, (lot,)), len(lot)))
+                if len(en_vol) >= max_en_vol:
+                    resultat, mida = en_vol.popleft()
+                    escriu(resultat.get(), mida)
+            while en_vol:
+                resultat, mida = en_vol.popleft()
+                escriu(resultat.get(), mida)
+
+    total = time.perf_counter() - inici
+    estadistiques = {
+        "motor": args.engine,
+        "jobs": args.jobs,
+        "paraules": paraules,
+        "acceptades": acceptades,
+        "interrompudes": interrompudes,
+        "temps_total": total,
+        "temps_parse": temps_parse,
+        "paraules_per_segon": paraules / total if total > 0 else 0.0,
+    }
+    if eleccions:
+        estadistiques["eleccions"] = eleccions
+    if cache:
+        estadistiques["cache"] = cache
+    return estadistiques
+
+
+def crea_parser():
+    parser = argparse.ArgumentParser(description="Comprovació de paraules en lots amb CKY.")
+    parser.add_argument("gramatica", help="Fitxer de la gramàtica.")
+    parser.add_argument("--tipus", choices=["cnf", "cfg", "prob"], default="cnf",
+                        help="Tipus de gramàtica: CNF, CFG (es transforma a CNF) o probabilística.")
+    parser.add_argument("--entrada", default="-", help="Fitxer de paraules, una per línia ('-' per stdin).")
+    parser.add_argument("--sortida", default="-", help="Fitxer de resultats ('-' per stdout).")
+    parser.add_argument("--format", choices=["jsonl", "tsv"], default="jsonl")
+    parser.add_argument("--engine", default=None,
+                        help="Motor de reconeixement (per defecte 'bitset', o 'probabilistic' si --tipus prob).")
+    parser.add_argument("--jobs", type=int, default=1, help="Nombre de processos (0 = tots els nuclis).")
+    parser.add_argument("--mida-lot", type=int, default=2000, help="Paraules per lot enviat a cada procés.")
+    parser.add_argument("--simbol-inicial", default=None, help="Símbol inicial (per defecte es detecta).")
+    parser.add_argument("--simbols-espai", action="store_true",
+                        help="Les paraules són símbols separats per espais en lloc de caràcters.")
+    parser.add_argument("--temps-maxim", type=float, default=None,
+                        help="Temps màxim per paraula, en segons; les paraules que el superen es marquen com a interrompudes.")
+    parser.add_argument("--operacions-maximes", type=int, default=None,
+                        help="Nombre màxim d'operacions per paraula.")
+    parser.add_argument("--cache", type=int, default=0,
+                        help="Entrades de la memòria cau de resultats de cada procés (0 = sense memòria cau).")
+    parser.add_argument("--cache-disc", default=None,
+                        help="Fitxer SQLite on es comparteixen els resultats entre processos i execucions.")
+    parser.add_argument("--stats", action="store_true", help="Escriu estadístiques de temps a stderr.")
+    return parser
+
+
+def main(argv=None):
+    args = crea_parser().parse_args(argv)
+    if args.engine is None:
+        args.engine = 'probabilistic' if args.tipus == 'prob' else 'bitset'
+    if args.jobs <= 0:
+        args.jobs = os.cpu_count() or 1
+
+    from motors import MOTORS, MOTORS_PROBABILISTICS, MOTORS_PRESSUPOST, MOTORS_CACHE
+    if args.engine not in MOTORS:
+        sys.exit(f"Motor desconegut: {args.engine}. Opcions: {', '.join(sorted(MOTORS))}")
+    if (args.tipus == 'prob') != (args.engine in MOTORS_PROBABILISTICS):
+        sys.exit(f"El motor '{args.engine}' no és compatible amb gramàtiques de tipus '{args.tipus}'.")
+    if (args.temps_maxim is not None or args.operacions_maximes is not None) and args.engine not in MOTORS_PRESSUPOST:
+        sys.exit(f"El motor '{args.engine}' no admet límits de temps ni d'operacions. "
+                 f"Opcions: {', '.join(sorted(MOTORS_PRESSUPOST))}")
+    if (args.cache or args.cache_disc) and args.engine not in MOTORS_CACHE:
+        sys.exit(f"El motor '{args.engine}' no admet memòria cau. Opcions: {', '.join(sorted(MOTORS_CACHE))}")
+
+    entrada = sys.stdin if args.entrada == "-" else open(args.entrada, encoding="utf-8")
+    sortida = sys.stdout if args.sortida == "-" else open(args.sortida, "w", encoding="utf-8")
+    try:
+        estadistiques = executa(args, entrada, sortida)
+    finally:
+        if entrada is not sys.stdin:
+            entrada.close()
+        if sortida is not sys.stdout:
+            sortida.close()
+        else:
+            sortida.flush()
+
+    if args.stats:
+        print(json.dumps(estadistiques), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+import importlib
+
+# nom del motor -> (mòdul, classe). Els mòduls s'importen només quan es fan servir,
+# de manera que NumPy no es carrega si no es tria el motor 'numpy'.
+MOTORS = {
+    'cky': ('extensio_base', 'CKY'),
+    'bitset': ('extensio_bitset', 'CKYBitset'),
+    'numpy': ('extensio_numpy', 'CKYNumpy'),
+    'probabilistic': ('extensio_2', 'ProbabilisticCKY'),
+    'earley': ('extensio_earley', 'Earley'),
+    'cky_plus': ('extensio_cky_plus', 'CKYPlus'),
+    'auto': ('extensio_auto', 'CKYAuto'),
+    'regular': ('extensio_regular', 'CKYRegular'),
+}
+
+# Motors que treballen amb gramàtiques probabilístiques
+MOTORS_PROBABILISTICS = {'probabilistic'}
+
+# Motors que accepten gramàtiques CFG qualssevol sense convertir-les a CNF
+MOTORS_CFG = {'earley', 'cky_plus'}
+
+# Motors que accepten un Pressupost (límit de temps o d'operacions) a parse
+MOTORS_PRESSUPOST = {'cky', 'bitset', 'probabilistic', 'regular', 'auto'}
+
+# Motors que accepten una CacheResultats (paràmetre cache)
+MOTORS_CACHE = {'cky', 'probabilistic', 'regular', 'auto'}
+
+
+def carrega_motor(nom):
+    """
+    Retorna la classe del motor indicat, important el seu mòdul de manera mandrosa.
+
+    :param nom: Nom del motor (una clau de MOTORS).
+    :return: Classe del motor.
+    """
+    if nom not in MOTORS:
+        raise ValueError(f"Motor desconegut: {nom}. Opcions: {', '.join(sorted(MOTORS))}")
+    modul, classe = MOTORS[nom]
+    return getattr(importlib.import_module(modul), classe)
+
+
+def crea_motor(nom, regles, simbol_inicial='S', **opcions):
+    """
+    Crea una instància del motor indicat per a la gramàtica donada.
+
+    :param nom: Nom del motor.
+    :param regles: Regles de la gramàtica en el format que espera el motor.
+    :param simbol_inicial: Símbol inicial de la gramàtica.
+    :param opcions: Paràmetres addicionals del constructor del motor (per exemple cache).
+    :return: Instància del motor amb un mètode parse(paraula).
+    """
+    return carrega_motor(nom)(regles, start_symbol=simbol_inicial, **opcions)
@@ -0,0 +1,100 @@
+import threading
+import time
+
+
+class ParseInterromput(Exception):
+    """
+    Excepció que llança un motor quan s'esgota el pressupost d'un parse.
+
+    Conté el progrés parcial: fins a quina longitud de subcadena s'ha omplert la taula i quantes cel·les
+    no buides hi havia en aquell moment.
+    """
+
+    def __init__(self, motiu, longitud_paraula, longitud_assolida, celles_omplertes, celles_totals, operacions, temps):
+        '''
+        :param motiu: 'temps', 'operacions' o 'cancel·lat'.
+        :param longitud_paraula: Longitud de la paraula que s'estava analitzant.
+        :param longitud_assolida: Longitud màxima de subcadena completada (0 si no s'ha acabat ni la diagonal).
+        :param celles_omplertes: Cel·les no buides de les longituds completades.
+        :param celles_totals: Cel·les de la taula completa (n·(n+1)/2).
+        :param operacions: Operacions fetes abans d'interrompre.
+        :param temps: Temps transcorregut (en segons).
+        '''
+        super().__init__(f"Parse interromput ({motiu}) a la longitud {longitud_assolida} de {longitud_paraula}")
+        self.motiu = motiu
+        self.longitud_paraula = longitud_paraula
+        self.longitud_assolida = longitud_assolida
+        self.celles_omplertes = celles_omplertes
+        self.celles_totals = celles_totals
+        self.operacions = operacions
+        self.temps = temps
+
+    def a_dict(self):
+        '''
+        :return: Diccionari amb el progrés parcial.
+        '''
+        return {
+            "motiu": self.motiu,
+            "longitud_paraula": self.longitud_paraula,
+            "longitud_assolida": self.longitud_assolida,
+            "celles_omplertes": self.celles_omplertes,
+            "celles_totals": self.celles_totals,
+            "operacions": self.operacions,
+            "temps": self.temps,
+        }
+
+
+class Pressupost:
+    """
+    Límits d'un parse: temps màxim, termini absolut, nombre màxim d'operacions i cancel·lació cooperativa.
+
+    Els motors ho comproven entre longituds de subcadena, de manera que un parse no s'interromp mai a mitja
+    longitud. El límit d'operacions es comprova abans de començar cada longitud amb el cost previst, i per
+    tant no se supera mai. Un mateix objecte es pot reutilitzar per a moltes paraules (el temps es compta
+    des de l'inici de cada parse) i cancela() es pot cridar des d'un altre fil.
+    """
+
+    def __init__(self, temps=None, operacions=None, termini=None):
+        '''
+        :param temps: Temps màxim per parse, en segons.
+        :param operacions: Nombre màxim d'operacions per parse (comprovacions de regla a CKY).
+        :param termini: Instant límit absolut, en el rellotge de time.monotonic().
+        '''
+        self.temps = temps
+        self.operacions = operacions
+        self.termini = termini
+        self._cancellat = threading.Event()
+
+    def cancela(self):
+        '''
+        Demana que s'aturin els parses que fan servir aquest pressupost.
+        '''
+        self._cancellat.set()
+
+    @property
+    def cancellat(self):
+        return self._cancellat.is_set()
+
+    def inicia(self):
+        '''
+        :return: Instant límit (time.monotonic()) del parse que comença ara, o None si no hi ha límit de temps.
+        '''
+        termini = self.termini
+        if self.temps is not None:
+            relatiu = time.monotonic() + self.temps
+            termini = relatiu if termini is None else min(termini, relatiu)
+        return termini
+
+    def motiu_esgotat(self, termini, operacions):
+        '''
+        :param termini: Valor retornat per inicia().
+        :param operacions: Operacions fetes més les previstes per a la propera longitud.
+        :return: Motiu pel qual cal aturar el parse, o None si encara queda pressupost.
+        '''
+        if self._cancellat.is_set():
+            return 'cancel·lat'
+        if self.operacions is not None and operacions > self.operacions:
+            return 'operacions'
+        if termini is not None and time.monotonic() >= termini:
+            return 'temps'
+        return None
@@ -0,0 +1,62 @@
+class Reticle:
+    """
+    Reticle de paraules: graf dirigit acíclic on cada aresta és un terminal candidat, amb un pes opcional.
+
+    Els nodes són els enters de 0 a nodes - 1 en ordre topològic (cada aresta va d'un node a un de posterior);
+    el node 0 és l'inicial i nodes - 1 el final. Cada camí del node inicial al final és una paraula possible,
+    i el seu pes és el producte dels pesos de les arestes.
+    """
+
+    def __init__(self, nodes, arestes):
+        '''
+        Inicialitza el reticle.
+
+        :param nodes: Nombre de nodes (com a mínim 1).
+        :param arestes: Iterable de tuples (origen, desti, terminal) o (origen, desti, terminal, pes),
+            amb 0 <= origen < desti < nodes. Si no s'indica, el pes és 1.
+        '''
+        if nodes < 1:
+            raise ValueError("Un reticle necessita com a mínim un node.")
+        self.nodes = nodes
+        self.arestes = []
+        for aresta in arestes:
+            origen, desti, terminal = aresta[:3]
+            pes = aresta[3] if len(aresta) > 3 else 1.0
+            if not 0 <= origen < desti < nodes:
+                raise ValueError(f"Aresta incorrecta {origen} -> {desti}: cal 0 <= origen < desti < {nodes}.")
+            self.arestes.append((origen, desti, terminal, pes))
+
+    @classmethod
+    def de_candidats(cls, candidats):
+        '''
+        Crea un reticle lineal a partir dels candidats de cada posició.
+
+        :param candidats: Llista amb, per a cada posició, un iterable de terminals o un diccionari {terminal: pes}.
+        :return: Reticle amb len(candidats) + 1 nodes.
+        '''
+        arestes = []
+        for i, posicio in enumerate(candidats):
+            pesos = posicio if isinstance(posicio, dict) else dict.fromkeys(posicio, 1.0)
+            arestes.extend((i, i + 1, terminal, pes) for terminal, pes in pesos.items())
+        return cls(len(candidats) + 1, arestes)
+
+    @classmethod
+    def de(cls, entrada):
+        '''
+        :param entrada: Reticle o llista de candidats per posició (veure de_candidats).
+        :return: L'entrada com a Reticle.
+        '''
+        return entrada if isinstance(entrada, cls) else cls.de_candidats(entrada)
+
+    def nombre_camins(self):
+        '''
+        :return: Nombre de paraules (camins del node inicial al final) que representa el reticle.
+        '''
+        camins = [0] * self.nodes
+        camins[0] = 1
+        for origen, desti, _, _ in sorted(self.arestes):
+            camins[desti] += camins[origen]
+        return camins[-1]
+
+    def __repr__(self):
+        return f"Reticle(nodes={self.nodes}, arestes={len(self.arestes)})"
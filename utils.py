@@ -38,9 +38,47 @@ def llegir_gramatica(path, probabilistica=False):
 
 
 
+def escriure_gramatica(regles, path, probabilistica=False):
+    """
+    Escriu una gramàtica en el format que llegeix llegir_gramatica (una producció per línia).
+    - Si probabilistica=True, les regles són [ ((head, [body]), prob), ... ]
+    - Si probabilistica=False, les regles són [ (head, [body]), ... ]
+    Les probabilitats s'escriuen amb tots els decimals perquè es llegeixin exactament igual.
+    """
+    with open(path, 'w', encoding='utf-8') as f:
+        for regla in regles:
+            if probabilistica:
+                (head, body), prob = regla
+            else:
+                head, body = regla
+            cos = ' '.join(body) if body != [''] else 'ε'
+            if probabilistica:
+                f.write(f"{head} -> {cos} {float(prob)!r}\n")
+            else:
+                f.write(f"{head} -> {cos}\n")
+
+
+
+
 def llegir_paraula(path):
     with open(path, 'r', encoding='utf-8') as f:
         paraula = list(f.read().strip())
     return paraula
 
 
+
+
+def detecta_simbol_inicial(regles, probabilistica=False):
+    """
+    Detecta el símbol inicial d'una gramàtica: 'S_START' si existeix, sinó el primer de 'ST' o 'S'.
+    """
+    if hasattr(regles, 'noms_caps'):
+        caps = regles.noms_caps()  # GramaticaBinaria: no cal descodificar les regles
+    else:
+        caps = [r[0][0] if probabilistica else r[0] for r in regles]
+    if "S_START" in caps:
+        return "S_START"
+    for cap in caps:
+        if cap in ["ST", "S"]:
+            return cap
+    return "S"